@@ -0,0 +1,111 @@
+"""Agregados por día, cliente y SKU sobre un año de histórico sintético
+
+Crea (una vez) una base con ``--codes`` QR generados repartidos en un año,
+con 1 a 20 items cada uno, y mide cada agregado de ``truck_qr.aggregate``
+por día y por mes junto con la memoria máxima del proceso. Con ``--payloads``
+mide además el camino de payloads exportados (una línea por QR) sobre los
+mismos datos.
+
+Uso:
+    python benchmarks/bench_aggregate.py
+    python benchmarks/bench_aggregate.py --codes 300000 --db /tmp/year.db --payloads
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.aggregate import ROLLUPS, ManifestAggregator
+from truck_qr.codec import encode_payload
+from truck_qr.history import _INSERT, SCHEMA
+
+PAYLOAD_CODECS = ("min", "short", "b45")
+
+
+def build_history(path: str, codes: int, seed: int = 1) -> None:
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    def rows():
+        for _ in range(codes):
+            gate = (start + timedelta(minutes=rnd.randrange(366 * 24 * 60))).strftime("%Y-%m-%dT%H:%M:%S")
+            data = {
+                "plate": f"P{rnd.randrange(3000):04d}",
+                "driverName": "John Doe",
+                "customer_id": f"C{rnd.randrange(200):03d}",
+                "date_time_at_gate": gate,
+                "item_list": [{"item_id": f"SKU{rnd.randrange(2000):05d}", "quantity": rnd.randrange(1, 500)}
+                              for _ in range(rnd.randrange(1, 21))],
+            }
+            text = json.dumps(data, separators=(",", ":"))
+            yield gate, data["plate"], data["customer_id"], None, gate, "json", 1, text, text
+
+    with conn:
+        conn.executemany(_INSERT, rows())
+    conn.close()
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(aggregator: ManifestAggregator) -> None:
+    print(f"{'rollup':<10}{'period':<8}{'rows':>9}{'seconds':>9}")
+    for name in ROLLUPS:
+        for period in ("day", "month"):
+            began = time.perf_counter()
+            count = sum(1 for _ in aggregator.rows(name, period))
+            print(f"{name:<10}{period:<8}{count:>9}{time.perf_counter() - began:>9.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the daily, customer and SKU rollups over a year of codes.")
+    parser.add_argument("--codes", type=int, default=110_000, help="Generated QR codes in the synthetic year")
+    parser.add_argument("--db", help="History database to reuse or create (default: temporary)")
+    parser.add_argument("--payloads", action="store_true", help="Also measure the exported payloads path")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="truck_qr_aggregate_")
+    try:
+        path = args.db or os.path.join(workdir, "history.db")
+        if not os.path.exists(path):
+            began = time.perf_counter()
+            build_history(path, args.codes)
+            print(f"built {args.codes} codes in {time.perf_counter() - began:.1f}s")
+        print(f"history: {os.path.getsize(path) / 1e6:.0f} MB, max RSS before: {_max_rss_mb():.0f} MB")
+
+        with ManifestAggregator.from_history(path) as aggregator:
+            measure(aggregator)
+        print(f"max RSS: {_max_rss_mb():.0f} MB")
+
+        if args.payloads:
+            lines_path = os.path.join(workdir, "payloads.txt")
+            conn = sqlite3.connect(path)
+            with open(lines_path, "w", encoding="utf-8") as f:
+                for n, (data,) in enumerate(conn.execute("SELECT data FROM generations")):
+                    f.write(encode_payload(json.loads(data), PAYLOAD_CODECS[n % len(PAYLOAD_CODECS)]) + "\n")
+            conn.close()
+            began = time.perf_counter()
+            with open(lines_path, encoding="utf-8") as f, ManifestAggregator.from_payloads(f) as aggregator:
+                print(f"\nexported payloads ({', '.join(PAYLOAD_CODECS)}): loaded in {time.perf_counter() - began:.1f}s")
+                measure(aggregator)
+            print(f"max RSS: {_max_rss_mb():.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Latencia del check-in en puerta según el tamaño del histórico de llegadas
+
+Carga ``N`` llegadas sintéticas en una base SQLite temporal y mide la
+verificación del payload escaneado más el check-in (búsqueda por índice y
+actualización). Con los índices la latencia debe crecer de forma logarítmica,
+no lineal. También imprime el plan de consulta para confirmar el uso del índice.
+
+Uso:
+    python benchmarks/bench_checkin.py
+    python benchmarks/bench_checkin.py --sizes 10000 100000 1000000 -n 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.checkin import ArrivalStore, GateScanner, RESULT_CHECKED_IN
+from truck_qr.codec import encode_payload
+
+
+def arrival(i: int) -> dict:
+    return {"plate": f"P{i:07d}", "customer_id": f"CUST{i % 5000:05d}", "deliveryOrderRef": f"DO-{i:08d}"}
+
+
+def scanned_payload(i: int, codec: str) -> str:
+    return encode_payload({
+        "plate": f"P{i:07d}",
+        "driverName": "John Doe",
+        "customer_id": f"CUST{i % 5000:05d}",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": "SKU001", "quantity": 3}],
+        "deliveryOrderRef": f"DO-{i:08d}",
+    }, codec)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark gate check-in latency against table size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("-n", "--scans", type=int, default=1000, help="Check-ins measured per size")
+    parser.add_argument("--codec", default="b45")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    print(f"{'rows':>9} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'scans/s':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            with ArrivalStore(os.path.join(tmp, "gate.db")) as store:
+                start = time.perf_counter()
+                store.add_expected(arrival(i) for i in range(size))
+                load_s = time.perf_counter() - start
+
+                scanner = GateScanner(store)
+                payloads = [scanned_payload(i, args.codec) for i in rng.sample(range(size), min(args.scans, size))]
+                latencies = []
+                start = time.perf_counter()
+                for payload in payloads:
+                    t = time.perf_counter()
+                    result = scanner.scan(payload)
+                    latencies.append((time.perf_counter() - t) * 1000)
+                    assert result.status == RESULT_CHECKED_IN, result
+                elapsed = time.perf_counter() - start
+
+                if size == args.sizes[-1]:
+                    plan = store._conn.execute(
+                        "EXPLAIN QUERY PLAN SELECT id FROM arrivals WHERE delivery_ref = ? AND status = ?",
+                        ("DO-00000001", "expected"),
+                    ).fetchall()
+
+        latencies.sort()
+        print(f"{size:>9} {load_s:>8.2f} {statistics.median(latencies):>8.3f} "
+              f"{latencies[int(0.99 * (len(latencies) - 1))]:>8.3f} {len(latencies) / elapsed:>9.0f}")
+    print("query plan:", "; ".join(row[-1] for row in plan))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Coste de enviar los registros a Boomi desde el camino de generación
+
+Levanta ``StubServer`` con una latencia simulada y compara un POST síncrono
+por registro (``urllib``) con ``BoomiDelivery.submit`` (cola + lotes en
+segundo plano). También mide el rendimiento con fallos intermitentes (503).
+
+Uso:
+    python benchmarks/bench_delivery.py
+    python benchmarks/bench_delivery.py -n 5000 --delay 0.2 --fail-rate 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.delivery import BoomiDelivery, StubServer
+
+
+def sample(i: int) -> dict:
+    return {
+        "plate": f"P{i % 20000:06d}",
+        "driverName": "John Doe",
+        "customer_id": f"CUST{i % 500:04d}",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{j:03d}", "quantity": j + 1} for j in range(5)],
+    }
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Boomi outbound queue against a local stub.")
+    parser.add_argument("-n", "--records", type=int, default=2000)
+    parser.add_argument("--sync-records", type=int, default=50, help="Records posted synchronously")
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub latency per request in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    stub = asyncio.run_coroutine_threadsafe(StubServer(delay=args.delay).start(), loop).result()
+
+    # Referencia: un POST por registro en el hilo de la petición
+    sync = []
+    for i in range(args.sync_records):
+        body = json.dumps({"records": [{"id": str(i), "payload": sample(i)}]}).encode()
+        request = urllib.request.Request(stub.url, data=body, headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        urllib.request.urlopen(request).read()
+        sync.append((time.perf_counter() - start) * 1000)
+
+    print(f"{'path':<26} {'p50 ms':>8} {'p99 ms':>8} {'drain s':>8} {'requests':>9} {'conns':>6}")
+    print(f"{'sync POST per record':<26} {_percentiles(sync)[0]:>8.3f} {_percentiles(sync)[1]:>8.3f}")
+
+    for fail_rate in sorted({0.0, args.fail_rate}):
+        stub.fail_rate = fail_rate
+        requests_before, connections_before = stub.requests, stub.connections
+        with tempfile.TemporaryDirectory() as spool:
+            delivery = BoomiDelivery(stub.url, spool_dir=spool, backoff_base=0.05, replay_interval=None)
+            latencies = []
+            for i in range(args.records):
+                start = time.perf_counter()
+                delivery.submit(sample(i))
+                latencies.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            delivery.flush()
+            drain = time.perf_counter() - start
+            delivery.close()
+        name = f"BoomiDelivery ({fail_rate:.0%} 503)"
+        print(f"{name:<26} {_percentiles(latencies)[0]:>8.3f} {_percentiles(latencies)[1]:>8.3f} {drain:>8.2f} "
+              f"{stub.requests - requests_before:>9} {stub.connections - connections_before:>6}"
+              f"   sent {delivery.stats['sent']}, retries {delivery.stats['retries']}, "
+              f"spooled {delivery.stats['spooled']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
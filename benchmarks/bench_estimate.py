@@ -0,0 +1,73 @@
+"""Estimación en vivo frente a validar + serializar + ``qr_stats`` en cada rerun
+
+Simula a un usuario que añade items de uno en uno al formulario: para cada
+tamaño mide el coste de un rerun con ``PayloadEstimator`` (incremental, con
+los items anteriores ya en caché) y con el camino completo, y comprueba que
+los bytes y la versión estimados coinciden con los reales.
+
+Uso:
+    python benchmarks/bench_estimate.py
+    python benchmarks/bench_estimate.py --items 10 100 1000 --codec b45
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.codec import CODECS, encode_payload, qr_stats
+from truck_qr.estimate import PayloadEstimator
+from truck_qr.record import validate_record
+
+
+def fields(items: int) -> dict:
+    return {
+        "plate": "abc-123",
+        "driverName": "john doe",
+        "customer_id": "CUST0001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "items": ", ".join(f"SKU{j:05d}:{j % 97 + 1}" for j in range(items)),
+        "company": "Logistics Inc.",
+    }
+
+
+def _time_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the live size estimate with the full encode path.")
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--codec", choices=CODECS, default="json")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>6} {'bytes':>7} {'version':>8} {'estimate ms':>12} {'full ms':>9} {'match':>6}")
+    for items in args.items:
+        values = fields(items)
+        estimator = PayloadEstimator()
+        # Rerun anterior: todos los items salvo el último ya están en caché
+        estimator.estimate(fields(items - 1), args.codec)
+
+        def full():
+            record, _ = validate_record(values)
+            payload = encode_payload(record.to_payload(), args.codec)
+            return payload, qr_stats(payload)[0]
+
+        estimate_ms = _time_ms(lambda: estimator.estimate(values, args.codec), args.repeat)
+        full_ms = _time_ms(full, args.repeat)
+        estimate = estimator.estimate(values, args.codec)
+        payload, version = full()
+        match = estimate.payload_bytes == len(payload.encode("utf-8")) and estimate.version == version
+        print(f"{items:>6} {estimate.payload_bytes:>7} {str(estimate.version or '> 40'):>8} "
+              f"{estimate_ms:>12.2f} {full_ms:>9.2f} {'yes' if match else 'NO':>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
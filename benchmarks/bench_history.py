@@ -0,0 +1,114 @@
+"""Coste del histórico de QR generados en el camino del botón "Generate QR"
+
+Compara la latencia de ``GenerationHistory.record`` (solo encola) con un
+INSERT + COMMIT síncrono por QR, y mide las consultas por rango de fechas y
+por placa sobre un histórico de ``--rows`` filas.
+
+Uso:
+    python benchmarks/bench_history.py
+    python benchmarks/bench_history.py -n 5000 --rows 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.codec import encode_payload
+from truck_qr.history import _INSERT, SCHEMA, GenerationHistory
+
+START = datetime(2024, 1, 1)
+
+
+def sample(i: int) -> dict:
+    return {
+        "plate": f"P{i % 20000:06d}",
+        "driverName": "John Doe",
+        "customer_id": f"CUST{i % 500:04d}",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{j:03d}", "quantity": j + 1} for j in range(5)],
+        "deliveryOrderRef": f"DO-{i:08d}",
+    }
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def bench_write(path: str, count: int) -> None:
+    payloads = [(sample(i), encode_payload(sample(i), "min")) for i in range(count)]
+
+    # Referencia: una transacción por QR en el hilo de la petición
+    conn = sqlite3.connect(path + ".sync")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    sync = []
+    for data, payload in payloads:
+        start = time.perf_counter()
+        with conn:
+            conn.execute(_INSERT, (datetime.now().isoformat(), data["plate"], data["customer_id"],
+                                   data["deliveryOrderRef"], data["date_time_at_gate"], "min", 1, "{}", payload))
+        sync.append((time.perf_counter() - start) * 1000)
+    conn.close()
+
+    with GenerationHistory(path) as history:
+        buffered = []
+        for data, payload in payloads:
+            start = time.perf_counter()
+            history.record(data, payload, "min")
+            buffered.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        history.flush()
+        drain = time.perf_counter() - start
+
+    print(f"{'write path':<22} {'p50 ms':>8} {'p99 ms':>8}")
+    print(f"{'sync INSERT+COMMIT':<22} {_percentiles(sync)[0]:>8.4f} {_percentiles(sync)[1]:>8.4f}")
+    print(f"{'GenerationHistory':<22} {_percentiles(buffered)[0]:>8.4f} {_percentiles(buffered)[1]:>8.4f}"
+          f"   (background drain after the loop: {drain * 1000:.1f} ms)")
+
+
+def bench_query(path: str, rows: int) -> None:
+    with GenerationHistory(path, batch_size=10000) as history:
+        start = time.perf_counter()
+        for i in range(rows):
+            data = sample(i)
+            history.record(data, "", "min", created_at=START + timedelta(seconds=30 * i))
+        history.flush()
+        load = time.perf_counter() - start
+
+        shift_start = START + timedelta(seconds=30 * rows // 2)
+        queries = {
+            "8h shift": lambda: list(history.query(shift_start, shift_start + timedelta(hours=8))),
+            "plate (all time)": lambda: list(history.query(plate="P000123")),
+            "plate + month": lambda: list(history.query(START, START + timedelta(days=30), plate="P000123")),
+        }
+        print(f"\n{rows} rows loaded in {load:.2f}s")
+        print(f"{'query':<22} {'rows':>6} {'ms':>8}")
+        for name, func in queries.items():
+            func()
+            start = time.perf_counter()
+            result = func()
+            print(f"{name:<22} {len(result):>6} {(time.perf_counter() - start) * 1000:>8.2f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the generation history.")
+    parser.add_argument("-n", "--writes", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_write(os.path.join(tmp, "write.db"), args.writes)
+        bench_query(os.path.join(tmp, "query.db"), args.rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
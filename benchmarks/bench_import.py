@@ -0,0 +1,70 @@
+"""Tiempo de arranque en frío de los módulos de ``truck_qr``
+
+Importa cada módulo en un intérprete nuevo (con ``-X importtime``) y muestra
+el tiempo de la importación y si arrastra ``qrcode``, PIL o Streamlit. Los procesos de validación, check-in, histórico y envío a Boomi
+no deberían cargar ninguna librería de imagen.
+
+Uso:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py -r 10 truck_qr.record truck_qr.api
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "truck_qr",
+    "truck_qr.record",
+    "truck_qr.codec",
+    "truck_qr.checkin",
+    "truck_qr.history",
+    "truck_qr.delivery",
+    "truck_qr.batch",
+    "truck_qr.labels",
+    "truck_qr.api",
+]
+HEAVY = ("qrcode", "PIL", "streamlit")
+
+
+def import_profile(module: str):
+    """Tiempo (ms) de importar ``module`` en un intérprete nuevo y las librerías pesadas que carga"""
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip().split(".")[0]
+            if name in HEAVY:
+                loaded.add(name)
+    return float(result.stdout), loaded
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure cold import time of the truck_qr modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<20} {'median ms':>10} {'min ms':>8}   heavy imports")
+    for module in args.modules:
+        samples = []
+        for _ in range(args.repeat):
+            total, loaded = import_profile(module)
+            samples.append(total)
+        print(f"{module:<20} {statistics.median(samples):>10.1f} {min(samples):>8.1f}   "
+              f"{', '.join(sorted(loaded)) or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Compara el parser de items en streaming con la implementación anterior
+
+Para cada tamaño de manifiesto mide el tiempo medio y el pico de memoria
+(``tracemalloc``) de ``TruckQRGenerator.validate_items`` frente a la versión
+original basada en ``split(',')``, con entradas válidas y con un 50 % de
+items erróneos.
+
+Uso:
+    python benchmarks/bench_items.py
+    python benchmarks/bench_items.py --sizes 100 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.generator import TruckQRGenerator
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+
+
+def legacy_validate_items(items_raw: str) -> Tuple[bool, List[Dict], List[str]]:
+    """Implementación original (lista intermedia y un error por fallo, sin límite)"""
+    errors = []
+    item_list = []
+
+    if not items_raw or not items_raw.strip():
+        return False, [], ["The 'Items' field is required."]
+
+    raw_items = [item.strip() for item in items_raw.split(',') if item.strip()]
+
+    if not raw_items:
+        return False, [], ["The 'Items' field is required and does not contain valid items."]
+
+    seen_items = set()
+
+    for item_entry in raw_items:
+        parts = item_entry.split(':')
+        if len(parts) != 2:
+            errors.append(f"Invalid item format: '{item_entry}'. Use 'SKU:Quantity'.")
+            continue
+
+        item_id = parts[0].strip().upper()
+        quantity_str = parts[1].strip()
+
+        if not TruckQRGenerator.ITEM_ID_PATTERN.match(item_id):
+            errors.append(f"Invalid item ID format: '{item_id}'. Use only letters, numbers, hyphens and underscores.")
+            continue
+
+        if item_id in seen_items:
+            errors.append(f"Duplicate item ID: '{item_id}'.")
+            continue
+
+        seen_items.add(item_id)
+
+        try:
+            quantity = int(quantity_str)
+            if quantity <= 0:
+                errors.append(f"Quantity for '{item_id}' must be a positive number.")
+                continue
+
+            item_list.append({"item_id": item_id, "quantity": quantity})
+        except ValueError:
+            errors.append(f"Quantity '{quantity_str}' for '{item_id}' is not a valid number.")
+
+    return len(errors) == 0, item_list, errors
+
+
+def make_items(size: int, invalid_ratio: float) -> str:
+    """Genera un manifiesto 'SKU:Quantity' con la proporción de errores indicada"""
+    step = int(1 / invalid_ratio) if invalid_ratio else 0
+    parts = []
+    for i in range(size):
+        if step and i % step == 0:
+            parts.append(f"SKU{i:06d}:abc")
+        else:
+            parts.append(f"SKU{i:06d}:{i % 50 + 1}")
+    return ", ".join(parts)
+
+
+def measure(func, items_raw: str, repeat: int) -> Tuple[float, int]:
+    """Devuelve (ms por llamada, pico de memoria en KiB)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(items_raw)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(items_raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak // 1024
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark validate_items against the legacy implementation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>8} {'invalid':>8} {'legacy ms':>10} {'new ms':>10} {'legacy KiB':>11} {'new KiB':>9}")
+    for size in args.sizes:
+        repeat = max(1, 20000 // size)
+        for invalid_ratio in (0.0, 0.5):
+            items_raw = make_items(size, invalid_ratio)
+            legacy_ms, legacy_kib = measure(legacy_validate_items, items_raw, repeat)
+            new_ms, new_kib = measure(TruckQRGenerator.validate_items, items_raw, repeat)
+            print(f"{size:>8} {invalid_ratio:>8.0%} {legacy_ms:>10.3f} {new_ms:>10.3f} {legacy_kib:>11} {new_kib:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
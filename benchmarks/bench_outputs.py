@@ -0,0 +1,80 @@
+"""Compara tiempo y tamaño de los formatos de salida del QR
+
+Para cada tamaño de manifiesto mide por separado la construcción de la matriz
+(``qr.make``, común a todos) y la codificación de cada formato, junto con los
+bytes resultantes y los del data URI en base64 que se enviaría al navegador.
+
+Uso:
+    python benchmarks/bench_outputs.py
+    python benchmarks/bench_outputs.py --items 5 50 --codec b45 -r 5
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.codec import encode_payload
+from truck_qr.generator import TruckQRGenerator
+from truck_qr.output import OUTPUT_FORMATS, matrix_to_bytes, matrix_to_png, matrix_to_svg
+
+
+def sample_payload(items: int) -> dict:
+    return {
+        "plate": "ABC-123",
+        "driverName": "John Doe",
+        "customer_id": "CUST001",
+        "date_time_at_gate": datetime(2024, 5, 1, 9, 5).strftime(TruckQRGenerator.BOOMI_CONFIG['date_format']),
+        "item_list": [{"item_id": f"SKU{i:05d}", "quantity": i % 50 + 1} for i in range(items)],
+    }
+
+
+def _best(func, repeat: int):
+    """Mejor tiempo (ms) de ``repeat`` ejecuciones y el último resultado"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare QR output backends (time and size).")
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--codec", default="json")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    box_size = TruckQRGenerator.QR_RENDER_CONFIG['box_size']
+    print(f"{'items':>6} {'version':>8} {'format':>9} {'encode ms':>10} {'total ms':>9} {'bytes':>8} {'data URI':>9}")
+    for items in args.items:
+        payload = encode_payload(sample_payload(items), args.codec)
+        make_ms, qr = _best(lambda: TruckQRGenerator.build_qr(payload), args.repeat)
+        matrix = qr.get_matrix()
+
+        encoders = {
+            "png": lambda: TruckQRGenerator.render_png(payload),
+            "png-fast": lambda: matrix_to_png(matrix, box_size),
+            "svg": lambda: matrix_to_svg(matrix, box_size),
+            "matrix": lambda: matrix_to_bytes(matrix),
+        }
+        for output_format in OUTPUT_FORMATS:
+            encode_ms, content = _best(encoders[output_format], args.repeat)
+            # El PNG original incluye la construcción de la matriz en su tiempo
+            total_ms = encode_ms if output_format == "png" else make_ms + encode_ms
+            if output_format == "png":
+                encode_ms = max(0.0, encode_ms - make_ms)
+            data_uri = len(base64.b64encode(content))
+            print(f"{items:>6} {qr.version:>8} {output_format:>9} {encode_ms:>10.2f} {total_ms:>9.2f} "
+                  f"{len(content):>8} {data_uri:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
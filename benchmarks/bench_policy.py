@@ -0,0 +1,75 @@
+"""Tamaño y tiempo de render: configuración fija frente a ``truck_qr.policy``
+
+Para manifiestos de distinto tamaño y cada codec compara la versión, el
+nivel de corrección, los píxeles y el tiempo de ``render_png`` con
+``QR_RENDER_CONFIG`` (EC M, segmentación por defecto de ``qrcode``) y con la
+configuración elegida por ``choose_settings``.
+
+Uso:
+    python benchmarks/bench_policy.py
+    python benchmarks/bench_policy.py --items 1 5 20 60 --max-version 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.codec import CODECS, encode_payload, qr_stats
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.policy import QRPolicy, choose_settings
+
+
+def sample(items: int) -> dict:
+    return {
+        "plate": "ABC-123",
+        "driverName": "John Doe",
+        "customer_id": "CUST0001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{j:04d}", "quantity": j + 1} for j in range(items)],
+    }
+
+
+def _time_ms(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the fixed QR settings with the adaptive policy.")
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 5, 20, 60])
+    parser.add_argument("--max-version", type=int, default=None)
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    policy = QRPolicy(max_version=args.max_version)
+    config = TruckQRGenerator.QR_RENDER_CONFIG
+    print(f"{'items':>5} {'codec':<6} {'fixed':>14} {'ms':>7}   {'adaptive':>14} {'ms':>7} {'choose ms':>9}")
+    for items in args.items:
+        for codec in CODECS:
+            payload = encode_payload(sample(items), codec)
+            version, modules = qr_stats(payload, config['error_correction'])
+            if version is None:
+                fixed, fixed_ms = "too large", float("nan")
+            else:
+                fixed = f"M v{version} {(modules + 2 * config['border']) * config['box_size']}px"
+                fixed_ms = _time_ms(lambda: TruckQRGenerator.render_png(payload), args.repeat)
+            try:
+                settings = choose_settings(payload, policy)
+            except ValidationError:
+                print(f"{items:>5} {codec:<6} {fixed:>14} {fixed_ms:>7.2f}   {'too large':>14}")
+                continue
+            adaptive = f"{settings.ec_level} v{settings.version} {settings.pixels}px"
+            adaptive_ms = _time_ms(lambda: TruckQRGenerator.render_png(payload, settings), args.repeat)
+            choose_ms = _time_ms(lambda: choose_settings.__wrapped__(payload, policy), args.repeat)
+            print(f"{items:>5} {codec:<6} {fixed:>14} {fixed_ms:>7.2f}   {adaptive:>14} {adaptive_ms:>7.2f} {choose_ms:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
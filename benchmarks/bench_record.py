@@ -0,0 +1,107 @@
+"""Mide registros/segundo de la validación de un registro completo
+
+Compara el camino anterior (los ``validate_*`` por campo seguidos de una
+segunda normalización para construir el payload) con
+``truck_qr.record.validate_record``, que normaliza cada campo una sola vez.
+
+Uso:
+    python benchmarks/bench_record.py
+    python benchmarks/bench_record.py -n 50000 --items 1 10 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.generator import TruckQRGenerator
+from truck_qr.record import datetime_parts, items_raw, validate_record
+
+
+def sample_record(items: int) -> dict:
+    return {
+        "plate": " abc-123 ",
+        "driverName": " john o'neil ",
+        "customer_id": "cust001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "truckType": "Type A",
+        "company": " Logistics Inc. ",
+        "deliveryOrderRef": "do-2024-001",
+        "items": ", ".join(f"SKU{i:05d}:{i % 50 + 1}" for i in range(items)),
+    }
+
+
+def legacy_validate(record: dict):
+    """Camino anterior: validadores por campo y normalización repetida al construir el payload"""
+    g = TruckQRGenerator
+    errors = []
+    plate, driver = record["plate"], record["driverName"]
+    customer_id, company = record["customer_id"], record["company"]
+    delivery_ref, truck_type = record["deliveryOrderRef"], record["truckType"].strip()
+    if not g.validate_plate(plate):
+        errors.append("plate")
+    if not g.validate_driver_name(driver):
+        errors.append("driverName")
+    if not g.validate_customer_id(customer_id):
+        errors.append("customer_id")
+    if not g.validate_company(company):
+        errors.append("company")
+    if not g.validate_delivery_ref(delivery_ref):
+        errors.append("deliveryOrderRef")
+    if truck_type and truck_type not in g.BOOMI_CONFIG['truck_types']:
+        errors.append("truckType")
+    ok, dt_iso, dt_errors = g.validate_datetime(*datetime_parts(record))
+    errors.extend(dt_errors)
+    ok, item_list, item_errors = g.validate_items(items_raw(record))
+    errors.extend(item_errors)
+    if errors:
+        return None, errors
+    data = {
+        "plate": plate.strip().upper(),
+        "driverName": driver.strip().title(),
+        "customer_id": customer_id.strip().upper(),
+        "date_time_at_gate": dt_iso,
+        "item_list": item_list,
+    }
+    if truck_type:
+        data["truckType"] = truck_type
+    if company.strip():
+        data["company"] = company.strip()
+    if delivery_ref.strip():
+        data["deliveryOrderRef"] = delivery_ref.strip().upper()
+    return data, []
+
+
+def _rate(func, record: dict, count: int, repeat: int) -> float:
+    """Mejor tasa (registros/s) de ``repeat`` series de ``count`` validaciones"""
+    func(record)  # calentamiento
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            func(record)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark whole-record validation throughput.")
+    parser.add_argument("-n", "--records", type=int, default=20000)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>6} {'legacy rec/s':>13} {'record rec/s':>13} {'speedup':>8}")
+    for items in args.items:
+        record = sample_record(items)
+        count = max(100, args.records // max(1, items))
+        legacy = _rate(legacy_validate, record, count, args.repeat)
+        single = _rate(validate_record, record, count, args.repeat)
+        print(f"{items:>6} {legacy:>13.0f} {single:>13.0f} {single / legacy:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Mide el tiempo de rerun del script de Streamlit y lo que ahorra el fragmento
+
+Simula a un empleado de puerta rellenando el formulario: cada interacción con
+un widget provoca un rerun. Se reporta la mediana/p95 de la primera ejecución
+y de cada interacción:
+
+    full rerun       tiempo de ``AppTest.run()`` (reejecuta todo el script)
+    script body      cuerpo del script en un rerun completo (etapa ``script_run``)
+    fragment rerun   cuerpo de ``render_form`` (etapa ``form_rerun``), que es lo
+                     único que se reejecuta en el navegador al tocar un widget
+
+``AppTest`` no modela los reruns de un fragmento (siempre ejecuta el script
+entero), así que el coste de un rerun de fragmento se toma de las etapas que
+el script registra en ``truck_qr.metrics``; la diferencia entre "script body"
+y "fragment rerun" es lo que el fragmento deja de ejecutar en cada
+interacción. Los scripts anteriores al fragmento solo dan "full rerun".
+
+Uso:
+    python benchmarks/bench_rerun.py                      # qr-generator.py actual
+    python benchmarks/bench_rerun.py otra_version.py -n 50
+
+Para comparar con una versión anterior:
+    git show <commit>:qr-generator.py > /tmp/before.py
+    python benchmarks/bench_rerun.py /tmp/before.py
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Optional
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from truck_qr import metrics
+
+DEFAULT_SCRIPT = os.path.join(ROOT, "qr-generator.py")
+
+# Interacciones típicas del formulario (clave del widget, tipo, valor)
+INTERACTIONS = [
+    ("plate_input", "text_input", "ABC-123"),
+    ("driver_input", "text_input", "John Doe"),
+    ("customer_id_input", "text_input", "CUST001"),
+    ("company_input", "text_input", "Logistics Inc."),
+    ("delivery_ref_input", "text_input", "DO-2024-001"),
+    ("items_input", "text_area", "ITEM001:10, ITEM002:5, ITEM003:7"),
+]
+# Etapas que registra qr-generator.py: script completo y cuerpo del fragmento
+STAGES = ("script_run", "form_rerun")
+
+
+def _timed_run(at: AppTest) -> float:
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+
+class _Stages:
+    """Duración de las etapas del script registradas desde la última lectura"""
+
+    def __init__(self):
+        self._last = {stage: (0, 0.0) for stage in STAGES}
+
+    def read(self) -> dict:
+        elapsed = {}
+        for stage in STAGES:
+            count, total = metrics.registry.histogram(metrics.STAGE_SECONDS, stage=stage)
+            last_count, last_total = self._last[stage]
+            if count > last_count:
+                elapsed[stage] = total - last_total
+            self._last[stage] = (count, total)
+        return elapsed
+
+
+def summary(values) -> Optional[dict]:
+    if not values:
+        return None
+    values = sorted(v * 1000 for v in values)
+    return {
+        "median_ms": round(statistics.median(values), 2),
+        "p95_ms": round(values[int(0.95 * (len(values) - 1))], 2),
+    }
+
+
+def measure(script: str, rounds: int) -> dict:
+    """Devuelve los tiempos (ms) de primera ejecución y de rerun por interacción"""
+    # Los imports del script se resuelven relativos al repositorio
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    # El script registra sus etapas en el registro de este mismo proceso
+    metrics.registry.enabled = True
+    metrics.registry.reset()
+    stages = _Stages()
+
+    first_runs = []
+    reruns = []
+    bodies = []
+    fragments = []
+    for _ in range(rounds):
+        at = AppTest.from_file(script, default_timeout=60)
+        first_runs.append(_timed_run(at))
+        stages.read()
+        for key, kind, value in INTERACTIONS:
+            getattr(at, kind)(key=key).input(value)
+            reruns.append(_timed_run(at))
+            elapsed = stages.read()
+            if "script_run" in elapsed:
+                bodies.append(elapsed["script_run"])
+            if "form_rerun" in elapsed:
+                fragments.append(elapsed["form_rerun"])
+
+    return {
+        "script": script,
+        "rounds": rounds,
+        "first_run": summary(first_runs),
+        "rerun": summary(reruns),
+        "script_body": summary(bodies),
+        "fragment_rerun": summary(fragments),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure Streamlit rerun time of the QR form.")
+    parser.add_argument("script", nargs="?", default=DEFAULT_SCRIPT)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    result = measure(os.path.abspath(args.script), args.rounds)
+    print(f"{result['script']} ({result['rounds']} rounds)")
+    for label, key in (("first run", "first_run"), ("full rerun", "rerun"), ("script body", "script_body"),
+                       ("fragment rerun", "fragment_rerun")):
+        if result[key] is None:
+            print(f"  {label + ':':<16}not instrumented")
+        else:
+            print(f"  {label + ':':<16}median {result[key]['median_ms']} ms, p95 {result[key]['p95_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
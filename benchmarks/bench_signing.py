@@ -0,0 +1,111 @@
+"""Coste de firmar y verificar payloads: por lectura en puerta y en lote
+
+Para cada codec mide, con un manifiesto típico, lo que cuesta en puerta una
+lectura firmada (decodificar + verificar) frente a una sin firma, cuántos
+bytes añade la firma al QR y el coste de firmar al generar. Después verifica
+en lote ``--batch`` payloads ya decodificados con ``verify_many`` (p. ej. un
+reproceso de las lecturas de un día) y reporta verificaciones/segundo.
+
+Ed25519 solo se mide si está instalado ``cryptography``.
+
+Uso:
+    python benchmarks/bench_signing.py
+    python benchmarks/bench_signing.py --items 5 50 --batch 50000 --algorithm hmac
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.codec import CODECS, decode_payload, encode_payload
+from truck_qr.signing import (ALGORITHMS, Keyring, canonical_bytes, generate_key, parse_key, sign_payload,
+                              verify_many, verify_signature)
+
+
+def payload(n: int, items: int) -> dict:
+    return {
+        "plate": f"T{n % 10000:04d}-AB",
+        "driverName": "John Doe",
+        "customer_id": f"CUST{n % 500:04d}",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{(n + j) % 5000:05d}", "quantity": (n + j) % 97 + 1} for j in range(items)],
+        "company": "Logistics Inc.",
+    }
+
+
+def _time_us(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1e6 / repeat
+
+
+def load_key(algorithm: str):
+    try:
+        key = parse_key(generate_key(algorithm, "k1")["signing"])
+        key.sign(b"")
+    except RuntimeError as e:
+        print(f"\n{algorithm}: skipped ({e})")
+        return None
+    return key
+
+
+def per_scan(key, items: int, repeat: int) -> None:
+    ring = Keyring([key], required=True)
+    data = payload(0, items)
+    signed = sign_payload(data, key)
+    sign_us = _time_us(lambda: sign_payload(data, key), repeat)
+    print(f"\n{key.algorithm}, {items} items: sign {sign_us:.1f} us")
+    print(f"{'codec':<7}{'bytes':>7}{'+sig':>6}{'decode us':>11}{'+verify us':>12}")
+    for codec in CODECS:
+        plain, text = encode_payload(data, codec), encode_payload(signed, codec)
+        decode_us = _time_us(lambda: decode_payload(plain), repeat)
+        verify_us = _time_us(lambda: verify_signature(decode_payload(text), ring), repeat)
+        assert verify_signature(decode_payload(text), ring) is None
+        print(f"{codec:<7}{len(text):>7}{len(text) - len(plain):>6}{decode_us:>11.1f}{verify_us:>12.1f}")
+
+
+def batch(key, items: int, size: int) -> None:
+    ring = Keyring([key], required=True)
+    signed = [sign_payload(payload(n, items), key) for n in range(size)]
+    # Una de cada 100 lecturas con una cantidad alterada
+    for data in signed[::100]:
+        data["item_list"] = [dict(data["item_list"][0], quantity=999)] + data["item_list"][1:]
+
+    start = time.perf_counter()
+    results = verify_many(signed, ring)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    single = [verify_signature(data, ring) for data in signed]
+    single_elapsed = time.perf_counter() - start
+    assert results == single
+    tampered = sum(1 for r in results if r is not None)
+    print(f"{key.algorithm}, {items} items: verify_many {size / elapsed:,.0f}/s, "
+          f"verify_signature {size / single_elapsed:,.0f}/s ({tampered} tampered, "
+          f"{len(canonical_bytes(signed[1]))} canonical bytes)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure QR signing and verification costs.")
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--batch", type=int, default=50000, help="Payloads verified in the batch test")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, nargs="+", default=list(ALGORITHMS))
+    parser.add_argument("-r", "--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    keys = [key for key in map(load_key, args.algorithm) if key is not None]
+    for key in keys:
+        for items in args.items:
+            per_scan(key, items, args.repeat)
+    print(f"\nbatch of {args.batch} decoded payloads:")
+    for key in keys:
+        for items in args.items:
+            batch(key, items, args.batch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Prueba de carga del servicio HTTP de generación de QR
+
+Lanza ``--concurrency`` conexiones keep-alive contra una instancia local y
+reporta la latencia p50/p99 y las peticiones por segundo.
+
+Uso:
+    pip install -r requirements-api.txt
+    uvicorn truck_qr.api:app --port 8000 &
+    python benchmarks/load_api.py --url http://127.0.0.1:8000 -n 500 -c 16
+    python benchmarks/load_api.py --endpoint /validate -n 5000 -c 32
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+
+def sample_record(items: int) -> dict:
+    """Registro válido de referencia con ``items`` SKUs"""
+    gate_time = datetime.now() - timedelta(hours=1)
+    return {
+        "plate": "ABC-123",
+        "driverName": "John Doe",
+        "customer_id": "CUST001",
+        "date_time_at_gate": gate_time.strftime("%Y-%m-%dT%H:%M:00"),
+        "truckType": "Type A",
+        "company": "Logistics Inc.",
+        "deliveryOrderRef": "DO-2024-001",
+        "items": ", ".join(f"SKU{i:05d}:{i % 50 + 1}" for i in range(items)),
+    }
+
+
+async def _request(reader, writer, host: str, path: str, body: bytes) -> int:
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(host: str, port: int, path: str, body: bytes, queue: "asyncio.Queue[int]",
+                  results: List[Tuple[float, int]]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, path, body)
+            results.append((time.perf_counter() - start, status))
+    finally:
+        writer.close()
+
+
+async def run(url: str, endpoint: str, requests: int, concurrency: int, items: int, codec: str) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    body = sample_record(items)
+    body["codec"] = codec
+    if endpoint == "/batch":
+        body = {"records": [sample_record(items) for _ in range(10)], "codec": codec}
+    payload = json.dumps(body).encode()
+
+    queue: "asyncio.Queue[int]" = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    results: List[Tuple[float, int]] = []
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, endpoint, payload, queue, results) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        "endpoint": endpoint,
+        "requests": len(results),
+        "concurrency": concurrency,
+        "errors": sum(1 for _, status in results if status != 200),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 2),
+        "rps": round(len(results) / elapsed, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the QR HTTP service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="/qr", choices=["/qr", "/validate", "/batch"])
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--items", type=int, default=10, help="SKUs per record")
+    parser.add_argument("--codec", default="json")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args.url, args.endpoint, args.requests, args.concurrency, args.items, args.codec))
+    print(json.dumps(result, indent=2))
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Prueba de carga del pool de renderizado compartido con varias plantas
+
+Simula sesiones de Streamlit concurrentes (un hilo por sesión) repartidas
+entre tenants: por defecto una planta con una ráfaga de 40 sesiones y dos
+plantas tranquilas con 3 sesiones cada una. Cada sesión genera ``--jobs``
+QR distintos (sin caché) y, si el pool responde ``PoolBusy``, espera y lo
+vuelve a intentar como haría el usuario.
+
+Compara el renderizado dentro de cada sesión (comportamiento sin
+``TRUCK_QR_RENDER_WORKERS``) con ``RenderPool`` y reporta por tenant la
+latencia p50/p95/máx. de los QR generados y los rechazos por contrapresión.
+
+Uso:
+    python benchmarks/load_pool.py
+    python benchmarks/load_pool.py --tenants yard-a=40 yard-b=3 yard-c=3 --workers 2 --jobs 5
+    python benchmarks/load_pool.py --mode pool --tenant-queue 8 --items 60
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from truck_qr.pool import PoolBusy, RenderPool, TenantQuota, render_record
+
+
+def sample(tenant: str, session: int, job: int, items: int) -> dict:
+    return {
+        "plate": f"T{session:03d}-{job:02d}",
+        "driverName": "John Doe",
+        "customer_id": tenant.upper(),
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{i:04d}", "quantity": session * 100 + job + i + 1} for i in range(items)],
+    }
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+def simulate(tenants: Dict[str, int], jobs: int, items: int, pool: RenderPool = None,
+             retry_delay: float = 0.2) -> Dict[str, Dict]:
+    """Lanza todas las sesiones a la vez y devuelve latencias y rechazos por tenant"""
+    results = {tenant: {"latencies": [], "rejected": 0} for tenant in tenants}
+    lock = threading.Lock()
+    start = threading.Barrier(sum(tenants.values()))
+
+    def session(tenant: str, number: int) -> None:
+        start.wait()
+        for job in range(jobs):
+            data = sample(tenant, number, job, items)
+            began = time.perf_counter()
+            while True:
+                try:
+                    if pool is None:
+                        render_record(data, cache=None)
+                    else:
+                        pool.run(tenant, render_record, data, cache=None)
+                    break
+                except PoolBusy:
+                    with lock:
+                        results[tenant]["rejected"] += 1
+                    time.sleep(retry_delay)
+            with lock:
+                results[tenant]["latencies"].append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=session, args=(tenant, number))
+               for tenant, sessions in tenants.items() for number in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label: str, results: Dict[str, Dict], elapsed: float) -> None:
+    total = sum(len(r["latencies"]) for r in results.values())
+    print(f"\n{label}: {total} QR in {elapsed:.1f}s ({total / elapsed:.1f} QR/s)")
+    print(f"{'tenant':<10}{'QR':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'rejected':>10}")
+    for tenant, r in results.items():
+        latencies = r["latencies"]
+        print(f"{tenant:<10}{len(latencies):>6}{_percentile(latencies, 0.5) * 1000:>10.0f}"
+              f"{_percentile(latencies, 0.95) * 1000:>10.0f}{max(latencies) * 1000:>10.0f}{r['rejected']:>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the shared render pool with several tenants.")
+    parser.add_argument("--tenants", nargs="+", default=["yard-a=40", "yard-b=3", "yard-c=3"],
+                        help="name=sessions for each tenant")
+    parser.add_argument("--jobs", type=int, default=3, help="QR codes generated by each session")
+    parser.add_argument("--items", type=int, default=20, help="Items per manifest")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tenant-queue", type=int, default=TenantQuota().max_pending)
+    parser.add_argument("--mode", choices=["both", "session", "pool"], default="both")
+    args = parser.parse_args(argv)
+
+    tenants = {}
+    for entry in args.tenants:
+        name, _, sessions = entry.partition("=")
+        tenants[name] = int(sessions or 1)
+    print(f"{sum(tenants.values())} sessions x {args.jobs} QR ({args.items} items); "
+          f"pool: {args.workers} workers, {args.tenant_queue} queued per tenant")
+
+    if args.mode in ("both", "session"):
+        began = time.perf_counter()
+        results = simulate(tenants, args.jobs, args.items)
+        report("in-session rendering", results, time.perf_counter() - began)
+
+    if args.mode in ("both", "pool"):
+        with RenderPool(args.workers, TenantQuota(args.tenant_queue)) as pool:
+            # Arranque de los workers fuera de la medición
+            pool.run(None, render_record, sample("warm", 0, 0, 1), cache=None)
+            began = time.perf_counter()
+            results = simulate(tenants, args.jobs, args.items, pool)
+            report("shared pool", results, time.perf_counter() - began)
+            print(f"pool stats: {pool.stats()['tenants']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,447 @@
+"""Suite de benchmarks reproducible para los caminos críticos de validación y QR
+
+Cubre los validadores de campos, ``validate_datetime``, ``validate_items``,
+``validate_record`` (con registros/segundo) y
+``generate_qr_optimized`` para distintos tamaños de payload (1 a 5.000 items),
+niveles de corrección de errores y ``box_size``. Los datos de entrada son
+deterministas y el resultado es un JSON que se puede comparar entre commits.
+
+Uso:
+    python benchmarks/suite.py run -o results/HEAD.json
+    python benchmarks/suite.py run --quick -o /tmp/quick.json
+    python benchmarks/suite.py compare results/main.json results/HEAD.json --threshold 0.10
+    python benchmarks/suite.py baseline
+    python benchmarks/suite.py gate --time-threshold 0.5 --memory-threshold 0.2
+
+``compare`` termina con código 1 si algún caso empeora más que el umbral.
+
+``gate`` es la puerta de regresión: mide el tiempo (mínimo de las muestras,
+el menos sensible al ruido) y el pico de memoria de Python (``tracemalloc``)
+de ``generate_qr_optimized`` y ``validate_items`` para tamaños de referencia
+(incluidos payloads al límite de la versión 40) y los compara con la línea
+base guardada en ``benchmarks/baseline.json`` (``baseline`` la regenera).
+Termina con código 1 si algún caso supera la línea base más el umbral y con
+código 2 si la línea base se grabó en otro entorno (Python, qrcode, Pillow,
+arquitectura o número de CPU), donde los tiempos no son comparables.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, datetime
+from importlib import metadata
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import qrcode
+
+from truck_qr.codec import encode_payload
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.record import validate_record
+
+SCHEMA_VERSION = 1
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+ITEM_SIZES = [1, 10, 100, 1000, 5000]
+QUICK_ITEM_SIZES = [1, 100, 1000]
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+BOX_SIZES = [4, 8]
+GENERATION_CODECS = ["json", "b45"]
+
+# Puerta de regresión: (codec, items) de referencia; 33 y 906 items son el
+# máximo que cabe en la versión 40 con ``payload`` en json y b45
+GATE_GENERATE_CASES = [("json", 1), ("json", 33), ("b45", 100), ("b45", 906)]
+GATE_ITEM_SIZES = [1000, 100_000]
+GATE_TIME_THRESHOLD = 0.5
+GATE_MEMORY_THRESHOLD = 0.2
+GATE_RETRIES = 2
+
+
+# --- Datos de entrada deterministas ---
+
+def items_raw(size: int) -> str:
+    return ", ".join(f"SKU{i:05d}:{i % 97 + 1}" for i in range(size))
+
+
+def payload(size: int) -> Dict:
+    return {
+        "plate": "ABC-123",
+        "driverName": "John Doe",
+        "customer_id": "CUST001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{i:05d}", "quantity": i % 97 + 1} for i in range(size)],
+        "truckType": "Type A",
+        "company": "Logistics Inc.",
+        "deliveryOrderRef": "DO-2024-001",
+    }
+
+
+@contextmanager
+def render_config(**overrides) -> Iterator[None]:
+    """Sustituye temporalmente la configuración de renderizado del generador"""
+    original = TruckQRGenerator.QR_RENDER_CONFIG
+    TruckQRGenerator.QR_RENDER_CONFIG = {**original, **overrides}
+    try:
+        yield
+    finally:
+        TruckQRGenerator.QR_RENDER_CONFIG = original
+
+
+# --- Medición ---
+
+def measure(func: Callable[[], object], repeat: int, inner: int = 1) -> Dict:
+    """Ejecuta ``func`` ``inner`` veces por muestra y devuelve estadísticas en ms por llamada"""
+    func()  # calentamiento
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(inner):
+                func()
+            samples.append((time.perf_counter() - start) * 1000 / inner)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "min_ms": round(min(samples), 4),
+        "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "inner": inner,
+    }
+
+
+def peak_memory_kib(func: Callable[[], object]) -> int:
+    """Pico de memoria reservada por Python durante una llamada (sin los buffers nativos de PIL)"""
+    func()  # calentamiento: imports y cachés fuera de la medición
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _case(name: str, params: Dict, stats: Optional[Dict] = None, skipped: Optional[str] = None) -> Dict:
+    case = {"name": name, "params": params}
+    if skipped:
+        case["skipped"] = skipped
+    else:
+        case.update(stats)
+    return case
+
+
+def case_key(case: Dict) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(case["params"].items()))
+    return f"{case['name']}[{params}]"
+
+
+# --- Casos ---
+
+def bench_field_validators(repeat: int) -> List[Dict]:
+    g = TruckQRGenerator
+    cases = {
+        "validate_plate": lambda: g.validate_plate(" abc-123 "),
+        "validate_driver_name": lambda: g.validate_driver_name(" John O'Neil-Smith "),
+        "validate_customer_id": lambda: g.validate_customer_id(" cust_001 "),
+        "validate_delivery_ref": lambda: g.validate_delivery_ref(" do-2024-001 "),
+        "validate_company": lambda: g.validate_company(" Logistics Inc. "),
+    }
+    return [_case(name, {}, measure(func, repeat, inner=2000)) for name, func in cases.items()]
+
+
+def bench_validate_datetime(repeat: int) -> List[Dict]:
+    gate_date = date(2024, 5, 1)
+    results = []
+    for ampm in ("AM", "PM"):
+        func = lambda: TruckQRGenerator.validate_datetime(gate_date, "09", "05", ampm)
+        results.append(_case("validate_datetime", {"ampm": ampm}, measure(func, repeat, inner=2000)))
+    return results
+
+
+def bench_validate_items(repeat: int, sizes: List[int]) -> List[Dict]:
+    results = []
+    for size in sizes:
+        raw = items_raw(size)
+        inner = max(1, 2000 // size)
+        results.append(_case("validate_items", {"items": size},
+                             measure(lambda: TruckQRGenerator.validate_items(raw), repeat, inner)))
+    return results
+
+
+def bench_validate_record(repeat: int, sizes: List[int]) -> List[Dict]:
+    results = []
+    for size in sizes:
+        record = {**payload(0), "item_list": None, "items": items_raw(size)}
+        inner = max(1, 2000 // size)
+        stats = measure(lambda: validate_record(record), repeat, inner)
+        stats["records_per_s"] = round(1000 / stats["median_ms"]) if stats["median_ms"] else None
+        results.append(_case("validate_record", {"items": size}, stats))
+    return results
+
+
+def bench_generate(repeat: int, sizes: List[int], levels: List[str], box_sizes: List[int],
+                   codecs: List[str]) -> List[Dict]:
+    results = []
+    for codec in codecs:
+        for size in sizes:
+            data = payload(size)
+            for level in levels:
+                for box_size in box_sizes:
+                    params = {"codec": codec, "items": size, "ec": level, "box_size": box_size}
+                    with render_config(error_correction=ERROR_CORRECTION_LEVELS[level], box_size=box_size):
+                        try:
+                            TruckQRGenerator.generate_qr_optimized(data, codec)
+                        except ValidationError:
+                            results.append(_case("generate_qr_optimized", params, skipped="exceeds QR capacity"))
+                            continue
+                        stats = measure(lambda: TruckQRGenerator.generate_qr_optimized(data, codec), repeat)
+                    qr = qrcode.QRCode(error_correction=ERROR_CORRECTION_LEVELS[level])
+                    qr.add_data(encode_payload(data, codec))
+                    stats["qr_version"] = qr.best_fit()
+                    results.append(_case("generate_qr_optimized", params, stats))
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment() -> Dict:
+    """Entorno del que dependen los tiempos y la memoria medidos"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "qrcode": _package_version("qrcode"),
+        "pillow": _package_version("Pillow"),
+    }
+
+
+def run_suite(quick: bool = False, repeat: Optional[int] = None) -> Dict:
+    repeat = repeat or (3 if quick else 7)
+    sizes = QUICK_ITEM_SIZES if quick else ITEM_SIZES
+    levels = ["L", "H"] if quick else list(ERROR_CORRECTION_LEVELS)
+    box_sizes = [8] if quick else BOX_SIZES
+
+    results = []
+    results += bench_field_validators(repeat)
+    results += bench_validate_datetime(repeat)
+    results += bench_validate_items(repeat, sizes)
+    results += bench_validate_record(repeat, sizes)
+    results += bench_generate(max(1, repeat // 2), sizes, levels, box_sizes, GENERATION_CODECS)
+
+    return {
+        "schema": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qrcode": _package_version("qrcode"),
+        "pillow": _package_version("Pillow"),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def gate_cases() -> List[Tuple[str, Dict, Callable[[], object]]]:
+    """Casos de referencia de la puerta de regresión: (nombre, parámetros, función)"""
+    cases = []
+    for codec, size in GATE_GENERATE_CASES:
+        data = payload(size)
+        cases.append(("generate_qr_optimized", {"codec": codec, "items": size},
+                      lambda data=data, codec=codec: TruckQRGenerator.generate_qr_optimized(data, codec)))
+    for size in GATE_ITEM_SIZES:
+        raw = items_raw(size)
+        cases.append(("validate_items", {"items": size}, lambda raw=raw: TruckQRGenerator.validate_items(raw)))
+    return cases
+
+
+def run_gate(repeat: int = 5) -> Dict:
+    """Mide los casos de referencia de la puerta de regresión (tiempo y pico de memoria)"""
+    results = []
+    for name, params, func in gate_cases():
+        stats = measure(func, repeat)
+        stats["peak_kib"] = peak_memory_kib(func)
+        results.append(_case(name, params, stats))
+    return {
+        "schema": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def environment_mismatch(baseline: Dict) -> List[str]:
+    """Claves del entorno que difieren de las de la línea base"""
+    current = environment()
+    recorded = baseline.get("environment", {})
+    return [key for key in current if recorded.get(key) != current[key]]
+
+
+def _slower(case: Dict, base: Optional[Dict], threshold: float) -> bool:
+    return base is not None and case["min_ms"] > base["min_ms"] * (1 + threshold)
+
+
+def gate(baseline: Dict, repeat: int = 5, time_threshold: float = GATE_TIME_THRESHOLD,
+         memory_threshold: float = GATE_MEMORY_THRESHOLD, retries: int = GATE_RETRIES) -> List[str]:
+    """Mide los casos y los compara con la línea base; devuelve las regresiones
+
+    Un caso más lento que el umbral se vuelve a medir hasta ``retries`` veces
+    antes de contarlo (ruido de otros procesos); la memoria es determinista.
+    """
+    head = run_gate(repeat)
+    base_cases = {case_key(c): c for c in baseline["results"]}
+    funcs = {case_key({"name": name, "params": params}): func for name, params, func in gate_cases()}
+    for _ in range(retries):
+        slow = [case for case in head["results"] if _slower(case, base_cases.get(case_key(case)), time_threshold)]
+        if not slow:
+            break
+        for case in slow:
+            case["min_ms"] = min(case["min_ms"], measure(funcs[case_key(case)], repeat)["min_ms"])
+    return check_gate(baseline, head, time_threshold, memory_threshold)
+
+
+def check_gate(baseline: Dict, head: Dict, time_threshold: float = GATE_TIME_THRESHOLD,
+               memory_threshold: float = GATE_MEMORY_THRESHOLD) -> List[str]:
+    """Imprime la comparación con la línea base; devuelve las regresiones encontradas"""
+    base_cases = {case_key(c): c for c in baseline["results"]}
+    regressions = []
+    print(f"{'case':<50} {'base ms':>9} {'head ms':>9} {'base KiB':>9} {'head KiB':>9}")
+    for case in head["results"]:
+        key = case_key(case)
+        base = base_cases.get(key)
+        if base is None:
+            print(f"{key:<50} {'-':>9} {case['min_ms']:>9.2f} {'-':>9} {case['peak_kib']:>9}  (no baseline)")
+            continue
+        flags = []
+        if _slower(case, base, time_threshold):
+            flags.append("TIME")
+            regressions.append(f"{key}: {case['min_ms']:.2f} ms > {base['min_ms']:.2f} ms + {time_threshold:.0%}")
+        if case["peak_kib"] > base["peak_kib"] * (1 + memory_threshold):
+            flags.append("MEMORY")
+            regressions.append(f"{key}: {case['peak_kib']} KiB > {base['peak_kib']} KiB + {memory_threshold:.0%}")
+        print(f"{key:<50} {base['min_ms']:>9.2f} {case['min_ms']:>9.2f} {base['peak_kib']:>9} "
+              f"{case['peak_kib']:>9}{'  ' + ' '.join(flags) if flags else ''}")
+    print(f"\n{len(regressions)} regression(s) (time +{time_threshold:.0%}, memory +{memory_threshold:.0%}; "
+          f"baseline {baseline.get('commit')})")
+    return regressions
+
+
+def compare(base: Dict, head: Dict, threshold: float) -> int:
+    """Imprime la comparación por caso; devuelve el número de regresiones"""
+    base_cases = {case_key(c): c for c in base["results"] if "skipped" not in c}
+    regressions = 0
+    print(f"{'case':<70} {'base ms':>10} {'head ms':>10} {'change':>8}")
+    for case in head["results"]:
+        key = case_key(case)
+        if "skipped" in case or key not in base_cases:
+            continue
+        before, after = base_cases[key]["median_ms"], case["median_ms"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key:<70} {before:>10.4f} {after:>10.4f} {change:>+8.1%}{flag}")
+    print(f"\n{regressions} regression(s) above {threshold:.0%} "
+          f"({base.get('commit')} -> {head.get('commit')})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark suite for validation and QR rendering.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the suite and write JSON results")
+    run_parser.add_argument("-o", "--output", help="JSON output file (default: stdout)")
+    run_parser.add_argument("--quick", action="store_true", help="Smaller grid for a fast check")
+    run_parser.add_argument("-r", "--repeat", type=int, default=None)
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (default: 0.10)")
+
+    baseline_parser = sub.add_parser("baseline", help="Record the regression gate baseline")
+    baseline_parser.add_argument("-o", "--output", default=BASELINE_PATH, help="Baseline file (default: %(default)s)")
+    baseline_parser.add_argument("-r", "--repeat", type=int, default=7)
+
+    gate_parser = sub.add_parser("gate", help="Fail if time or memory exceed the recorded baseline")
+    gate_parser.add_argument("baseline", nargs="?", default=BASELINE_PATH)
+    gate_parser.add_argument("--time-threshold", type=float, default=GATE_TIME_THRESHOLD,
+                             help="Allowed slowdown (default: %(default)s)")
+    gate_parser.add_argument("--memory-threshold", type=float, default=GATE_MEMORY_THRESHOLD,
+                             help="Allowed memory growth (default: %(default)s)")
+    gate_parser.add_argument("-r", "--repeat", type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = run_suite(args.quick, args.repeat)
+        content = json.dumps(result, indent=2)
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(content + "\n")
+        else:
+            print(content)
+        return 0
+
+    if args.command == "baseline":
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(json.dumps(run_gate(args.repeat), indent=2) + "\n")
+        print(f"Baseline written to {args.output}")
+        return 0
+
+    if args.command == "gate":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = environment_mismatch(baseline)
+        if mismatch:
+            print(f"Baseline recorded in another environment ({', '.join(mismatch)} differ); "
+                  f"record a new one with: python benchmarks/suite.py baseline", file=sys.stderr)
+            return 2
+        return 1 if gate(baseline, args.repeat, args.time_threshold, args.memory_threshold) else 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    return 1 if compare(base, head, args.threshold) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
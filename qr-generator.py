@@ -1,11 +1,32 @@
 import streamlit as st
-import qrcode
+import os
 import io
-import base64
-import json
-import re
-from datetime import datetime, time
-from typing import Dict, List, Optional, Tuple
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from truck_qr import TruckQRGenerator, ValidationError, metrics
+from truck_qr.cache import default_cache
+from truck_qr.codec import CODECS, decode_payload, qr_stats
+from truck_qr.estimate import PayloadEstimator
+from truck_qr.history import DEFAULT_HISTORY_DB, HISTORY_DB_ENV, GenerationHistory
+from truck_qr.labels import DEFAULT_LAYOUT, PAGE_LAYOUTS, labels_for, write_pdf
+from truck_qr.pool import PoolBusy, RenderPool, render_record, tenant_from_headers
+from truck_qr.record import validate_record
+from truck_qr.signing import SigningKey, sign_payload, signing_key_from_env
+from truck_qr.split import DEFAULT_MAX_VERSION
+from truck_qr.templates import TemplateStore
+
+if TYPE_CHECKING:
+    from truck_qr.delivery import BoomiDelivery
+
+# Inicio de la ejecución del script (métrica de reruns)
+_script_started = time.perf_counter()
+
+# Espera máxima (segundos) de un QR en el pool de renderizado compartido
+RENDER_TIMEOUT = 60
+# Plantillas más usadas que se ofrecen en el autocompletado
+TEMPLATE_OPTIONS = 500
 
 # Configuración de la página de Streamlit
 st.set_page_config(
@@ -15,7 +36,7 @@ st.set_page_config(
 )
 
 # --- CSS personalizado para estilos específicos ---
-st.markdown("""
+APP_CSS = """
 <style>
 /* Oculta la cabecera por defecto de Streamlit si no la necesitas */
 .stApp > header {
@@ -144,194 +165,91 @@ st.markdown("""
     margin: 10px 0;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
-class ValidationError(Exception):
-    """Excepción personalizada para errores de validación"""
-    pass
 
-class TruckQRGenerator:
-    """Clase principal para generar códigos QR de tracking de camiones"""
-    
-    # Patrones de validación
-    PLATE_PATTERN = re.compile(r'^[A-Z0-9-]{3,10}$')
-    CUSTOMER_ID_PATTERN = re.compile(r'^[A-Z0-9_-]{3,20}$')
-    DELIVERY_REF_PATTERN = re.compile(r'^[A-Z0-9_-]{3,30}$')
-    ITEM_ID_PATTERN = re.compile(r'^[A-Z0-9_-]{1,20}$')
-    
-    # Configuración para Boomi
-    BOOMI_CONFIG = {
-        'date_format': '%Y-%m-%dT%H:%M:%S',  # Formato ISO para Boomi
-        'required_fields': ['plate', 'driverName', 'customer_id', 'date_time_at_gate', 'item_list'],
-        'truck_types': ['Type A', 'Type B', 'Type C', 'Type D', 'Type E']
-    }
-    
-    @staticmethod
-    def validate_plate(plate: str) -> bool:
-        """Valida el formato de la placa"""
-        if not plate or len(plate.strip()) < 3:
-            return False
-        return bool(TruckQRGenerator.PLATE_PATTERN.match(plate.strip().upper()))
-    
-    @staticmethod
-    def validate_driver_name(driver: str) -> bool:
-        """Valida el nombre del conductor"""
-        if not driver or len(driver.strip()) < 2:
-            return False
-        # Solo letras, espacios y algunos caracteres especiales
-        return bool(re.match(r'^[A-Za-z\s\.\-\']{2,50}$', driver.strip()))
-    
-    @staticmethod
-    def validate_customer_id(customer_id: str) -> bool:
-        """Valida el ID del cliente"""
-        if not customer_id or len(customer_id.strip()) < 3:
-            return False
-        return bool(TruckQRGenerator.CUSTOMER_ID_PATTERN.match(customer_id.strip().upper()))
-    
-    @staticmethod
-    def validate_delivery_ref(delivery_ref: str) -> bool:
-        """Valida la referencia de entrega"""
-        if not delivery_ref:
-            return True  # Campo opcional
-        return bool(TruckQRGenerator.DELIVERY_REF_PATTERN.match(delivery_ref.strip().upper()))
-    
-    @staticmethod
-    def validate_company(company: str) -> bool:
-        """Valida el nombre de la empresa"""
-        if not company:
-            return True  # Campo opcional
-        return len(company.strip()) >= 2 and len(company.strip()) <= 100
-    
-    @staticmethod
-    def validate_items(items_raw: str) -> Tuple[bool, List[Dict], List[str]]:
-        """Valida y procesa la lista de items"""
-        errors = []
-        item_list = []
-        
-        if not items_raw or not items_raw.strip():
-            return False, [], ["The 'Items' field is required."]
-        
-        # Procesar items
-        raw_items = [item.strip() for item in items_raw.split(',') if item.strip()]
-        
-        if not raw_items:
-            return False, [], ["The 'Items' field is required and does not contain valid items."]
-        
-        seen_items = set()
-        
-        for item_entry in raw_items:
-            parts = item_entry.split(':')
-            if len(parts) != 2:
-                errors.append(f"Invalid item format: '{item_entry}'. Use 'SKU:Quantity'.")
-                continue
-            
-            item_id = parts[0].strip().upper()
-            quantity_str = parts[1].strip()
-            
-            # Validar ID del item
-            if not TruckQRGenerator.ITEM_ID_PATTERN.match(item_id):
-                errors.append(f"Invalid item ID format: '{item_id}'. Use only letters, numbers, hyphens and underscores.")
-                continue
-            
-            # Validar duplicados
-            if item_id in seen_items:
-                errors.append(f"Duplicate item ID: '{item_id}'.")
-                continue
-            
-            seen_items.add(item_id)
-            
-            # Validar cantidad
-            try:
-                quantity = int(quantity_str)
-                if quantity <= 0:
-                    errors.append(f"Quantity for '{item_id}' must be a positive number.")
-                    continue
-                
-                item_list.append({"item_id": item_id, "quantity": quantity})
-            except ValueError:
-                errors.append(f"Quantity '{quantity_str}' for '{item_id}' is not a valid number.")
-        
-        return len(errors) == 0, item_list, errors
-    
-    @staticmethod
-    def validate_datetime(selected_date, selected_hour: str, selected_minute: str, selected_ampm: str) -> Tuple[bool, Optional[str], List[str]]:
-        """Valida y procesa la fecha y hora"""
-        errors = []
-        
-        if not selected_date:
-            errors.append("The 'Date' field is required.")
-        
-        if not selected_hour or not selected_minute:
-            errors.append("The 'Hours' and 'Minutes' fields are required.")
-        
-        if errors:
-            return False, None, errors
-        
-        try:
-            h_12 = int(selected_hour)
-            m = int(selected_minute)
-            
-            # Convertir a formato 24 horas
-            if selected_ampm == "PM" and h_12 != 12:
-                h_24 = h_12 + 12
-            elif selected_ampm == "AM" and h_12 == 12:
-                h_24 = 0
-            else:
-                h_24 = h_12
-            
-            if not (0 <= h_24 <= 23 and 0 <= m <= 59):
-                errors.append("Invalid time format.")
-                return False, None, errors
-            
-            # Crear datetime y validar que no sea en el futuro
-            combined_datetime = datetime(selected_date.year, selected_date.month, selected_date.day, h_24, m)
-            
-            if combined_datetime > datetime.now():
-                errors.append("Date and time cannot be in the future.")
-                return False, None, errors
-            
-            # Formato ISO para Boomi
-            dt_iso = combined_datetime.strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
-            
-            return True, dt_iso, []
-            
-        except ValueError as e:
-            errors.append(f"Error processing time: {str(e)}")
-            return False, None, errors
-    
-    @staticmethod
-    def generate_qr_optimized(data_dict: Dict) -> Tuple[str, str]:
-        """Genera un código QR optimizado para Boomi"""
-        
-        # Limpiar datos nulos o vacíos para optimizar tamaño
-        cleaned_data = {k: v for k, v in data_dict.items() if v is not None and v != ""}
-        
-        # Generar JSON con formato legible
-        json_str = json.dumps(cleaned_data, indent=2, ensure_ascii=False)
-        
-        # Generar QR con configuración optimizada
-        qr = qrcode.QRCode(
-            version=None,  # Auto-determinar versión
-            error_correction=qrcode.constants.ERROR_CORRECT_M,  # Mejor balance entre corrección y tamaño
-            box_size=8,  # Tamaño óptimo para lectura
-            border=4
-        )
-        
-        qr.add_data(json_str)
-        qr.make(fit=True)
-        
-        # Crear imagen con alta calidad
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir a base64
-        buf = io.BytesIO()
-        img.save(buf, format="PNG", optimize=True)
-        base64_qr = base64.b64encode(buf.getvalue()).decode()
-        
-        return base64_qr, json_str
+# --- Recursos estáticos compartidos entre reruns y sesiones ---
+@st.cache_resource
+def get_generator() -> TruckQRGenerator:
+    """Instancia única del generador para todo el servidor"""
+    return TruckQRGenerator()
+
+
+@st.cache_resource
+def get_time_options() -> Tuple[List[str], List[str]]:
+    """Opciones de horas y minutos (se construyen una sola vez)"""
+    hour_options = [f"{i:02d}" for i in range(1, 13)]
+    minute_options = [f"{i:02d}" for i in range(0, 60)]
+    return hour_options, minute_options
+
+
+@st.cache_resource
+def get_history() -> GenerationHistory:
+    """Histórico de QR generados, compartido por todas las sesiones (escritura en segundo plano)"""
+    return GenerationHistory(os.environ.get(HISTORY_DB_ENV) or DEFAULT_HISTORY_DB)
+
+
+@st.cache_resource
+def get_delivery() -> Optional["BoomiDelivery"]:
+    """Cola de envío a Boomi compartida por las sesiones (solo con TRUCK_QR_BOOMI_URL)"""
+    # asyncio y el cliente HTTP se cargan con el primer QR generado, no al abrir la app
+    from truck_qr.delivery import BoomiDelivery
+    return BoomiDelivery.from_env()
+
+
+@st.cache_resource
+def get_render_pool() -> Optional[RenderPool]:
+    """Pool de renderizado compartido por todas las sesiones (solo con TRUCK_QR_RENDER_WORKERS)"""
+    return RenderPool.from_env()
+
+
+@st.cache_resource
+def get_signer() -> Optional[SigningKey]:
+    """Clave con la que se firman los QR (solo con TRUCK_QR_SIGNING_KEY)"""
+    return signing_key_from_env()
+
+
+def get_tenant() -> str:
+    """Planta (tenant) de la sesión, según la cabecera que fija el proxy (TRUCK_QR_TENANT_HEADER)"""
+    return tenant_from_headers(st.context.headers)
+
+
+@st.cache_resource
+def get_templates() -> TemplateStore:
+    """Plantillas de camiones recurrentes (en la misma base que el histórico)"""
+    return TemplateStore(os.environ.get(HISTORY_DB_ENV) or DEFAULT_HISTORY_DB)
+
+
+@st.cache_data(ttl=60)
+def get_template_options() -> Dict[str, Tuple[str, str]]:
+    """Etiqueta -> (placa, cliente) de las plantillas más usadas, para el autocompletado"""
+    return {template.label: template.key for template in get_templates().search(limit=TEMPLATE_OPTIONS)}
+
+
+def get_estimator() -> PayloadEstimator:
+    """Estimador incremental de la sesión (conserva los items ya procesados entre reruns)"""
+    if "size_estimator" not in st.session_state:
+        st.session_state.size_estimator = PayloadEstimator(signer=get_signer())
+    return st.session_state.size_estimator
+
+
+@st.cache_data(max_entries=32)
+def get_label_pdf(payload: str, codec: str, split: bool, page: str, adaptive: bool = False) -> bytes:
+    """Etiqueta imprimible en PDF del QR mostrado (se cachea por payload y tamaño de página)
+
+    ``adaptive`` repite la configuración adaptativa del QR mostrado, que puede
+    admitir más datos que la de ``build_qr``.
+    """
+    data = decode_payload(payload)
+    labels = labels_for(data, codec, DEFAULT_MAX_VERSION if split else None, adaptive)
+    buf = io.BytesIO()
+    write_pdf(labels, buf, PAGE_LAYOUTS[page])
+    return buf.getvalue()
+
 
 # Inicializar el generador
-generator = TruckQRGenerator()
+generator = get_generator()
 
 # Título de la aplicación visible al usuario
 st.title("TRUCK TRACKING QR GENERATOR") 
@@ -341,8 +259,14 @@ if "form_active" not in st.session_state:
     st.session_state.form_active = True
 if "qr_base64" not in st.session_state:
     st.session_state.qr_base64 = ""
+if "qr_parts" not in st.session_state:
+    st.session_state.qr_parts = []
 if "json_str" not in st.session_state:
     st.session_state.json_str = ""
+if "qr_codec" not in st.session_state:
+    st.session_state.qr_codec = "json"
+if "qr_settings" not in st.session_state:
+    st.session_state.qr_settings = ""
 if "selected_date_value" not in st.session_state:
     st.session_state.selected_date_value = datetime.now().date()
 if "selected_hour_value" not in st.session_state:
@@ -355,29 +279,105 @@ if "ampm_selection_index" not in st.session_state:
 def return_to_form():
     """Vuelve al formulario principal"""
     st.session_state.form_active = True
+    st.session_state.template_fields = None
     st.session_state.qr_base64 = ""
+    st.session_state.qr_parts = []
     st.session_state.json_str = ""
+    st.session_state.qr_settings = ""
     st.session_state.selected_date_value = datetime.now().date()
     st.session_state.selected_hour_value = datetime.now().strftime("%I")
     st.session_state.selected_minute_value = datetime.now().strftime("%M")
     st.session_state.ampm_selection_index = 0 if datetime.now().hour < 12 else 1
 
 
-def generate_qr_and_update_state(data_dict: Dict):
-    """Genera el QR y actualiza el estado"""
+def apply_template():
+    """Rellena los campos fijos con la plantilla elegida (o la más usada que empieza por lo escrito)"""
+    choice = st.session_state.template_input
+    st.session_state.template_fields = None
+    if not choice:
+        return
+    store = get_templates()
+    key = get_template_options().get(choice)
+    if key is not None:
+        template = store.lookup(*key)
+    else:
+        matches = store.search(choice, limit=1)
+        template = matches[0] if matches else None
+    if template is None:
+        st.toast(f"No saved truck matches '{choice}'.")
+        return
+    st.session_state.plate_input = template.plate
+    st.session_state.driver_input = template.driver_name
+    st.session_state.customer_id_input = template.customer_id
+    st.session_state.truck_type_input = template.truck_type
+    st.session_state.company_input = template.company
+    # Campos ya validados: al generar solo se revalida lo que se cambie
+    st.session_state.template_fields = template.fields()
+
+
+@metrics.registry.timed("generate_handler")
+def generate_qr_and_update_state(data_dict: Dict, codec: str = "json", split: bool = False, adaptive: bool = False):
+    """Genera el QR (o varios si se divide el manifiesto) y actualiza el estado"""
     try:
-        base64_qr, json_str = generator.generate_qr_optimized(data_dict)
-        st.session_state.qr_base64 = base64_qr
-        st.session_state.json_str = json_str
+        signer = get_signer()
+        if signer is not None:
+            # La firma viaja en el QR, el histórico y el envío a Boomi
+            data_dict = sign_payload(data_dict, signer)
+        pool = get_render_pool()
+        if pool is None:
+            result = render_record(data_dict, codec, split, adaptive, DEFAULT_MAX_VERSION, cache=default_cache)
+        else:
+            # Los workers se comparten entre sesiones; la cola y el turno son por planta
+            with metrics.span("render_pool"):
+                result = pool.run(get_tenant(), render_record, data_dict, codec, split, adaptive,
+                                  DEFAULT_MAX_VERSION, timeout=RENDER_TIMEOUT)
+        st.session_state.qr_base64 = result.images[0]
+        st.session_state.qr_parts = result.images if len(result.images) > 1 else []
+        st.session_state.json_str = result.payload
+        st.session_state.qr_codec = codec
+        st.session_state.qr_settings = result.settings.describe() if result.settings is not None else ""
         st.session_state.form_active = False
+        # Registro de auditoría: solo se encola, la escritura es en segundo plano
+        get_history().record(data_dict, result.payload, codec, parts=len(result.images))
+        # Plantilla del camión para la próxima visita (placa + cliente)
+        with metrics.span("template_save"):
+            get_templates().save(data_dict)
+        get_template_options.clear()
+        # Envío a Boomi en segundo plano (si está configurado); nunca espera al endpoint
+        delivery = get_delivery()
+        if delivery is not None:
+            delivery.submit(data_dict)
         st.rerun()
+    except PoolBusy as e:
+        st.warning(str(e))
     except Exception as e:
         st.error(f"Unexpected error: {str(e)}")
 
-# --- Lógica condicional para mostrar el formulario o el resultado del QR ---
-if st.session_state.form_active:
+@st.fragment
+@metrics.registry.timed("form_rerun")
+def render_form():
+    """Formulario de captura
+
+    Se ejecuta como fragmento: las interacciones con los widgets solo
+    reejecutan esta función y no todo el script (CSS, estado, título).
+    """
     st.markdown("Fill in the details to generate a QR code.")
 
+    # Camiones recurrentes: el selector filtra mientras se escribe
+    template_options = get_template_options()
+    if template_options:
+        st.selectbox(
+            "Saved truck",
+            options=list(template_options),
+            index=None,
+            key="template_input",
+            on_change=apply_template,
+            accept_new_options=True,
+            placeholder="Type a plate or customer ID",
+            help="Fills plate, driver, customer, truck type and company from a previous QR. "
+                 "Only the fields you change are validated again"
+        )
+
     # Campos principales
     col_plate, col_driver = st.columns(2)
     with col_plate:
@@ -417,7 +417,7 @@ if st.session_state.form_active:
         st.session_state.selected_date_value = selected_date
 
     with col_hour:
-        hour_options = [f"{i:02d}" for i in range(1, 13)]
+        hour_options, _ = get_time_options()
         default_hour_index = hour_options.index(st.session_state.selected_hour_value) if st.session_state.selected_hour_value in hour_options else 0
         selected_hour = st.selectbox(
             "Hours",
@@ -428,7 +428,7 @@ if st.session_state.form_active:
         st.session_state.selected_hour_value = selected_hour
 
     with col_minute:
-        minute_options = [f"{i:02d}" for i in range(0, 60)]
+        _, minute_options = get_time_options()
         default_minute_index = minute_options.index(st.session_state.selected_minute_value) if st.session_state.selected_minute_value in minute_options else 0
         selected_minute = st.selectbox(
             "Minutes",
@@ -474,69 +474,80 @@ if st.session_state.form_active:
         "Items (required, format: SKU:Quantity)",
         key="items_input",
         placeholder="e.g., ITEM001:10, ITEM002:5",
-        help="Format: SKU:Quantity separated by commas"
+        help="Format: SKU:Quantity separated by commas or new lines. SKU and Quantity columns can be pasted from a spreadsheet"
+    )
+
+    codec = st.selectbox(
+        "QR payload format",
+        options=list(CODECS),
+        key="codec_input",
+        help="json: readable; min: minified JSON; short: short keys; b45: packed binary (smallest QR)"
+    )
+
+    split = st.checkbox(
+        f"Split large manifests into several QR codes (max. version {DEFAULT_MAX_VERSION})",
+        key="split_input",
+        help="Each code carries its part number; scan all parts to rebuild the manifest"
+    )
+
+    adaptive = st.checkbox(
+        "Adaptive error correction and size",
+        value=True,
+        key="adaptive_input",
+        help="Picks the smallest QR version, the strongest error correction that fits in it and "
+             "numeric/alphanumeric segments for plates and SKUs"
     )
 
+    fields = {
+        "plate": plate,
+        "driverName": driver,
+        "customer_id": customer_id,
+        "date": selected_date,
+        "hour": selected_hour,
+        "minute": selected_minute,
+        "ampm": selected_ampm,
+        "truckType": truck_type,
+        "company": company,
+        "deliveryOrderRef": delivery_ref,
+        "items": items_raw,
+    }
+
+    # Tamaño estimado en vivo, sin renderizar (solo los items nuevos se procesan)
+    if items_raw.strip():
+        with metrics.span("estimate"):
+            estimate = get_estimator().estimate(fields, codec)
+        if not estimate.fits and not split:
+            st.warning(f"About {estimate.payload_bytes} bytes: too large for a single QR code. "
+                       "Use the b45 format or split the manifest.")
+        elif estimate.dense() and not split:
+            st.warning(f"Estimated QR version {estimate.version} ({estimate.modules}x{estimate.modules} modules) "
+                       "is dense and hard to scan. Use the b45 format or split the manifest.")
+        else:
+            size = (f"QR version {estimate.version} ({estimate.modules}x{estimate.modules} modules)"
+                    if not estimate.dense() else f"several QR codes (version ≤ {DEFAULT_MAX_VERSION})")
+            st.caption(f"Estimated: {estimate.items} items · {estimate.payload_bytes} bytes · {size}")
+
     # Botón para generar QR
     col_left_btn, col_center_btn, col_right_btn = st.columns([1, 2, 1])
     with col_center_btn:
         if st.button("Generate QR"):
-            errors = []
-            
-            # Validaciones
-            if not generator.validate_plate(plate):
-                errors.append("Invalid plate number format. Use 3-10 characters with letters, numbers, and hyphens only.")
-            
-            if not generator.validate_driver_name(driver):
-                errors.append("Invalid driver name. Use 2-50 characters with letters, spaces, dots, hyphens, and apostrophes only.")
-            
-            if not generator.validate_customer_id(customer_id):
-                errors.append("Invalid customer ID format. Use 3-20 characters with letters, numbers, hyphens, and underscores only.")
-            
-            if not generator.validate_company(company):
-                errors.append("Company name must be between 2 and 100 characters.")
-            
-            if not generator.validate_delivery_ref(delivery_ref):
-                errors.append("Invalid delivery reference format. Use 3-30 characters with letters, numbers, hyphens, and underscores only.")
-            
-            # Validar fecha y hora
-            is_valid_datetime, dt_iso, datetime_errors = generator.validate_datetime(
-                selected_date, selected_hour, selected_minute, selected_ampm
-            )
-            if not is_valid_datetime:
-                errors.extend(datetime_errors)
-            
-            # Validar items
-            is_valid_items, item_list, item_errors = generator.validate_items(items_raw)
-            if not is_valid_items:
-                errors.extend(item_errors)
+            # Validación en una sola pasada (mismas reglas que lotes y API)
+            with metrics.span("validate"):
+                record, errors = validate_record(fields, validated=st.session_state.get("template_fields"))
             
             # Mostrar errores si existen
             if errors:
                 for error in errors:
                     st.error(error)
-                st.stop()
-            
-            # Construir datos para el QR (SIN METADATA ADICIONAL)
-            data = {
-                "plate": plate.strip().upper(),
-                "driverName": driver.strip().title(),
-                "customer_id": customer_id.strip().upper(),
-                "date_time_at_gate": dt_iso,
-                "item_list": item_list
-            }
-            
-            # Agregar campos opcionales solo si tienen valor
-            if truck_type:
-                data["truckType"] = truck_type
-            if company.strip():
-                data["company"] = company.strip()
-            if delivery_ref.strip():
-                data["deliveryOrderRef"] = delivery_ref.strip().upper()
-            
+                return
             
             # Generar QR
-            generate_qr_and_update_state(data)
+            generate_qr_and_update_state(record.to_payload(), codec, split, adaptive)
+
+
+# --- Lógica condicional para mostrar el formulario o el resultado del QR ---
+if st.session_state.form_active:
+    render_form()
 
 else:
     # Mostrar resultado del QR
@@ -545,11 +556,17 @@ else:
     # Centrar el QR code
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image(f"data:image/png;base64,{st.session_state.qr_base64}", use_container_width=True)
+        if st.session_state.qr_parts:
+            total_parts = len(st.session_state.qr_parts)
+            for part_number, part_base64 in enumerate(st.session_state.qr_parts, start=1):
+                st.image(f"data:image/png;base64,{part_base64}", use_container_width=True)
+                st.caption(f"Part {part_number} of {total_parts}")
+        else:
+            st.image(f"data:image/png;base64,{st.session_state.qr_base64}", use_container_width=True)
     
     # Mostrar información del QR
     if st.session_state.json_str:
-        data = json.loads(st.session_state.json_str)
+        data = decode_payload(st.session_state.json_str)
         
         # Mostrar resumen (calculado desde los datos existentes)
         st.markdown("### Summary:")
@@ -567,12 +584,53 @@ else:
             st.write(f"**Total Items:** {total_items}")
             st.write(f"**Total Quantity:** {total_quantity}")
             st.write(f"**Date/Time:** {data.get('date_time_at_gate', 'N/A')}")
+        
+        # Tamaño del símbolo según el codec elegido
+        payload_bytes = len(st.session_state.json_str.encode("utf-8"))
+        if st.session_state.qr_parts:
+            st.caption(
+                f"Format: {st.session_state.qr_codec} · {payload_bytes} bytes · "
+                f"split into {len(st.session_state.qr_parts)} QR codes (version ≤ {DEFAULT_MAX_VERSION})"
+            )
+        elif st.session_state.qr_settings:
+            st.caption(f"Format: {st.session_state.qr_codec} · {payload_bytes} bytes · {st.session_state.qr_settings}")
+        else:
+            qr_version, qr_modules = qr_stats(st.session_state.json_str)
+            st.caption(
+                f"Format: {st.session_state.qr_codec} · {payload_bytes} bytes · "
+                f"QR version {qr_version} ({qr_modules}x{qr_modules} modules)"
+            )
+    
+        # Etiqueta imprimible en lugar de capturar la pantalla
+        col_page, col_download = st.columns([1, 2])
+        with col_page:
+            label_page = st.selectbox("Label page", options=list(PAGE_LAYOUTS),
+                                      index=list(PAGE_LAYOUTS).index(DEFAULT_LAYOUT), key="label_page_input")
+        with col_download:
+            # download_button construye el PDF en cada rerun: un fallo no debe tumbar la página del resultado
+            try:
+                label_pdf = get_label_pdf(st.session_state.json_str, st.session_state.qr_codec,
+                                          bool(st.session_state.qr_parts), label_page,
+                                          bool(st.session_state.qr_settings))
+            except ValidationError as e:
+                st.warning(f"The printable label is not available: {str(e)}")
+            else:
+                st.download_button(
+                    "Download printable label (PDF)",
+                    data=label_pdf,
+                    file_name=f"{data.get('plate', 'qr')}_label.pdf",
+                    mime="application/pdf",
+                )
     
     # Mostrar JSON completo
     with st.expander("📋 QR Content (JSON)", expanded=False):
-        st.code(st.session_state.json_str, language="json")
+        st.code(st.session_state.json_str, language=None if st.session_state.qr_codec == "b45" else "json")
 
     # Botón para volver al formulario
     col_left_back_btn, col_center_back_btn, col_right_back_btn = st.columns([1, 2, 1])
     with col_center_back_btn:
-        st.button("Back to Form", on_click=return_to_form)
\ No newline at end of file
+        st.button("Back to Form", on_click=return_to_form)
+
+# Duración de la ejecución completa del script y exportación opcional a archivo
+metrics.observe(metrics.STAGE_SECONDS, time.perf_counter() - _script_started, stage="script_run")
+metrics.registry.maybe_write_textfile()
\ No newline at end of file
@@ -0,0 +1,13 @@
+"""Pruebas de propiedades, fuzzing y puerta de regresión (sin Streamlit)
+
+Solo usan la biblioteca estándar y el paquete ``truck_qr``:
+
+    python -m unittest discover -s tests -t .
+    python -m pytest tests
+
+Los ejemplos aleatorios son reproducibles: cada prueba usa la semilla
+``TRUCK_QR_FUZZ_SEED`` (fija por defecto) y ``TRUCK_QR_FUZZ_EXAMPLES``
+ejemplos por propiedad. Un fallo indica la semilla y el ejemplo.
+
+    TRUCK_QR_FUZZ_SEED=7 TRUCK_QR_FUZZ_EXAMPLES=5000 python -m unittest discover -s tests -t .
+"""
@@ -0,0 +1,99 @@
+"""Generadores de datos aleatorios reproducibles para las pruebas de propiedades"""
+
+import os
+import random
+import unittest
+from typing import Callable, Dict, List, TypeVar
+
+SEED_ENV = "TRUCK_QR_FUZZ_SEED"
+EXAMPLES_ENV = "TRUCK_QR_FUZZ_EXAMPLES"
+DEFAULT_SEED = 20240501
+DEFAULT_EXAMPLES = 200
+
+SEED = int(os.environ.get(SEED_ENV) or DEFAULT_SEED)
+EXAMPLES = int(os.environ.get(EXAMPLES_ENV) or DEFAULT_EXAMPLES)
+
+# Caracteres válidos de SKU, cliente y referencia (antes de pasar a mayúsculas)
+ID_CHARS = "ABCXYZabcxyz0189_-"
+# Texto hostil: separadores, espacios Unicode, controles, dígitos no ASCII,
+# letras que cambian de longitud con upper() y emoji
+ADVERSARIAL_CHARS = (
+    "AZaz09_-:,;.'\" \t\n\r\\"
+    "\x00\x7f\x85\xa0 　﻿"
+    "éñøßĳıſ"
+    "١٢³½"
+    "\U0001F69A\U0001F600"
+)
+NAME_CHARS = "abcXYZ .'-éñøßÅĳ　\U0001F69A"
+
+T = TypeVar("T")
+
+
+def text(rnd: random.Random, alphabet: str, min_size: int = 0, max_size: int = 20) -> str:
+    return "".join(rnd.choice(alphabet) for _ in range(rnd.randint(min_size, max_size)))
+
+
+def item_ids(rnd: random.Random, count: int) -> List[str]:
+    """SKU válidos y distintos (sin distinguir mayúsculas)"""
+    ids: Dict[str, str] = {}
+    while len(ids) < count:
+        item_id = text(rnd, ID_CHARS, 1, 20)
+        ids.setdefault(item_id.upper(), item_id)
+    return list(ids.values())
+
+
+def items_text(rnd: random.Random, entries: List[str]) -> str:
+    """Une entradas "SKU:Quantity" con separadores y espacios variados (como al pegar)"""
+    out = []
+    for entry in entries:
+        out.append(rnd.choice(["", " ", "  ", "\t"]) + entry + rnd.choice(["", " "]))
+        out.append(rnd.choice([",", ", ", "\n", "\r\n", ",\n", " , "]))
+    return "".join(out[:-1])
+
+
+def item_entry(rnd: random.Random, item_id: str, quantity: int) -> str:
+    separator = rnd.choice([":", " : ", ": ", "\t"])
+    return f"{item_id}{separator}{quantity}"
+
+
+def record(rnd: random.Random, items: int = 5) -> Dict[str, str]:
+    """Registro válido del formulario con campos opcionales al azar"""
+    fields = {
+        "plate": text(rnd, "ABCXYZ0189-", 3, 10),
+        "driverName": text(rnd, "abcXYZ .'-", 2, 50),
+        "customer_id": text(rnd, ID_CHARS, 3, 20),
+        "date_time_at_gate": f"20{rnd.randint(0, 23):02d}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T"
+                             f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:00",
+        "items": items_text(rnd, [item_entry(rnd, item_id, rnd.choice([1, 7, 99, 10 ** rnd.randint(0, 12)]))
+                                  for item_id in item_ids(rnd, items)]),
+    }
+    # El formulario quita los espacios de los extremos antes de comprobar la longitud
+    if len(fields["driverName"].strip()) < 2:
+        fields["driverName"] = "Jo"
+    if rnd.random() < 0.5:
+        company = text(rnd, NAME_CHARS, 2, 100)
+        fields["company"] = company if len(company.strip()) >= 2 else "Acme"
+    if rnd.random() < 0.5:
+        fields["deliveryOrderRef"] = text(rnd, ID_CHARS, 3, 30)
+    if rnd.random() < 0.5:
+        fields["truckType"] = rnd.choice(["Type A", "Type B", "Type C", "Type D", "Type E"])
+    return fields
+
+
+def _short(value) -> str:
+    text_value = repr(value)
+    return text_value if len(text_value) <= 300 else text_value[:300] + "..."
+
+
+def check(test: unittest.TestCase, strategy: Callable[[random.Random], T], prop: Callable[[T], None],
+          examples: int = 0) -> None:
+    """Comprueba ``prop`` con ``examples`` valores de ``strategy`` (semilla por prueba)
+
+    Cada ejemplo es un ``subTest``: un fallo informa la semilla, el número de
+    ejemplo y el valor, y el resto de ejemplos se sigue comprobando.
+    """
+    rnd = random.Random(f"{SEED}:{test.id()}")
+    for number in range(examples or EXAMPLES):
+        value = strategy(rnd)
+        with test.subTest(seed=SEED, example=number, value=_short(value)):
+            prop(value)
@@ -0,0 +1,143 @@
+"""Totales por día, cliente y SKU del histórico y de payloads exportados"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+
+from truck_qr.aggregate import ManifestAggregator, main
+from truck_qr.codec import encode_payload
+from truck_qr.history import GenerationHistory
+from truck_qr.record import ITEM_LIST_ERROR
+
+START = datetime(2024, 5, 1, 6, 0)
+
+
+def manifest(plate: str, customer_id: str, gate: str, items, ref: str = "") -> dict:
+    data = {"plate": plate, "driverName": "John Doe", "customer_id": customer_id, "date_time_at_gate": gate,
+            "item_list": [{"item_id": item_id, "quantity": quantity} for item_id, quantity in items]}
+    if ref:
+        data["deliveryOrderRef"] = ref
+    return data
+
+
+MANIFESTS = [
+    manifest("ABC-123", "CUST001", "2024-05-01T09:05:00", [("SKU1", 10), ("SKU2", 5)]),
+    manifest("DEF-456", "CUST001", "2024-05-01T11:00:00", [("SKU1", 3)], ref="DO-1"),
+    manifest("ABC-123", "CUST002", "2024-05-02T08:00:00", [("SKU3", 7), ("SKU1", 1)]),
+    manifest("GHI-789", "CUST002", "2024-06-03T10:30:00", []),
+]
+
+DAILY = [
+    ("2024-05-01", 2, 2, 1, 3, 18),
+    ("2024-05-02", 1, 1, 1, 2, 8),
+    ("2024-06-03", 1, 1, 1, 0, 0),
+]
+CUSTOMER = [
+    ("2024-05-01", "CUST001", 2, 2, 3, 18),
+    ("2024-05-02", "CUST002", 1, 1, 2, 8),
+    ("2024-06-03", "CUST002", 1, 1, 0, 0),
+]
+SKU = [
+    ("2024-05-01", "SKU1", 2, 1, 13),
+    ("2024-05-01", "SKU2", 1, 1, 5),
+    ("2024-05-02", "SKU1", 1, 1, 1),
+    ("2024-05-02", "SKU3", 1, 1, 7),
+]
+
+
+class Rollups:
+    """Comprobaciones comunes a las dos fuentes; ``aggregator`` lo crea cada subclase"""
+
+    def test_rollup_totals(self):
+        self.assertEqual(list(self.aggregator.rows("daily")), DAILY)
+        self.assertEqual(list(self.aggregator.rows("customer")), CUSTOMER)
+        self.assertEqual(list(self.aggregator.rows("sku")), SKU)
+
+    def test_month_and_all_periods(self):
+        self.assertEqual(list(self.aggregator.rows("daily", "month")),
+                         [("2024-05", 3, 2, 2, 5, 26), ("2024-06", 1, 1, 1, 0, 0)])
+        self.assertEqual(list(self.aggregator.rows("sku", "all")),
+                         [("all", "SKU1", 3, 2, 14), ("all", "SKU2", 1, 1, 5), ("all", "SKU3", 1, 1, 7)])
+        with self.assertRaises(ValueError):
+            list(self.aggregator.rows("daily", "week"))
+
+    def test_day_range_is_half_open(self):
+        self.aggregator.start, self.aggregator.end = "2024-05-02", "2024-06-03T00:00:00"
+        self.assertEqual(list(self.aggregator.rows("daily")), DAILY[1:2])
+
+    def test_csv_export(self):
+        out = io.StringIO()
+        self.assertEqual(self.aggregator.export("customer", out), 3)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "period,customer_id,codes,trucks,item_lines,total_quantity")
+        self.assertEqual(lines[1], "2024-05-01,CUST001,2,2,3,18")
+
+
+class FromHistory(Rollups, unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "history.db")
+        corrected = manifest("DEF-456", "CUST001", "2024-05-01T11:00:00", [("SKU9", 99)], ref="DO-1")
+        # Regeneraciones: el mismo manifiesto en otro codec y la referencia DO-1 corregida después
+        generations = [corrected, MANIFESTS[0], *MANIFESTS, MANIFESTS[2]]
+        with GenerationHistory(path, flush_interval=0.01) as history:
+            for minutes, data in enumerate(generations):
+                history.record(data, encode_payload(data, "json"), ("json", "min")[minutes % 2],
+                               created_at=START + timedelta(minutes=minutes))
+        self.aggregator = ManifestAggregator.from_history(path)
+        self.addCleanup(self.aggregator.close)
+
+    def test_missing_database(self):
+        with self.assertRaises(FileNotFoundError):
+            ManifestAggregator.from_history(os.path.join(tempfile.gettempdir(), "missing-history.db"))
+
+
+class FromPayloads(Rollups, unittest.TestCase):
+
+    def setUp(self):
+        lines = [encode_payload(data, codec) for data, codec in zip(MANIFESTS, ("json", "min", "short", "b45"))]
+        stale = manifest("DEF-456", "CUST001", "2024-05-01T11:00:00", [("SKU9", 99)], ref="DO-1")
+        # Lecturas repetidas del mismo QR (en otro codec) y una versión anterior de DO-1
+        lines = [encode_payload(stale, "json"), *lines, encode_payload(MANIFESTS[0], "b45"), lines[2], ""]
+        self.aggregator = ManifestAggregator.from_payloads(line + "\n" for line in lines)
+        self.addCleanup(self.aggregator.close)
+
+    def test_unreadable_lines_are_reported(self):
+        bad_items = json.dumps({"plate": "ABC-123", "customer_id": "CUST001", "item_list": [["SKU1", 1]]})
+        lines = ["not a payload", json.dumps(MANIFESTS[0]), bad_items]
+        with ManifestAggregator.from_payloads(lines) as aggregator:
+            self.assertEqual(aggregator.skipped, 2)
+            self.assertTrue(aggregator.errors[0].startswith("Line 1: "))
+            self.assertIn("Line 3: ", aggregator.errors[1])
+            self.assertEqual(list(aggregator.rows("daily")), [("2024-05-01", 1, 1, 1, 2, 15)])
+
+    def test_item_list_that_decodes_to_non_objects(self):
+        """Aunque el codec acepte la lista, los items que no son objetos no rompen la carga"""
+        with mock.patch("truck_qr.aggregate.decode_payload",
+                        return_value={"plate": "ABC-123", "item_list": [1, 2]}):
+            with ManifestAggregator.from_payloads(["x"]) as aggregator:
+                self.assertEqual(aggregator.errors, [f"Line 1: {ITEM_LIST_ERROR}"])
+
+    def test_hostile_b45_line_is_skipped_by_the_command(self):
+        """Una lectura b45 con fecha desbordada se omite y el resto del archivo se agrega"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "payloads.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(encode_payload(MANIFESTS[0], "b45") + "\nTQ1:300BB89L8KI9PI0IZA1BGGDI+RNN:L/S1\n")
+            out, err = io.StringIO(), io.StringIO()
+            with mock.patch("sys.stdout", out), mock.patch("sys.stderr", err):
+                code = main(["--input", path, "daily"])
+
+        self.assertEqual(code, 1)
+        self.assertTrue(err.getvalue().startswith("Line 2: "), err.getvalue())
+        self.assertEqual(out.getvalue().splitlines()[1:], ["2024-05-01,1,1,1,2,15"])
+
+
+if __name__ == "__main__":
+    unittest.main()
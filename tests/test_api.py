@@ -0,0 +1,104 @@
+"""Servicio HTTP: endpoints, códigos de error y versión del QR devuelta por el pool"""
+
+import asyncio
+import base64
+import json
+import unittest
+
+from truck_qr.api import QRService
+from truck_qr.codec import encode_payload, qr_stats
+
+RECORD = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+          "date_time_at_gate": "2024-05-01T09:05:00", "items": "SKU1:10, SKU2:5"}
+
+
+def call(app, method: str, path: str, body=None):
+    """Ejecuta una petición ASGI y devuelve (estado, cuerpo decodificado)"""
+    raw = b"" if body is None else body if isinstance(body, bytes) else json.dumps(body).encode()
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({"type": "http", "method": method, "path": path}, receive, send))
+    content = sent[1]["body"].decode("utf-8")
+    if dict(sent[0]["headers"])[b"content-type"].startswith(b"application/json"):
+        content = json.loads(content)
+    return sent[0]["status"], content
+
+
+class Endpoints(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QRService(workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.shutdown()
+
+    def test_health(self):
+        status, body = call(self.app, "GET", "/health")
+        self.assertEqual((status, body["status"]), (200, "ok"))
+
+    def test_validate_reports_every_error(self):
+        status, body = call(self.app, "POST", "/validate", dict(RECORD, plate="X", items=""))
+        self.assertEqual(status, 200)
+        self.assertFalse(body["valid"])
+        self.assertEqual(len(body["errors"]), 2)
+
+    def test_qr_returns_the_version_of_the_rendered_code(self):
+        for codec, output_format in (("json", "png"), ("b45", "svg"), ("min", "matrix")):
+            with self.subTest(codec=codec, format=output_format):
+                status, body = call(self.app, "POST", "/qr", dict(RECORD, codec=codec, format=output_format))
+                self.assertEqual(status, 200, body)
+                version, modules = qr_stats(encode_payload(body["payload"], codec))
+                self.assertEqual((body["qr_version"], body["modules"]), (version, modules))
+                self.assertEqual(len(body["qr"]), 1)
+                base64.b64decode(body["qr"][0])
+
+    def test_split_response_has_no_single_version(self):
+        items = ", ".join(f"SKU{n:05d}:{n + 1}" for n in range(80))
+        status, body = call(self.app, "POST", "/qr", dict(RECORD, items=items, codec="min", max_version=10))
+        self.assertEqual(status, 200, body)
+        self.assertGreater(len(body["qr"]), 1)
+        self.assertNotIn("qr_version", body)
+
+    def test_errors(self):
+        oversized = dict(RECORD, items=", ".join(f"SKU{n:05d}:{n + 1}" for n in range(3000)))
+        cases = [
+            ("GET", "/nope", None, 404),
+            ("POST", "/qr", b"{not json", 400),
+            ("POST", "/qr", dict(RECORD, codec="xml"), 400),
+            ("POST", "/qr", dict(RECORD, max_version=True), 400),
+            ("POST", "/qr", dict(RECORD, max_version=41), 400),
+            ("POST", "/qr", dict(RECORD, plate="X"), 422),
+            ("POST", "/qr", oversized, 422),
+            ("POST", "/batch", {"records": []}, 400),
+        ]
+        for method, path, body, expected in cases:
+            with self.subTest(path=path, expected=expected):
+                status, response = call(self.app, method, path, body)
+                self.assertEqual(status, expected, response)
+                self.assertIn("error", response)
+
+    def test_batch_mixes_valid_and_invalid_rows(self):
+        status, body = call(self.app, "POST", "/batch", {"records": [RECORD, dict(RECORD, plate="X"), "row"]})
+        self.assertEqual(status, 200)
+        self.assertEqual((body["generated"], body["failed"]), (1, 2))
+        self.assertEqual([r["row"] for r in body["results"]], [1, 2, 3])
+
+    def test_verify_reports_hostile_scans_as_invalid(self):
+        for text in ("TQ1:300BB89L8KI9PI0IZA1BGGDI+RNN:L/S1", "TQ1:%%%", '{"p":"ABC","i":[1,2]}'):
+            with self.subTest(text=text):
+                status, body = call(self.app, "POST", "/verify", {"payload": text})
+                self.assertEqual(status, 200, body)
+                self.assertEqual((body["valid"], body["payload"]), (False, None))
+                self.assertTrue(body["errors"])
+
+
+if __name__ == "__main__":
+    unittest.main()
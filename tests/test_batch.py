@@ -0,0 +1,97 @@
+"""Generación por lotes: manifiestos CSV/JSONL, ZIP o directorio y reporte de errores"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+from truck_qr.batch import ERROR_REPORT_NAME, RECORD_OBJECT_ERROR, UnreadableRow, read_manifest, run_batch
+
+VALID = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+         "date_time_at_gate": "2024-05-01T09:05:00", "items": "SKU1:10, SKU2:5"}
+FIELDS = list(VALID)
+
+
+class ReadManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_csv_and_jsonl_give_the_same_records(self):
+        csv_path = os.path.join(self.tmp.name, "manifest.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerow(VALID)
+        jsonl_path = os.path.join(self.tmp.name, "manifest.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(VALID) + "\n\n")
+
+        self.assertEqual(list(read_manifest(csv_path)), [VALID])
+        self.assertEqual(list(read_manifest(jsonl_path)), [VALID])
+
+    def test_invalid_json_lines_keep_their_row(self):
+        path = os.path.join(self.tmp.name, "manifest.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(VALID) + '\n{"plate": "ABC\n[1, 2]\n')
+
+        rows = list(read_manifest(path))
+        self.assertEqual(rows[0], VALID)
+        self.assertIsInstance(rows[1], UnreadableRow)
+        self.assertTrue(rows[1].error.startswith("Invalid JSON on line 2: "))
+        self.assertEqual(rows[2], [1, 2])
+
+
+class RunBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_zip_with_generated_codes_and_error_report(self):
+        records = [VALID, dict(VALID, plate="X"), dict(VALID, plate="DEF-456", items="")]
+        output = os.path.join(self.tmp.name, "out", "codes.zip")
+
+        result = run_batch(iter(records), output, workers=1)
+
+        self.assertEqual((result.total_rows, result.generated, result.failed), (3, 1, 2))
+        with zipfile.ZipFile(output) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["00001_ABC-123.png", ERROR_REPORT_NAME])
+            self.assertTrue(archive.read("00001_ABC-123.png").startswith(b"\x89PNG"))
+            report = list(csv.DictReader(io.StringIO(archive.read(ERROR_REPORT_NAME).decode("utf-8"))))
+        self.assertEqual([(row["row"], row["plate"]) for row in report], [("2", "X"), ("3", "DEF-456")])
+
+    def test_unreadable_and_non_object_rows_go_to_the_error_report(self):
+        path = os.path.join(self.tmp.name, "manifest.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join([json.dumps(VALID), "{not json", "[1, 2]", '"ABC-123"', json.dumps(VALID)]) + "\n")
+        output = os.path.join(self.tmp.name, "codes")
+
+        result = run_batch(read_manifest(path), output, workers=1)
+
+        self.assertEqual((result.total_rows, result.generated, result.failed), (5, 2, 3))
+        with open(os.path.join(output, ERROR_REPORT_NAME), encoding="utf-8") as f:
+            report = list(csv.DictReader(f))
+        self.assertEqual([(row["row"], row["plate"]) for row in report], [("2", ""), ("3", ""), ("4", "")])
+        self.assertTrue(report[0]["error"].startswith("Invalid JSON on line 2: "))
+        self.assertEqual([row["error"] for row in report[1:]], [RECORD_OBJECT_ERROR] * 2)
+
+    def test_directory_output_splits_large_manifests(self):
+        items = ", ".join(f"SKU{n:05d}:{n + 1}" for n in range(60))
+        output = os.path.join(self.tmp.name, "codes")
+
+        result = run_batch(iter([dict(VALID, items=items)]), output, workers=1, codec="min", max_version=10,
+                           output_format="matrix")
+
+        self.assertEqual(result.generated, 1)
+        parts = sorted(name for name in os.listdir(output) if name != ERROR_REPORT_NAME)
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(name.startswith("00001_ABC-123_p") for name in parts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Caché LRU de QR renderizados: claves de contenido, desalojo y nivel en disco"""
+
+import tempfile
+import unittest
+
+from truck_qr.cache import QRCache
+from truck_qr.generator import TruckQRGenerator
+
+DATA = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+        "date_time_at_gate": "2024-05-01T09:05:00", "item_list": [{"item_id": "SKU1", "quantity": 10}]}
+
+
+class CacheKeys(unittest.TestCase):
+
+    def test_key_ignores_empty_fields_and_key_order(self):
+        reordered = dict(reversed(list(DATA.items())), company="", truckType=None)
+        self.assertEqual(QRCache.make_key(DATA, codec="json"), QRCache.make_key(reordered, codec="json"))
+
+    def test_key_depends_on_content_and_settings(self):
+        key = QRCache.make_key(DATA, codec="json")
+        self.assertNotEqual(key, QRCache.make_key(dict(DATA, plate="ABC-124"), codec="json"))
+        self.assertNotEqual(key, QRCache.make_key(DATA, codec="b45"))
+
+
+class LRU(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QRCache(max_entries=2)
+        cache.put("a", (b"A", "a"))
+        cache.put("b", (b"B", "b"))
+        self.assertEqual(cache.get("a"), (b"A", "a"))
+        cache.put("c", (b"C", "c"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), (b"A", "a"))
+        self.assertEqual(cache.stats(), {"hits": 2, "disk_hits": 0, "misses": 1, "evictions": 1, "size": 2,
+                                         "max_entries": 2})
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            QRCache(max_entries=0)
+
+    def test_disk_level_survives_a_new_instance(self):
+        with tempfile.TemporaryDirectory() as disk_dir:
+            QRCache(disk_dir=disk_dir).put("k1", (b"PNG", "payload"))
+            cache = QRCache(disk_dir=disk_dir)
+            self.assertEqual(cache.get("k1"), (b"PNG", "payload"))
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+            self.assertEqual(cache.get("k1"), (b"PNG", "payload"))
+            self.assertEqual(cache.stats()["hits"], 1)
+
+
+class GeneratorUsesCache(unittest.TestCase):
+
+    def test_second_render_is_a_hit_with_the_same_png(self):
+        cache = QRCache()
+        first = TruckQRGenerator.generate_qr_png(DATA, "min", cache=cache)
+        second = TruckQRGenerator.generate_qr_png(DATA, "min", cache=cache)
+
+        self.assertIs(first, second)
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
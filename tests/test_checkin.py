@@ -0,0 +1,183 @@
+"""Check-in en puerta: lecturas mal formadas, fragmentos, firmas y cruce con las llegadas"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import fuzz
+from truck_qr.checkin import (RESULT_ALREADY_CHECKED_IN, RESULT_CHECKED_IN, RESULT_INVALID, RESULT_MISMATCH,
+                              RESULT_UNEXPECTED, ArrivalStore, GateScanner, main, read_scans, verify_payload)
+from truck_qr.codec import CODECS, encode_payload
+from truck_qr.record import validate_record
+from truck_qr.signing import (REQUIRE_SIGNATURE_ENV, SIGNING_KEY_ENV, VERIFY_KEYS_ENV, HMACKey, Keyring,
+                              sign_payload)
+from truck_qr.split import split_payload
+
+# Lectura b45 cuyo instante de puerta desborda ``datetime`` (antes escapaba como OverflowError)
+OVERFLOW_SCAN = "TQ1:300BB89L8KI9PI0IZA1BGGDI+RNN:L/S1"
+
+FIELDS = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+          "date_time_at_gate": "2024-05-01T09:05:00", "items": "SKU1:10, SKU2:5"}
+
+
+def payload(**changes) -> dict:
+    record, errors = validate_record(dict(FIELDS, **changes))
+    assert not errors, errors
+    return record.to_payload()
+
+
+class VerifyPayload(unittest.TestCase):
+
+    def test_malformed_scans_are_invalid_not_exceptions(self):
+        for text in ['{"p":"ABC","i":[1,2]}', '{"p":"ABC","i":[["A"]]}', '{"plate":"ABC","item_list":[1,2]}',
+                     '{"plate":"ABC","item_list":[{"item_id":["A"],"quantity":{}}]}', "TQ1:", "TQ1:%%%", "[]",
+                     "", "not a qr", OVERFLOW_SCAN]:
+            with self.subTest(text=text):
+                record, errors = verify_payload(text)
+                self.assertIsNone(record)
+                self.assertTrue(errors)
+
+    def test_mutated_payloads_never_raise(self):
+        """Cualquier lectura corrupta (caracteres cambiados, cortados o repetidos) da errores o un registro"""
+        def strategy(rnd):
+            text = encode_payload(payload(), rnd.choice(CODECS))
+            for _ in range(rnd.randint(1, 4)):
+                position = rnd.randrange(len(text))
+                text = text[:position] + fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS + "[]{}0", 0, 3) + \
+                    text[position + rnd.randint(0, 3):]
+            return text
+
+        def prop(text):
+            record, errors = verify_payload(text)
+            self.assertEqual(record is None, bool(errors))
+
+        fuzz.check(self, strategy, prop, fuzz.EXAMPLES * 3)
+
+    def test_signature_is_checked_with_a_keyring(self):
+        key = HMACKey("k1", b"0123456789abcdef0123456789abcdef")
+        keyring = Keyring([key])
+        signed = sign_payload(payload(), key)
+        self.assertEqual(verify_payload(encode_payload(signed, "short"), keyring)[1], [])
+
+        tampered = encode_payload(dict(signed, plate="XYZ-999"), "short")
+        self.assertEqual(len(verify_payload(tampered, keyring)[1]), 1)
+        self.assertEqual(len(verify_payload(encode_payload(payload(), "short"), keyring)[1]), 1)
+
+
+class ReadScans(unittest.TestCase):
+
+    def test_one_scan_per_line_and_json_objects_whole(self):
+        json_text = encode_payload(payload(), "json")
+        stream = io.StringIO(f"TQ1:ABC\r\n\n{json_text}\n{{\"p\":\"X\"}}\n")
+        self.assertEqual(list(read_scans(stream)), ["TQ1:ABC", json_text, '{"p":"X"}'])
+
+    def test_blocks_keep_multi_line_chunks_intact(self):
+        chunks = split_payload(payload(items=", ".join(f"SKU{n}:{n + 1}" for n in range(40))), "json", 8)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(any(chunk.endswith((" ", "\n")) for chunk in chunks))
+        stream = io.StringIO("\n" + "\n".join(chunks) + "\n")
+        self.assertEqual(list(read_scans(stream, blocks=True)), chunks)
+
+
+class CheckIn(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ArrivalStore()
+        self.addCleanup(self.store.close)
+        self.scanner = GateScanner(self.store)
+
+    def test_check_in_then_already_checked_in(self):
+        self.store.add_expected([{"plate": "abc-123", "customer_id": "cust001"}])
+        text = encode_payload(payload(), "b45")
+        self.assertEqual(self.scanner.scan(text).status, RESULT_CHECKED_IN)
+        self.assertEqual(self.scanner.scan(text).status, RESULT_ALREADY_CHECKED_IN)
+
+    def test_unexpected_and_invalid(self):
+        self.assertEqual(self.scanner.scan(encode_payload(payload(), "min")).status, RESULT_UNEXPECTED)
+        self.assertEqual(self.scanner.scan('{"p":"ABC","i":[1,2]}').status, RESULT_INVALID)
+        self.assertEqual(self.scanner.scan(OVERFLOW_SCAN).status, RESULT_INVALID)
+
+    def test_delivery_ref_mismatch(self):
+        self.store.add_expected([{"plate": "DEF-456", "customer_id": "CUST001", "delivery_ref": "DO-1"}])
+        result = self.scanner.scan(encode_payload(payload(deliveryOrderRef="DO-1"), "min"))
+        self.assertEqual(result.status, RESULT_MISMATCH)
+        self.assertIn("Delivery DO-1 is expected for plate DEF-456", result.errors[0])
+
+    def test_ref_falls_back_to_plate_and_date(self):
+        """Una lectura con referencia se cruza con una llegada cargada sin ella (misma placa y fecha)"""
+        self.store.add_expected([
+            {"plate": "ABC-123", "customer_id": "CUST001", "expected_date": "2024-04-30"},
+            {"plate": "ABC-123", "customer_id": "CUST001", "expected_date": "2024-05-01"},
+        ])
+        text = encode_payload(payload(deliveryOrderRef="DO-9"), "min")
+        result = self.scanner.scan(text)
+        self.assertEqual(result.status, RESULT_CHECKED_IN)
+        self.assertEqual(result.arrival.expected_date, "2024-05-01")
+        self.assertEqual(self.scanner.scan(text).status, RESULT_ALREADY_CHECKED_IN)
+
+    def test_split_payload_is_reassembled(self):
+        self.store.add_expected([{"plate": "ABC-123", "customer_id": "CUST001"}])
+        chunks = split_payload(payload(items=", ".join(f"SKU{n}:{n + 1}" for n in range(40))), "min", 8)
+        results = [self.scanner.scan(chunk) for chunk in reversed(chunks)]
+        self.assertEqual(results[:-1], [None] * (len(chunks) - 1))
+        self.assertEqual(results[-1].status, RESULT_CHECKED_IN)
+
+
+class ScanCommand(unittest.TestCase):
+
+    def setUp(self):
+        # Sin claves de firma del entorno
+        environ = mock.patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        for name in (SIGNING_KEY_ENV, VERIFY_KEYS_ENV, REQUIRE_SIGNATURE_ENV):
+            os.environ.pop(name, None)
+
+    def run_main(self, argv, stdin):
+        out = io.StringIO()
+        with mock.patch.object(sys, "stdin", io.StringIO(stdin)), contextlib.redirect_stdout(out):
+            code = main(argv)
+        return code, out.getvalue().splitlines()
+
+    def test_scan_reads_json_codec_and_malformed_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "gate.db")
+            with ArrivalStore(db) as store:
+                store.add_expected([{"plate": "ABC-123", "customer_id": "CUST001"}])
+            stdin = encode_payload(payload(), "json") + f'\n{{"p":"ABC","i":[1,2]}}\n{OVERFLOW_SCAN}\n'
+
+            code, lines = self.run_main(["--db", db, "scan"], stdin)
+
+        self.assertEqual(code, 1)
+        self.assertEqual([line.split("\t")[0] for line in lines],
+                         [RESULT_CHECKED_IN, RESULT_INVALID, RESULT_INVALID])
+
+    def test_expect_reports_unreadable_manifest_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db, manifest = os.path.join(tmp, "gate.db"), os.path.join(tmp, "arrivals.jsonl")
+            with open(manifest, "w", encoding="utf-8") as f:
+                f.write('{"plate": "ABC-123", "customer_id": "CUST001"}\n{"plate": \n[1, 2]\n')
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                code, lines = self.run_main(["--db", db, "expect", manifest], "")
+
+        self.assertEqual((code, lines), (1, ["1 expected arrivals loaded, 2 rejected"]))
+        self.assertEqual([line.split(":")[0] for line in stderr.getvalue().splitlines()], ["Row 2", "Row 3"])
+
+    def test_scan_blocks_reads_json_chunks(self):
+        chunks = split_payload(payload(items=", ".join(f"SKU{n}:{n + 1}" for n in range(40))), "json", 8)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "gate.db")
+            with ArrivalStore(db) as store:
+                store.add_expected([{"plate": "ABC-123", "customer_id": "CUST001"}])
+            code, lines = self.run_main(["--db", db, "scan", "--blocks"], "\n".join(chunks) + "\n")
+
+        self.assertEqual((code, [line.split("\t")[0] for line in lines]), (0, [RESULT_CHECKED_IN]))
+
+
+if __name__ == "__main__":
+    unittest.main()
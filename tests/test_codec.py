@@ -0,0 +1,175 @@
+"""Propiedades de los codecs, la división en varios QR, la estimación y la firma"""
+
+import json
+import os
+import random
+import unittest
+from unittest import mock
+
+from tests import fuzz
+from truck_qr.codec import (B45_PREFIX, CODECS, b45encode, b64url_encode, clean_payload, decode_payload, encode_payload,
+                            pack_binary)
+from truck_qr.estimate import PayloadEstimator
+from truck_qr.generator import ValidationError
+from truck_qr.record import validate_record
+from truck_qr.signing import (REQUIRE_SIGNATURE_ENV, TAMPERED_ERROR, UNSIGNED_ERROR, VERIFY_KEYS_ENV, HMACKey, Keyring,
+                              sign_payload, verify_signature)
+from truck_qr.split import join_chunks, split_payload
+
+
+def _payload(rnd, items=None):
+    record, _ = validate_record(fuzz.record(rnd, items or rnd.choice([1, 3, 20, 80])))
+    return record.to_payload()
+
+
+class CodecProperties(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Todo payload válido se decodifica igual con cualquier codec"""
+        def prop(data):
+            for codec in CODECS:
+                self.assertEqual(decode_payload(encode_payload(data, codec)), clean_payload(data), codec)
+
+        fuzz.check(self, _payload, prop)
+
+    def test_split_round_trip(self):
+        def prop(example):
+            data, codec, max_version = example
+            chunks = split_payload(data, codec, max_version)
+            self.assertEqual(decode_payload(join_chunks(reversed(chunks))), clean_payload(data))
+
+        fuzz.check(self, lambda rnd: (_payload(rnd, rnd.choice([5, 40])), rnd.choice(CODECS), rnd.randint(8, 20)),
+                   prop, fuzz.EXAMPLES // 4)
+
+    def test_estimate_is_exact(self):
+        """La estimación en vivo da los mismos bytes que el payload real"""
+        estimator = PayloadEstimator()
+
+        def prop(fields):
+            record, _ = validate_record(fields)
+            for codec in CODECS:
+                payload = encode_payload(record.to_payload(), codec)
+                self.assertEqual(estimator.estimate(fields, codec).payload_bytes, len(payload.encode("utf-8")), codec)
+
+        fuzz.check(self, lambda rnd: fuzz.record(rnd, rnd.randint(1, 40)), prop)
+
+
+class MalformedPayloads(unittest.TestCase):
+
+    def test_wrong_shapes_raise_validation_error(self):
+        for text in ['{"p":"ABC","i":[1,2]}', '{"p":"ABC","i":[["A"]]}', '{"p":"ABC","i":[["A",1,2]]}',
+                     '{"p":"ABC","i":{"A":1}}', '{"p":"ABC","i":[["A","1"]]}', '{"p":"ABC","i":[[1,1]]}',
+                     '{"plate":"ABC","item_list":[1,2]}', '{"plate":"ABC","item_list":"A:1"}',
+                     '{"plate":"ABC","item_list":[{"item_id":"A","quantity":true}]}',
+                     '{"plate":["ABC"],"item_list":[]}', '{"p":7,"i":[]}', '{"plate":"ABC","sig":{}}']:
+            with self.subTest(text=text):
+                with self.assertRaises(ValidationError):
+                    decode_payload(text)
+
+    def test_arbitrary_json_never_raises_anything_else(self):
+        """Cualquier JSON da un diccionario o ``ValidationError``"""
+        def value(rnd, depth=0):
+            kinds = ["str", "int", "bool", "null"] + (["list", "dict"] if depth < 3 else [])
+            kind = rnd.choice(kinds)
+            if kind == "list":
+                return [value(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+            if kind == "dict":
+                keys = ["item_id", "quantity", "x"]
+                return {rnd.choice(keys): value(rnd, depth + 1) for _ in range(rnd.randint(0, 3))}
+            return {"str": "A", "int": rnd.randint(-5, 5), "bool": True, "null": None}[kind]
+
+        def strategy(rnd):
+            keys = rnd.choice([["p", "d", "i", "s"], ["plate", "driverName", "item_list", "sig"]])
+            return json.dumps({key: value(rnd) for key in rnd.sample(keys, rnd.randint(1, len(keys)))})
+
+        def prop(text):
+            try:
+                self.assertIsInstance(decode_payload(text), dict)
+            except ValidationError:
+                pass
+
+        fuzz.check(self, strategy, prop, fuzz.EXAMPLES * 3)
+
+    def test_b45_rejects_dates_before_epoch(self):
+        record, _ = validate_record({**fuzz.record(random.Random(0)), "date_time_at_gate": "1999-12-31T23:59:00"})
+        with self.assertRaisesRegex(ValidationError, "before 2000"):
+            encode_payload(record.to_payload(), "b45")
+        # La estimación en vivo no falla mientras tanto
+        self.assertIsNotNone(PayloadEstimator().estimate(record.to_payload(), "b45").version)
+
+    def test_hostile_b45_scans_raise_validation_error(self):
+        """Enteros enormes, varints sin fin y bytes sobrantes no escapan como otras excepciones"""
+        valid = pack_binary(_payload(random.Random(1)))
+        for text in ["TQ1:300BB89L8KI9PI0IZA1BGGDI+RNN:L/S1",
+                     B45_PREFIX + b45encode(b"\x00\x01A\x01B\x01C" + b"\xff" * 20 + b"\x01\x00"),
+                     B45_PREFIX + b45encode(valid + b"\x00")]:
+            with self.subTest(text=text):
+                with self.assertRaises(ValidationError):
+                    decode_payload(text)
+
+    def test_random_binary_never_raises_anything_else(self):
+        def strategy(rnd):
+            raw = bytearray(pack_binary(_payload(rnd)))
+            for _ in range(rnd.randint(1, 4)):
+                raw[rnd.randrange(len(raw))] = rnd.randrange(256)
+            return B45_PREFIX + b45encode(bytes(raw))
+
+        def prop(text):
+            try:
+                self.assertIsInstance(decode_payload(text), dict)
+            except ValidationError:
+                pass
+
+        fuzz.check(self, strategy, prop, fuzz.EXAMPLES * 3)
+
+
+class SignatureProperties(unittest.TestCase):
+
+    key = HMACKey("k1", b"0123456789abcdef0123456789abcdef")
+    keyring = Keyring([key])
+
+    def test_unsigned_payloads_are_rejected_when_a_key_is_set(self):
+        unsigned = decode_payload(encode_payload(_payload(random.Random(1)), "b45"))
+        self.assertTrue(self.keyring.required)
+        self.assertEqual(verify_signature(unsigned, self.keyring), UNSIGNED_ERROR)
+        self.assertIsNone(verify_signature(unsigned, Keyring([self.key], required=False)))
+        self.assertIsNone(verify_signature(unsigned, Keyring()))
+
+    def test_environment_requires_signatures_unless_opted_out(self):
+        entry = f"k1:hmac:{b64url_encode(self.key.secret)}"
+        cases = [({VERIFY_KEYS_ENV: entry}, True), ({VERIFY_KEYS_ENV: entry, REQUIRE_SIGNATURE_ENV: "0"}, False),
+                 ({REQUIRE_SIGNATURE_ENV: "1"}, True), ({}, None)]
+        for environ, required in cases:
+            with self.subTest(environ=environ), mock.patch.dict(os.environ, environ, clear=True):
+                keyring = Keyring.from_env()
+                self.assertEqual(None if keyring is None else keyring.required, required)
+        with mock.patch.dict(os.environ, {VERIFY_KEYS_ENV: entry, REQUIRE_SIGNATURE_ENV: "maybe"}, clear=True):
+            with self.assertRaisesRegex(ValueError, REQUIRE_SIGNATURE_ENV):
+                Keyring.from_env()
+
+    def test_signed_payloads_verify_with_every_codec(self):
+        def prop(data):
+            signed = sign_payload(data, self.key)
+            for codec in CODECS:
+                self.assertIsNone(verify_signature(decode_payload(encode_payload(signed, codec)), self.keyring), codec)
+
+        fuzz.check(self, _payload, prop)
+
+    def test_any_changed_quantity_is_detected(self):
+        def strategy(rnd):
+            data = _payload(rnd)
+            position = rnd.randrange(len(data["item_list"]))
+            return data, position, rnd.choice(CODECS)
+
+        def prop(example):
+            data, position, codec = example
+            decoded = decode_payload(encode_payload(sign_payload(data, self.key), codec))
+            item = decoded["item_list"][position]
+            item["quantity"] += 1
+            self.assertEqual(verify_signature(decoded, self.keyring), TAMPERED_ERROR)
+
+        fuzz.check(self, strategy, prop)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Propiedades de ``validate_datetime`` y del camino ISO de ``validate_record``"""
+
+import os
+import time
+import unittest
+from datetime import date, datetime, timedelta
+
+from tests import fuzz
+from truck_qr.generator import TruckQRGenerator
+from truck_qr.record import validate_record
+
+g = TruckQRGenerator
+BASE = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST01", "items": "A:1"}
+
+
+def _past_time(rnd):
+    gate = datetime.now() - timedelta(minutes=rnd.randint(1, 60 * 24 * 365 * 30))
+    return gate.replace(second=0, microsecond=0)
+
+
+class ValidateDatetimeProperties(unittest.TestCase):
+
+    def test_twelve_hour_clock_round_trip(self):
+        """Cualquier fecha pasada en formato de 12 horas da el ISO de 24 horas correspondiente"""
+        def prop(gate):
+            is_valid, dt_iso, errors = g.validate_datetime(gate.date(), gate.strftime("%I"), gate.strftime("%M"),
+                                                           gate.strftime("%p"))
+            self.assertEqual(errors, [])
+            self.assertTrue(is_valid)
+            self.assertEqual(dt_iso, gate.strftime(g.BOOMI_CONFIG['date_format']))
+
+        fuzz.check(self, _past_time, prop)
+
+    def test_future_is_rejected(self):
+        def prop(gate):
+            is_valid, dt_iso, errors = g.validate_datetime(gate.date(), gate.strftime("%I"), gate.strftime("%M"),
+                                                           gate.strftime("%p"))
+            self.assertFalse(is_valid)
+            self.assertIsNone(dt_iso)
+            self.assertEqual(errors, ["Date and time cannot be in the future."])
+
+        fuzz.check(self, lambda rnd: datetime.now() + timedelta(minutes=rnd.randint(2, 10 ** 6)), prop)
+
+    def test_arbitrary_hour_and_minute_never_raise(self):
+        """Con horas y minutos hostiles devuelve errores, nunca una excepción"""
+        def strategy(rnd):
+            return (fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS + "0123456789", 0, 4),
+                    fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS + "0123456789", 0, 4),
+                    rnd.choice(["AM", "PM", "", "pm", "XX"]))
+
+        def prop(example):
+            is_valid, dt_iso, errors = g.validate_datetime(date(2020, 2, 29), *example)
+            self.assertEqual(is_valid, not errors)
+            self.assertEqual(is_valid, dt_iso is not None)
+            if is_valid:
+                datetime.strptime(dt_iso, g.BOOMI_CONFIG['date_format'])
+
+        fuzz.check(self, strategy, prop, fuzz.EXAMPLES * 5)
+
+    def test_out_of_range_time(self):
+        for hour, minute, ampm in [("13", "00", "PM"), ("24", "00", "AM"), ("00", "60", "AM"), ("-1", "10", "AM")]:
+            with self.subTest(hour=hour, minute=minute, ampm=ampm):
+                is_valid, _, errors = g.validate_datetime(date(2020, 1, 1), hour, minute, ampm)
+                self.assertFalse(is_valid)
+                self.assertEqual(errors, ["Invalid time format."])
+
+    def test_missing_fields(self):
+        is_valid, _, errors = g.validate_datetime(None, "", "", "AM")
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 2)
+
+    def test_record_iso_matches_form_fields(self):
+        """``date_time_at_gate`` ISO y los campos del formulario dan el mismo resultado"""
+        def prop(gate):
+            iso_record, iso_errors = validate_record({**BASE, "date_time_at_gate": gate.isoformat()})
+            form_record, form_errors = validate_record({**BASE, "date": gate.date().isoformat(),
+                                                        "hour": gate.strftime("%I"), "minute": gate.strftime("%M"),
+                                                        "ampm": gate.strftime("%p")})
+            self.assertEqual(iso_errors, form_errors)
+            self.assertEqual(iso_record, form_record)
+
+        fuzz.check(self, _past_time, prop)
+
+    def test_offset_is_converted_to_local_time(self):
+        """Una hora con zona se interpreta en la hora local del servidor, no se descarta la zona"""
+        previous = os.environ.get("TZ")
+        os.environ["TZ"] = "EST+5"
+        time.tzset()
+        try:
+            record, errors = validate_record({**BASE, "date_time_at_gate": "2024-05-01T14:05:00+00:00"})
+        finally:
+            if previous is None:
+                del os.environ["TZ"]
+            else:
+                os.environ["TZ"] = previous
+            time.tzset()
+        self.assertEqual(errors, [])
+        self.assertEqual(record.date_time_at_gate, "2024-05-01T09:05:00")
+
+    def test_unparseable_iso_is_reported_as_such(self):
+        record, errors = validate_record({**BASE, "date_time_at_gate": "2024-13-45T09:05"})
+        self.assertIsNone(record)
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Invalid date_time_at_gate: '2024-13-45T09:05'", errors[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+"""Cola de salida hacia Boomi: envío, spool en disco y reenvío con líneas corruptas"""
+
+import asyncio
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from truck_qr.delivery import BoomiDelivery, DeliveryError, RetrySpool, StubServer, _read_response, envelope
+
+DATA = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+        "date_time_at_gate": "2024-05-01T09:05:00", "item_list": [{"item_id": "SKU1", "quantity": 10}]}
+
+
+def line(record) -> bytes:
+    return json.dumps(record).encode("utf-8") + b"\n"
+
+
+def read_response(raw: bytes, eof: bool = False):
+    """``_read_response`` sobre bytes fijos; sin ``eof`` la conexión sigue abierta"""
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        if eof:
+            reader.feed_eof()
+        return await asyncio.wait_for(_read_response(reader), 1)
+
+    return asyncio.run(read())
+
+
+class ReadResponse(unittest.TestCase):
+
+    def test_responses_without_body_do_not_wait_for_the_close(self):
+        for raw, expected in ((b"HTTP/1.1 204 No Content\r\n\r\n", 204),
+                              (b"HTTP/1.1 304 Not Modified\r\nETag: x\r\n\r\n", 304),
+                              (b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 204 No Content\r\n\r\n", 204)):
+            with self.subTest(raw=raw):
+                status, headers, body = read_response(raw)
+                self.assertEqual((status, body), (expected, b""))
+                self.assertNotEqual(headers.get("connection"), "close")
+
+    def test_body_is_read_to_the_end_only_when_the_server_closes(self):
+        status, headers, body = read_response(b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n{}", eof=True)
+        self.assertEqual((status, body), (200, b"{}"))
+        # Keep-alive sin longitud: no se espera el cierre y la conexión no se reutiliza
+        status, headers, body = read_response(b"HTTP/1.1 200 OK\r\n\r\n{}")
+        self.assertEqual((status, body, headers["connection"]), (200, b"", "close"))
+
+    def test_chunked_body_with_trailers(self):
+        raw = b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n2;x=1\r\n{}\r\n0\r\nX-Sum: 1\r\n\r\n"
+        self.assertEqual(read_response(raw)[2], b"{}")
+
+    def test_malformed_lengths_raise_delivery_error(self):
+        for raw in (b"HTTP/1.1 200 OK\r\nContent-Length: ten\r\n\r\n",
+                    b"HTTP/1.1 200 OK\r\nContent-Length: -1\r\n\r\n",
+                    b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n",
+                    b"HTTP/1.1\r\n\r\n"):
+            with self.subTest(raw=raw), self.assertRaises(DeliveryError):
+                read_response(raw)
+
+
+class Delivery(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        cls.thread = threading.Thread(target=cls.loop.run_forever, daemon=True)
+        cls.thread.start()
+        cls.stub = asyncio.run_coroutine_threadsafe(StubServer().start(), cls.loop).result()
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.stub.close(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+
+    def setUp(self):
+        self.stub.status = 200
+        self.stub.ids.clear()
+        self.stub.records = 0
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        # Los avisos de reenvío van a stderr
+        patcher = mock.patch("sys.stderr", new_callable=io.StringIO)
+        self.stderr = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def delivery(self, **options) -> BoomiDelivery:
+        options = {"backoff_base": 0.01, "max_retries": 1, "replay_interval": None, **options}
+        delivery = BoomiDelivery(self.stub.url, spool_dir=self.dir.name, **options)
+        self.addCleanup(delivery.close)
+        return delivery
+
+    def raw_server(self, response: bytes) -> str:
+        """Endpoint que responde siempre los mismos bytes sin cerrar la conexión"""
+        async def handle(reader, writer):
+            try:
+                while await reader.readline():
+                    length = 0
+                    while (header := await reader.readline()) not in (b"\r\n", b""):
+                        if header.lower().startswith(b"content-length:"):
+                            length = int(header.split(b":")[1])
+                    await reader.readexactly(length)
+                    writer.write(response)
+                    await writer.drain()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            finally:
+                writer.close()
+
+        server = asyncio.run_coroutine_threadsafe(asyncio.start_server(handle, "127.0.0.1", 0), self.loop).result()
+        self.addCleanup(self.loop.call_soon_threadsafe, server.close)
+        return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/records"
+
+    def write_pending(self, *lines: bytes) -> None:
+        with open(os.path.join(self.dir.name, RetrySpool.PENDING), "ab") as f:
+            f.write(b"".join(lines))
+
+    def test_submitted_records_are_delivered(self):
+        delivery = self.delivery()
+        for _ in range(5):
+            self.assertTrue(delivery.submit(DATA))
+        self.assertTrue(delivery.flush(10))
+        self.assertEqual(delivery.stats["sent"], 5)
+        self.assertEqual(self.stub.records, 5)
+
+    def test_no_content_on_keep_alive_is_delivered_once(self):
+        delivery = BoomiDelivery(self.raw_server(b"HTTP/1.1 204 No Content\r\n\r\n"), spool_dir=self.dir.name,
+                                 timeout=2, replay_interval=None, batch_interval=0)
+        self.addCleanup(delivery.close)
+        for _ in range(3):
+            delivery.submit(DATA)
+            self.assertTrue(delivery.flush(10))
+        self.assertEqual((delivery.stats["sent"], delivery.stats["retries"]), (3, 0))
+        self.assertEqual(delivery._pool.opened, 1)
+
+    def test_malformed_response_spools_the_batch(self):
+        delivery = BoomiDelivery(self.raw_server(b"HTTP/1.1 200 OK\r\nContent-Length: ten\r\n\r\n"),
+                                 spool_dir=self.dir.name, max_retries=0, replay_interval=None)
+        self.addCleanup(delivery.close)
+        delivery.submit(DATA)
+        self.assertTrue(delivery.flush(10))
+        self.assertEqual((delivery.stats["sent"], delivery.stats["spooled"]), (0, 1))
+        self.assertEqual(delivery.spool.pending(), 1)
+        self.assertIn("DeliveryError: Invalid HTTP response", self.stderr.getvalue())
+
+    def test_full_queue_spools_off_the_calling_thread(self):
+        delivery = self.delivery(max_queue=0)
+        writers = []
+        append = delivery.spool.append
+
+        def record_thread(records):
+            writers.append(threading.current_thread())
+            append(records)
+
+        with mock.patch.object(delivery.spool, "append", record_thread):
+            self.assertFalse(delivery.submit(DATA))
+            self.assertTrue(delivery.flush(10))
+        self.assertEqual(delivery.stats["spooled"], 1)
+        self.assertEqual(delivery.spool.pending(), 1)
+        self.assertNotIn(threading.current_thread(), writers)
+
+        delivery.close()
+        self.assertFalse(delivery.submit(DATA))
+        self.assertEqual((delivery.stats["spooled"], delivery.spool.pending()), (2, 2))
+
+    def test_failed_batches_are_spooled_and_replayed(self):
+        self.stub.status = 503
+        delivery = self.delivery()
+        delivery.submit(DATA)
+        delivery.flush(10)
+        self.assertEqual(delivery.stats["spooled"], 1)
+        self.assertEqual(delivery.spool.pending(), 1)
+
+        self.stub.status = 200
+        self.assertEqual(delivery.replay(10), 1)
+        self.assertEqual(delivery.spool.pending(), 0)
+        self.assertEqual(self.stub.records, 1)
+
+    def test_corrupt_lines_are_quarantined(self):
+        good = [envelope(DATA), envelope(DATA)]
+        bad = [b'{"id": "truncated", "payl', b"\xff\xfe not utf-8\n", b"[1, 2]\n"]
+        self.write_pending(line(good[0]), bad[0] + b"\n", bad[1], b"\n", bad[2], line(good[1]))
+        delivery = self.delivery()
+
+        self.assertEqual(delivery.replay(10), 2)
+        self.assertEqual(self.stub.ids, {record["id"] for record in good})
+        self.assertEqual(delivery.spool.pending(), 0)
+        self.assertEqual(delivery.spool.quarantined, 3)
+        with open(os.path.join(self.dir.name, RetrySpool.CORRUPT), "rb") as f:
+            self.assertEqual(f.read().splitlines(), [bad[0], bad[1].rstrip(), bad[2].rstrip()])
+
+    def test_truncated_last_line_does_not_block_replay(self):
+        """Una escritura cortada al final del archivo no impide los reenvíos siguientes"""
+        self.write_pending(line(envelope(DATA)), b'{"id": "cut')
+        delivery = self.delivery()
+        self.assertEqual(delivery.replay(10), 1)
+        self.write_pending(line(envelope(DATA)))
+        self.assertEqual(delivery.replay(10), 1)
+        self.assertEqual(os.listdir(self.dir.name), [RetrySpool.CORRUPT])
+
+    def test_replay_file_taken_by_another_worker(self):
+        self.write_pending(line(envelope(DATA)))
+        delivery = self.delivery()
+        paths = delivery.spool.claim()
+        gone = os.path.join(self.dir.name, "replay-0.jsonl")
+        with mock.patch.object(delivery.spool, "claim", return_value=[gone] + paths):
+            self.assertEqual(delivery.replay(10), 1)
+        # Sin pendientes el reclamo no falla aunque otro proceso los haya apartado
+        self.assertEqual(delivery.spool.claim(), [])
+
+    def test_replay_loop_survives_errors(self):
+        calls = []
+
+        async def failing_replay(delivery):
+            calls.append(time.monotonic())
+            raise RuntimeError("disk full")
+
+        with mock.patch.object(BoomiDelivery, "_replay_spool", failing_replay):
+            delivery = self.delivery(replay_interval=0.01)
+            deadline = time.monotonic() + 5
+            while len(calls) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            delivery.close()
+        self.assertGreaterEqual(len(calls), 3)
+        self.assertIn("Spool replay failed (RuntimeError: disk full)", self.stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""``generate_qr_optimized`` al límite de capacidad del QR y sin Streamlit"""
+
+import base64
+import io
+import os
+import subprocess
+import sys
+import unittest
+
+from PIL import Image
+
+from truck_qr.codec import decode_payload, encode_payload, qr_stats
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.record import validate_record
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def manifest(items: int) -> dict:
+    """Registro con una empresa Unicode (varios bytes por carácter en UTF-8)"""
+    record, errors = validate_record({
+        "plate": "ABC-123",
+        "driverName": "Mary-Ann O'Brien",
+        "customer_id": "CUST001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "company": "Transportes Ñandú 🚚 Ltda.",
+        "items": ", ".join(f"SKU{n:05d}:{n % 97 + 1}" for n in range(items)),
+    })
+    assert not errors, errors
+    return record.to_payload()
+
+
+def max_items(codec: str) -> int:
+    """Mayor número de items que cabe en un QR de versión 40 (búsqueda binaria)"""
+    low, high = 1, 4000
+    while low < high:
+        middle = (low + high + 1) // 2
+        if qr_stats(encode_payload(manifest(middle), codec))[0] is not None:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class GenerateNearCapacity(unittest.TestCase):
+
+    def _check_capacity(self, codec: str) -> None:
+        items = max_items(codec)
+        data = manifest(items)
+
+        base64_qr, payload = TruckQRGenerator.generate_qr_optimized(data, codec)
+        self.assertEqual(decode_payload(payload), data)
+        png = base64.b64decode(base64_qr)
+        self.assertTrue(png.startswith(PNG_SIGNATURE))
+        config = TruckQRGenerator.QR_RENDER_CONFIG
+        side = (40 * 4 + 17 + 2 * config["border"]) * config["box_size"]
+        self.assertEqual(Image.open(io.BytesIO(png)).size, (side, side))
+
+        with self.assertRaisesRegex(ValidationError, "does not fit in a single QR code"):
+            TruckQRGenerator.generate_qr_optimized(manifest(items + 1), codec)
+
+    def test_json_at_capacity(self):
+        self._check_capacity("json")
+
+    def test_b45_at_capacity(self):
+        self._check_capacity("b45")
+
+    def test_small_payload(self):
+        base64_qr, payload = TruckQRGenerator.generate_qr_optimized(manifest(1), "short")
+        self.assertTrue(base64.b64decode(base64_qr).startswith(PNG_SIGNATURE))
+        self.assertEqual(qr_stats(payload)[0], 8)
+
+
+class Headless(unittest.TestCase):
+
+    def test_package_does_not_import_streamlit(self):
+        """Todos los módulos de ``truck_qr`` se importan sin Streamlit"""
+        modules = sorted(name[:-3] for name in os.listdir(os.path.join(ROOT, "truck_qr"))
+                         if name.endswith(".py") and name != "__init__.py")
+        code = ("import importlib, sys\n"
+                f"for name in {modules!r}:\n"
+                "    importlib.import_module('truck_qr.' + name)\n"
+                "print('streamlit' in sys.modules)\n")
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
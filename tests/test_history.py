@@ -0,0 +1,75 @@
+"""Histórico de QR generados: escritura por lotes en segundo plano y consultas"""
+
+import csv
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from truck_qr.history import GenerationHistory, write_report
+
+START = datetime(2024, 5, 1, 6, 0)
+
+
+def data(plate: str, quantities=(10, 5)) -> dict:
+    return {"plate": plate, "driverName": "John Doe", "customer_id": "CUST001", "deliveryOrderRef": "",
+            "date_time_at_gate": "2024-05-01T09:05:00",
+            "item_list": [{"item_id": f"SKU{n}", "quantity": q} for n, q in enumerate(quantities)]}
+
+
+class History(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "history.db")
+        self.history = GenerationHistory(self.path, batch_size=3, flush_interval=0.05)
+        self.addCleanup(self.history.close)
+
+    def record_hourly(self, plates):
+        for hour, plate in enumerate(plates):
+            self.history.record(data(plate), f"payload-{hour}", "min", created_at=START + timedelta(hours=hour))
+
+    def test_rows_are_written_in_batches_and_queried_in_order(self):
+        self.record_hourly(["ABC-123", "DEF-456", "ABC-123", "GHI-789", "ABC-123"])
+        self.assertTrue(self.history.flush(timeout=5))
+        self.assertEqual(self.history.written, 5)
+
+        rows = list(self.history.query())
+        self.assertEqual([row.payload for row in rows], [f"payload-{n}" for n in range(5)])
+        self.assertIsNone(rows[0].delivery_ref)
+        self.assertEqual(rows[0].item_list(), data("ABC-123")["item_list"])
+
+    def test_query_by_range_and_plate(self):
+        self.record_hourly(["ABC-123", "DEF-456", "ABC-123", "GHI-789", "ABC-123"])
+        shift = list(self.history.query(START + timedelta(hours=1), "2024-05-01T09:00:00"))
+        self.assertEqual([row.plate for row in shift], ["DEF-456", "ABC-123"])
+        self.assertEqual(len(list(self.history.query(plate=" abc-123 "))), 3)
+        self.assertEqual(len(list(self.history.query(limit=2))), 2)
+
+    def test_rows_survive_a_reopen(self):
+        self.record_hourly(["ABC-123"])
+        self.history.close()
+        with GenerationHistory(self.path) as reopened:
+            self.assertEqual([row.plate for row in reopened.query()], ["ABC-123"])
+
+    def test_record_after_close_fails(self):
+        self.history.close()
+        with self.assertRaises(RuntimeError):
+            self.history.record(data("ABC-123"), "payload", "min")
+
+    def test_report_totals(self):
+        self.record_hourly(["ABC-123"])
+        out = io.StringIO()
+        self.assertEqual(write_report(self.history.query(), out), 1)
+        row = next(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual((row["items"], row["total_quantity"], row["created_at"]), ("2", "15", "2024-05-01T06:00:00"))
+
+    def test_memory_database_is_rejected(self):
+        with self.assertRaises(ValueError):
+            GenerationHistory(":memory:")
+
+
+if __name__ == "__main__":
+    unittest.main()
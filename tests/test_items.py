@@ -0,0 +1,100 @@
+"""Propiedades de ``TruckQRGenerator.validate_items`` con listas válidas, hostiles y enormes"""
+
+import unittest
+
+from tests import fuzz
+from truck_qr.generator import TruckQRGenerator
+
+g = TruckQRGenerator
+
+
+def _valid_list(rnd):
+    ids = fuzz.item_ids(rnd, rnd.choice([1, 2, 5, 50, 300]))
+    quantities = [rnd.choice([1, 5, 999, 10 ** rnd.randint(0, 15)]) for _ in ids]
+    raw = fuzz.items_text(rnd, [fuzz.item_entry(rnd, i, q) for i, q in zip(ids, quantities)])
+    return raw, [{"item_id": i.upper(), "quantity": q} for i, q in zip(ids, quantities)]
+
+
+class ValidateItemsProperties(unittest.TestCase):
+
+    def test_valid_lists_round_trip(self):
+        """Cualquier separador o espaciado conserva los items, en orden y normalizados"""
+        def prop(example):
+            raw, expected = example
+            is_valid, item_list, errors = g.validate_items(raw)
+            self.assertEqual(errors, [])
+            self.assertTrue(is_valid)
+            self.assertEqual(item_list, expected)
+
+        fuzz.check(self, _valid_list, prop)
+
+    def test_arbitrary_text_never_raises(self):
+        """Con texto hostil devuelve siempre un resultado coherente, nunca una excepción"""
+        def prop(raw):
+            is_valid, item_list, errors = g.validate_items(raw)
+            self.assertEqual(is_valid, not errors and bool(item_list))
+            self.assertLessEqual(len(errors), g.MAX_ITEM_ERRORS + 1)
+            ids = [item["item_id"] for item in item_list]
+            self.assertEqual(len(ids), len(set(ids)))
+            for item in item_list:
+                self.assertRegex(item["item_id"], g.ITEM_ID_PATTERN)
+                self.assertGreater(item["quantity"], 0)
+
+        fuzz.check(self, lambda rnd: fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS, 0, 200), prop, fuzz.EXAMPLES * 5)
+
+    def test_streaming_matches_validate_items(self):
+        """``iter_items`` da exactamente los items y errores que resume ``validate_items``"""
+        def prop(raw):
+            results = list(g.iter_items(raw))
+            is_valid, item_list, errors = g.validate_items(raw, max_errors=len(results))
+            self.assertEqual(item_list, [item for item, _ in results if item is not None])
+            if item_list or errors:
+                self.assertEqual(errors, [error for _, error in results if error is not None])
+
+        fuzz.check(self, lambda rnd: fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS, 0, 120), prop)
+
+    def test_duplicates_are_reported(self):
+        def strategy(rnd):
+            raw, expected = _valid_list(rnd)
+            duplicate = rnd.choice(expected)["item_id"]
+            return f"{raw}, {duplicate.lower()}:1", duplicate
+
+        def prop(example):
+            raw, duplicate = example
+            is_valid, _, errors = g.validate_items(raw)
+            self.assertFalse(is_valid)
+            self.assertIn(f"Duplicate item ID: '{duplicate}'.", errors)
+
+        fuzz.check(self, strategy, prop)
+
+    def test_empty_or_separators_only(self):
+        for raw in ["", " ", "\n", ",,,", " , \n\t, ", "\r\n\r\n"]:
+            with self.subTest(raw=raw):
+                is_valid, item_list, errors = g.validate_items(raw)
+                self.assertFalse(is_valid)
+                self.assertEqual(item_list, [])
+                self.assertEqual(len(errors), 1)
+
+    def test_huge_comma_list(self):
+        raw = ",".join(f"SKU{n}:{n % 50 + 1}" for n in range(200_000))
+        is_valid, item_list, errors = g.validate_items(raw)
+        self.assertTrue(is_valid)
+        self.assertEqual(len(item_list), 200_000)
+        self.assertEqual(item_list[-1], {"item_id": "SKU199999", "quantity": 50})
+
+    def test_huge_invalid_list_caps_errors(self):
+        raw = ", ".join(f"BAD ID {n}:x" for n in range(100_000))
+        is_valid, item_list, errors = g.validate_items(raw)
+        self.assertFalse(is_valid)
+        self.assertEqual(item_list, [])
+        self.assertEqual(len(errors), g.MAX_ITEM_ERRORS + 1)
+        self.assertIn("(100000 in total)", errors[-1])
+
+    def test_long_fields_are_rejected(self):
+        is_valid, _, errors = g.validate_items(f"{'A' * 21}:1, B:{'9' * 5000}, C:-1, D:0, E:1.5")
+        self.assertFalse(is_valid)
+        self.assertEqual(len(errors), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
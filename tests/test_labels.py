@@ -0,0 +1,126 @@
+"""Hojas de etiquetas: contenido, paginación del PDF y páginas PNG"""
+
+import contextlib
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+
+from PIL import Image
+
+from truck_qr.codec import decode_payload
+from truck_qr.generator import ValidationError
+from truck_qr.batch import RECORD_OBJECT_ERROR, UnreadableRow
+from truck_qr.labels import PAGE_LAYOUTS, iter_png_pages, labels_for, labels_from_records, main, write_pdf
+from truck_qr.output import get_matrix
+from truck_qr.pool import render_record
+from truck_qr.split import join_chunks
+
+RECORD = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+          "date_time_at_gate": "2024-05-01T09:05:00", "items": "SKU1:10, SKU2:5", "deliveryOrderRef": "DO-1"}
+
+
+def records(count: int):
+    return [dict(RECORD, plate=f"P{n:05d}") for n in range(count)]
+
+
+class Labels(unittest.TestCase):
+
+    def test_label_content(self):
+        (label,) = list(labels_from_records([RECORD], "min"))
+        self.assertEqual(label.title, "ABC-123")
+        self.assertEqual(label.lines, ["Customer: CUST001", "Gate: 2024-05-01 09:05:00", "2 items, 15 units - DO-1"])
+
+    def test_split_manifest_gives_one_label_per_chunk(self):
+        data = decode_payload(next(labels_from_records([RECORD], "min")).payload)
+        data["item_list"] = [{"item_id": f"SKU{n}", "quantity": n + 1} for n in range(60)]
+        labels = labels_for(data, "min", max_version=8)
+        self.assertGreater(len(labels), 1)
+        self.assertEqual(labels[0].title, f"ABC-123 (1/{len(labels)})")
+        self.assertEqual(decode_payload(join_chunks(label.payload for label in labels)), data)
+
+    def test_adaptive_label_uses_the_settings_of_the_rendered_code(self):
+        """Un payload que solo cabe con segmentos optimizados se imprime igual que se mostró"""
+        data = decode_payload(next(labels_from_records([RECORD], "json")).payload)
+        # Unos 2.400 bytes: más de lo que admite build_qr (v40-M en modo byte)
+        data["item_list"] = [{"item_id": f"SKU{7919 + n:010d}", "quantity": 998} for n in range(32)]
+        (plain,) = labels_for(data, "json")
+        with self.assertRaises(ValidationError):
+            get_matrix(plain.payload)
+
+        result = render_record(data, "json", adaptive=True, cache=None)
+        (label,) = labels_for(data, "json", adaptive=True)
+        self.assertEqual((label.payload, label.settings), (result.payload, result.settings))
+        self.assertEqual(len(get_matrix(label.payload, label.settings)), result.settings.modules + 2 * 4)
+        out = io.BytesIO()
+        self.assertEqual(write_pdf([label], out, PAGE_LAYOUTS["thermal"]), 1)
+        pngs = list(iter_png_pages([label], PAGE_LAYOUTS["thermal"], dpi=100))
+        self.assertEqual(len(pngs), 1)
+
+    def test_adaptive_label_splits_like_the_form(self):
+        data = decode_payload(next(labels_from_records([RECORD], "min")).payload)
+        data["item_list"] = [{"item_id": f"SKU{n}", "quantity": n + 1} for n in range(60)]
+        labels = labels_for(data, "min", max_version=8, adaptive=True)
+        self.assertGreater(len(labels), 1)
+        self.assertEqual({label.settings for label in labels}, {None})
+        self.assertEqual(decode_payload(join_chunks(label.payload for label in labels)), data)
+
+    def test_invalid_rows_are_reported(self):
+        errors = []
+        labels = list(labels_from_records([RECORD, dict(RECORD, plate="X")], errors=errors))
+        self.assertEqual(len(labels), 1)
+        self.assertEqual([row for row, _ in errors], [2])
+
+    def test_unrenderable_rows_are_skipped_before_the_pages(self):
+        oversized = dict(RECORD, items=", ".join(f"SKU{n:05d}:{n + 1}" for n in range(400)))
+        rows = [RECORD, [1, 2], UnreadableRow("Invalid JSON on line 3: bad."), oversized, dict(RECORD, plate="DEF-456")]
+        errors = []
+        labels = list(labels_from_records(rows, "json", errors=errors))
+        self.assertEqual([label.title for label in labels], ["ABC-123", "DEF-456"])
+        self.assertEqual([row for row, _ in errors], [2, 3, 4])
+        self.assertEqual(errors[0][1], RECORD_OBJECT_ERROR)
+        self.assertIn("does not fit in a single QR code", errors[2][1])
+        # Con división el mismo manifiesto sí se imprime
+        self.assertGreater(len(list(labels_from_records([oversized], "json", max_version=20))), 1)
+
+    def test_command_writes_the_whole_sheet_and_reports_bad_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest, output = os.path.join(tmp, "manifest.jsonl"), os.path.join(tmp, "labels.pdf")
+            with open(manifest, "w", encoding="utf-8") as f:
+                f.write("\n".join([json.dumps(RECORD), "{not json", "[1, 2]", json.dumps(RECORD)]) + "\n")
+            out, err = io.StringIO(), io.StringIO()
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+                code = main([manifest, "-o", output, "--page", "thermal", "--workers", "1"])
+            with open(output, "rb") as f:
+                pdf = f.read()
+
+        self.assertEqual(code, 1)
+        self.assertEqual(len(re.findall(rb"/Type /Page ", pdf)), 2)
+        self.assertEqual([line.split(":")[0] for line in err.getvalue().splitlines()], ["Row 2", "Row 3"])
+        self.assertIn("2 pages written", out.getvalue())
+
+
+class Pages(unittest.TestCase):
+
+    def test_pdf_pages(self):
+        out = io.BytesIO()
+        pages = write_pdf(labels_from_records(records(13)), out, PAGE_LAYOUTS["a4"])
+        pdf = out.getvalue()
+        self.assertEqual(pages, 2)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4") and pdf.endswith(b"%%EOF\n"))
+        self.assertEqual(len(re.findall(rb"/Type /Page ", pdf)), 2)
+        self.assertIn(b"/Count 2", pdf)
+
+    def test_png_pages_have_the_page_size(self):
+        layout = PAGE_LAYOUTS["thermal"]
+        pngs = list(iter_png_pages(labels_from_records(records(2), "b45"), layout, dpi=100))
+        self.assertEqual(len(pngs), 2)
+        image = Image.open(io.BytesIO(pngs[0]))
+        self.assertEqual(image.mode, "1")
+        self.assertEqual(image.size, (round(layout.width_mm * 100 / 25.4), round(layout.height_mm * 100 / 25.4)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Métricas por etapa: histogramas, contadores, exportación Prometheus y coste desactivado"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from truck_qr import metrics
+from truck_qr.metrics import PAYLOAD_BYTES, POOL_REJECTED, STAGE_SECONDS, MetricsRegistry
+
+
+class Registry(unittest.TestCase):
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        with registry.span("validate"):
+            pass
+        registry.observe(PAYLOAD_BYTES, 100)
+        registry.inc(POOL_REJECTED, tenant="a")
+        self.assertEqual(registry.histogram(STAGE_SECONDS, stage="validate"), (0, 0.0))
+        self.assertNotIn("truck_qr_pool_rejected_total{", registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry(enabled=True)
+        for value in (50, 100, 5000, 10000):
+            registry.observe(PAYLOAD_BYTES, value)
+        text = registry.render()
+        self.assertIn('truck_qr_payload_bytes_bucket{le="64"} 1', text)
+        self.assertIn('truck_qr_payload_bytes_bucket{le="128"} 2', text)
+        self.assertIn('truck_qr_payload_bytes_bucket{le="8192"} 3', text)
+        self.assertIn('truck_qr_payload_bytes_bucket{le="+Inf"} 4', text)
+        self.assertIn("truck_qr_payload_bytes_count 4", text)
+        self.assertEqual(registry.histogram(PAYLOAD_BYTES), (4, 15150.0))
+
+    def test_spans_timed_and_counters(self):
+        registry = MetricsRegistry(enabled=True)
+
+        @registry.timed("render")
+        def render():
+            return "png"
+
+        self.assertEqual(render(), "png")
+        with self.assertRaises(KeyError):
+            with registry.span("render"):
+                raise KeyError
+        registry.inc(POOL_REJECTED, tenant="north")
+        registry.inc(POOL_REJECTED, 2, tenant="north")
+
+        self.assertEqual(registry.histogram(STAGE_SECONDS, stage="render")[0], 2)
+        self.assertIn('truck_qr_pool_rejected_total{tenant="north"} 3', registry.render())
+
+    def test_capture_defers_to_record_all(self):
+        """Lo capturado en un proceso del pool se agrega después en el principal"""
+        worker = MetricsRegistry(enabled=True)
+        with worker.capture() as observations:
+            worker.observe(PAYLOAD_BYTES, 10)
+        self.assertEqual(worker.histogram(PAYLOAD_BYTES), (0, 0.0))
+
+        main = MetricsRegistry(enabled=True)
+        main.record_all(observations)
+        self.assertEqual(main.histogram(PAYLOAD_BYTES), (1, 10.0))
+
+    def test_concurrent_observations_are_not_lost(self):
+        registry = MetricsRegistry(enabled=True)
+
+        def work():
+            for _ in range(1000):
+                registry.observe(PAYLOAD_BYTES, 1)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.histogram(PAYLOAD_BYTES)[0], 8000)
+
+    def test_textfile_is_written_atomically(self):
+        registry = MetricsRegistry(enabled=True)
+        registry.observe(PAYLOAD_BYTES, 10)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "truck_qr.prom")
+            registry.write_textfile(path)
+            self.assertEqual(os.listdir(tmp), ["truck_qr.prom"])
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), registry.render())
+
+    def test_every_metric_has_help_and_type(self):
+        text = MetricsRegistry(enabled=True).render()
+        for name, (kind, _, _) in metrics.METRICS.items():
+            self.assertIn(f"# TYPE {name} {kind}", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Formatos de salida: todos parten de la misma matriz que el PNG original"""
+
+import io
+import unittest
+
+from PIL import Image
+
+from truck_qr.codec import encode_payload
+from truck_qr.generator import TruckQRGenerator
+from truck_qr.output import (OUTPUT_FORMATS, get_matrix, matrix_from_bytes, matrix_to_bytes, pack_matrix, render,
+                             render_qr)
+
+PAYLOAD = encode_payload({"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+                          "date_time_at_gate": "2024-05-01T09:05:00",
+                          "item_list": [{"item_id": f"SKU{n}", "quantity": n + 1} for n in range(20)]}, "min")
+BOX_SIZE = TruckQRGenerator.QR_RENDER_CONFIG["box_size"]
+
+
+class Matrix(unittest.TestCase):
+
+    def test_round_trip(self):
+        matrix = get_matrix(PAYLOAD)
+        self.assertEqual(matrix_from_bytes(matrix_to_bytes(matrix)), matrix)
+
+    def test_rows_are_padded_msb_first(self):
+        self.assertEqual(pack_matrix([[True] + [False] * 8]), bytes([0x80, 0x00]))
+        self.assertEqual(pack_matrix([[False, True, True]]), bytes([0x60]))
+
+    def test_invalid_length(self):
+        with self.assertRaises(ValueError):
+            matrix_from_bytes(bytes([21, 0, 0]))
+
+
+class Render(unittest.TestCase):
+
+    def test_png_fast_has_the_same_modules_as_png(self):
+        matrix = get_matrix(PAYLOAD)
+        images = [Image.open(io.BytesIO(render(PAYLOAD, fmt))).convert("1") for fmt in ("png", "png-fast")]
+        side = len(matrix) * BOX_SIZE
+        for image in images:
+            self.assertEqual(image.size, (side, side))
+            modules = [[not image.getpixel((x * BOX_SIZE, y * BOX_SIZE)) for x in range(len(matrix))]
+                       for y in range(len(matrix))]
+            self.assertEqual(modules, matrix)
+
+    def test_svg_draws_every_dark_module(self):
+        matrix = get_matrix(PAYLOAD)
+        svg = render(PAYLOAD, "svg").decode("utf-8")
+        self.assertTrue(svg.startswith("<svg"))
+        runs = [int(part.split("h")[1]) for part in svg.split('d="')[1].split('"')[0].split("M")[1:]]
+        self.assertEqual(sum(runs), sum(map(sum, matrix)))
+
+    def test_render_qr_matches_render(self):
+        qr = TruckQRGenerator.build_qr(PAYLOAD)
+        for output_format in OUTPUT_FORMATS:
+            with self.subTest(format=output_format):
+                self.assertEqual(render_qr(qr, output_format), render(PAYLOAD, output_format))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            render(PAYLOAD, "gif")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Configuración adaptativa del QR: segmentos, versión, corrección y tamaño"""
+
+import io
+import random
+import unittest
+
+import qrcode.util
+from PIL import Image
+
+from truck_qr.cache import QRCache
+from truck_qr.codec import decode_payload, encode_payload
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.policy import EC_LEVELS, EC_ORDER, QRPolicy, _segments_bits, choose_settings, optimal_segments
+
+DATA = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+        "date_time_at_gate": "2024-05-01T09:05:00",
+        "item_list": [{"item_id": f"SKU{n:04d}", "quantity": n + 1} for n in range(20)]}
+
+
+def byte_bits(text: str, version: int) -> int:
+    """Bits de un único segmento en modo byte (lo que hace qrcode por defecto)"""
+    return _segments_bits(((qrcode.util.MODE_8BIT_BYTE, text),), version)
+
+
+class Segments(unittest.TestCase):
+
+    def test_segments_cover_the_text_and_never_cost_more_than_byte_mode(self):
+        alphabet = "0123456789ABCXYZ-:. abc{}\"é"
+        rnd = random.Random(20240501)
+        for _ in range(200):
+            text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 80)))
+            for version in (1, 10, 27):
+                with self.subTest(text=text, version=version):
+                    segments = optimal_segments(text, version)
+                    self.assertEqual("".join(run for _, run in segments), text)
+                    self.assertLessEqual(_segments_bits(segments, version), byte_bits(text, version))
+
+    def test_digits_and_uppercase_use_compact_modes(self):
+        segments = optimal_segments("ABC-123/" + "0123456789" * 3, 1)
+        self.assertEqual([mode for mode, _ in segments], [qrcode.util.MODE_ALPHA_NUM, qrcode.util.MODE_NUMBER])
+
+    def test_b45_payload_is_cheaper_than_byte_mode(self):
+        payload = encode_payload(DATA, "b45")
+        settings = choose_settings(payload)
+        self.assertLess(settings.data_bits, byte_bits(payload, settings.version))
+
+
+class ChooseSettings(unittest.TestCase):
+
+    def test_version_is_the_smallest_that_fits(self):
+        payload = encode_payload(DATA, "json")
+        settings = choose_settings(payload, QRPolicy(boost_ec=False))
+        self.assertEqual(settings.ec_level, "M")
+        self.assertGreaterEqual(settings.capacity_bits, settings.data_bits)
+        limits = qrcode.util.BIT_LIMIT_TABLE[EC_LEVELS["M"]]
+        previous = settings.version - 1
+        if previous:
+            self.assertLess(limits[previous], _segments_bits(optimal_segments(payload, previous), previous))
+
+    def test_error_correction_is_boosted_within_the_same_version(self):
+        payload = "ABC-123"
+        plain = choose_settings(payload, QRPolicy(boost_ec=False))
+        boosted = choose_settings(payload)
+        self.assertEqual(boosted.version, plain.version)
+        self.assertGreater(EC_ORDER.index(boosted.ec_level), EC_ORDER.index(plain.ec_level))
+        self.assertGreaterEqual(boosted.capacity_bits, boosted.data_bits)
+
+    def test_error_correction_drops_below_min_ec_to_fit_max_version(self):
+        payload = encode_payload(DATA, "json")
+        at_m = choose_settings(payload, QRPolicy(boost_ec=False))
+        settings = choose_settings(payload, QRPolicy(max_version=at_m.version - 1))
+        self.assertEqual(settings.ec_level, "L")
+        self.assertLessEqual(settings.version, at_m.version - 1)
+
+    def test_max_version_is_respected(self):
+        payload = encode_payload(DATA, "b45")
+        for max_version in range(10, 41, 5):
+            with self.subTest(max_version=max_version):
+                self.assertLessEqual(choose_settings(payload, QRPolicy(max_version=max_version)).version,
+                                     max_version)
+
+    def test_payload_too_large_for_max_version(self):
+        with self.assertRaisesRegex(ValidationError, "version 2 or lower"):
+            choose_settings(encode_payload(DATA, "json"), QRPolicy(max_version=2))
+
+    def test_max_pixels_limits_the_image_side(self):
+        payload = encode_payload(DATA, "b45")
+        for max_pixels in (200, 300, 400, 600):
+            with self.subTest(max_pixels=max_pixels):
+                settings = choose_settings(payload, QRPolicy(max_pixels=max_pixels))
+                self.assertLessEqual(settings.pixels, max_pixels)
+                self.assertGreaterEqual(settings.box_size, 2)
+
+    def test_max_pixels_below_any_version(self):
+        with self.assertRaisesRegex(ValidationError, "No QR version fits in 50 pixels"):
+            choose_settings("A", QRPolicy(max_pixels=50))
+
+
+class GenerateAdaptive(unittest.TestCase):
+
+    def test_png_matches_the_chosen_settings(self):
+        policy = QRPolicy(max_pixels=500)
+        png, payload, settings = TruckQRGenerator.generate_qr_adaptive(DATA, "b45", policy)
+        self.assertEqual(decode_payload(payload), DATA)
+        self.assertEqual(settings, choose_settings(payload, policy))
+        with Image.open(io.BytesIO(png)) as img:
+            self.assertEqual(img.size, (settings.pixels, settings.pixels))
+
+    def test_cache_is_keyed_by_policy(self):
+        cache = QRCache()
+        first = TruckQRGenerator.generate_qr_adaptive(DATA, "b45", QRPolicy(max_pixels=500), cache)
+        again = TruckQRGenerator.generate_qr_adaptive(DATA, "b45", QRPolicy(max_pixels=500), cache)
+        other = TruckQRGenerator.generate_qr_adaptive(DATA, "b45", QRPolicy(min_ec="H"), cache)
+        self.assertEqual(again, first)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertNotEqual(other[0], first[0])
+
+    def test_oversized_payload_raises(self):
+        with self.assertRaises(ValidationError):
+            TruckQRGenerator.generate_qr_adaptive(DATA, "json", QRPolicy(max_version=2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Pool de renderizado: turnos por tenant, cuotas, tiempos de espera y colas inactivas"""
+
+import os
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from truck_qr.pool import (DEFAULT_TENANT, MAX_TENANTS, TENANT_HEADER_ENV, PoolBusy, RenderPool, RenderTimeout,
+                           TenantQuota, render_record, tenant_from_headers)
+
+RECORD = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST001",
+          "date_time_at_gate": "2024-05-01T09:05:00", "item_list": [{"item_id": "SKU1", "quantity": 10}]}
+
+
+class ThreadPool(unittest.TestCase):
+    """Con hilos en lugar de procesos los trabajos pueden esperar eventos de la prueba"""
+
+    def pool(self, workers: int = 1, **options) -> RenderPool:
+        with mock.patch("concurrent.futures.ProcessPoolExecutor", ThreadPoolExecutor):
+            pool = RenderPool(workers, **options)
+        self.addCleanup(pool.close)
+        return pool
+
+    def block(self, pool: RenderPool, tenant: str = "blocker") -> threading.Event:
+        """Ocupa un worker hasta que se active el evento devuelto"""
+        started, release = threading.Event(), threading.Event()
+
+        def job():
+            started.set()
+            release.wait(10)
+
+        pool.submit(tenant, job)
+        self.assertTrue(started.wait(10))
+        self.addCleanup(release.set)
+        return release
+
+    def test_tenants_take_turns(self):
+        pool = self.pool()
+        release = self.block(pool)
+        order = []
+        jobs = [pool.submit(tenant, order.append, tenant) for tenant in "aaaaa" + "bb" + "c"]
+        release.set()
+        for job in jobs:
+            job.result(10)
+        self.assertEqual(order, list("abcabaaa"))
+
+    def test_max_running_per_tenant(self):
+        pool = self.pool(2, quotas={"a": TenantQuota(max_running=1)})
+        release = self.block(pool, "a")
+        done = pool.submit("b", lambda: "b")
+        self.assertEqual(done.result(10), "b")
+        queued = pool.submit("a", lambda: "a")
+        self.assertEqual(pool.stats()["tenants"]["a"]["queued"], 1)
+        release.set()
+        self.assertEqual(queued.result(10), "a")
+
+    def test_full_tenant_queue_is_rejected(self):
+        pool = self.pool(quota=TenantQuota(max_pending=2))
+        self.block(pool)
+        pool.submit("a", str)
+        pool.submit("a", str)
+        with self.assertRaises(PoolBusy):
+            pool.submit("a", str)
+        pool.submit("b", str)
+        self.assertEqual(pool.stats()["tenants"]["a"]["rejected"], 1)
+
+    def test_timeout_raises_a_descriptive_error(self):
+        pool = self.pool()
+        release = self.block(pool)
+        with self.assertRaises(RenderTimeout) as raised:
+            pool.run("a", str, timeout=0.05)
+        self.assertIsInstance(raised.exception, PoolBusy)
+        self.assertEqual(str(raised.exception),
+                         "The QR code was not rendered within 0.05 seconds. Try again in a few seconds.")
+        # El trabajo en cola se cancela y no llega a ejecutarse
+        release.set()
+        self.assertEqual(pool.run("a", str, 1, timeout=10), "1")
+        self.assertEqual(pool.stats()["tenants"]["a"]["cancelled"], 1)
+
+    def test_idle_tenant_queues_are_released(self):
+        pool = self.pool()
+        tenants = [f"yard-{n}" for n in range(MAX_TENANTS * 2)]
+        for tenant in tenants:
+            self.assertEqual(pool.run(tenant, str, tenant, timeout=10), tenant)
+        stats = pool.stats()["tenants"]
+        self.assertEqual(sorted(stats), sorted(tenants))
+        self.assertTrue(all(entry["completed"] == 1 for entry in stats.values()))
+        self.assertEqual((pool._queues, pool._running), ({}, {}))
+
+    def test_tenants_beyond_the_limit_share_the_default_queue(self):
+        pool = self.pool()
+        self.block(pool)
+        for n in range(MAX_TENANTS + 1):
+            pool.submit(f"yard-{n}", str)
+        self.assertEqual(pool.stats()["tenants"][DEFAULT_TENANT]["submitted"], 1)
+
+
+class ProcessWorkers(unittest.TestCase):
+
+    def test_render_record_in_a_worker_process(self):
+        with RenderPool(1) as pool:
+            result = pool.run("yard-a", render_record, RECORD, cache=None, timeout=60)
+        self.assertEqual(len(result.images), 1)
+        self.assertIn('"plate":"ABC-123"', result.payload.replace(" ", ""))
+
+
+class TenantFromHeaders(unittest.TestCase):
+
+    def test_without_configured_header_everyone_is_default(self):
+        with mock.patch.dict(os.environ, {TENANT_HEADER_ENV: ""}):
+            self.assertEqual(tenant_from_headers({"X-Yard": "north"}), DEFAULT_TENANT)
+
+    def test_configured_header_is_normalized(self):
+        with mock.patch.dict(os.environ, {TENANT_HEADER_ENV: "X-Yard"}):
+            self.assertEqual(tenant_from_headers({"X-Yard": " North Yard!"}), "northyard")
+            self.assertEqual(tenant_from_headers({}), DEFAULT_TENANT)
+
+
+if __name__ == "__main__":
+    unittest.main()
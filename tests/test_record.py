@@ -0,0 +1,96 @@
+"""Propiedades de ``validate_record`` con nombres Unicode y campos hostiles"""
+
+import unittest
+
+from tests import fuzz
+from truck_qr.generator import TruckQRGenerator
+from truck_qr.record import DRIVER_NAME_ERROR, ITEM_LIST_ERROR, items_raw, validate_record
+
+g = TruckQRGenerator
+
+FIELDS = ["plate", "driverName", "customer_id", "truckType", "company", "deliveryOrderRef", "date_time_at_gate",
+          "items"]
+
+
+class ValidateRecordProperties(unittest.TestCase):
+
+    def test_valid_records_are_accepted(self):
+        def prop(fields):
+            record, errors = validate_record(fields)
+            self.assertEqual(errors, [])
+            self.assertRegex(record.plate, g.PLATE_PATTERN)
+            self.assertRegex(record.customer_id, g.CUSTOMER_ID_PATTERN)
+            self.assertEqual(record.driver_name, fields["driverName"].strip().title())
+
+        fuzz.check(self, lambda rnd: fuzz.record(rnd, rnd.randint(1, 30)), prop)
+
+    def test_normalization_is_idempotent(self):
+        """Revalidar el payload generado da el mismo registro (lo que hace el check-in en puerta)"""
+        def prop(fields):
+            record, _ = validate_record(fields)
+            again, errors = validate_record(record.to_payload())
+            self.assertEqual(errors, [])
+            self.assertEqual(again, record)
+
+        fuzz.check(self, lambda rnd: fuzz.record(rnd, rnd.randint(1, 30)), prop)
+
+    def test_validated_fields_give_the_same_result(self):
+        """Con los campos de una plantilla (``validated``) el resultado no cambia"""
+        def prop(fields):
+            record, _ = validate_record(fields)
+            validated = {key: value for key, value in record.to_payload().items() if isinstance(value, str)}
+            self.assertEqual(validate_record(fields, validated), (record, []))
+
+        fuzz.check(self, lambda rnd: fuzz.record(rnd), prop)
+
+    def test_hostile_fields_never_raise(self):
+        """Cualquier texto en cualquier campo da errores, nunca una excepción"""
+        def strategy(rnd):
+            fields = fuzz.record(rnd)
+            for name in rnd.sample(FIELDS, rnd.randint(1, len(FIELDS))):
+                fields[name] = fuzz.text(rnd, fuzz.ADVERSARIAL_CHARS, 0, 60)
+            return fields
+
+        def prop(fields):
+            record, errors = validate_record(fields)
+            self.assertEqual(record is None, bool(errors))
+            self.assertTrue(all(isinstance(error, str) and error for error in errors))
+
+        fuzz.check(self, strategy, prop, fuzz.EXAMPLES * 3)
+
+    def test_unicode_driver_names(self):
+        """Los nombres aceptados cumplen el patrón; el resto da el error de conductor"""
+        def prop(name):
+            record, errors = validate_record({"plate": "ABC-123", "driverName": name, "customer_id": "CUST01",
+                                              "date_time_at_gate": "2024-05-01T09:05:00", "items": "A:1"})
+            if record is not None:
+                self.assertRegex(name.strip(), g.DRIVER_NAME_PATTERN)
+                self.assertEqual(record.driver_name, name.strip().title())
+            else:
+                self.assertEqual(errors, [DRIVER_NAME_ERROR])
+
+        fuzz.check(self, lambda rnd: fuzz.text(rnd, fuzz.NAME_CHARS, 0, 60), prop, fuzz.EXAMPLES * 3)
+
+    def test_unicode_company_is_kept(self):
+        def prop(company):
+            record, errors = validate_record({"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST01",
+                                              "date_time_at_gate": "2024-05-01T09:05:00", "items": "A:1",
+                                              "company": company})
+            self.assertEqual(errors, [])
+            self.assertEqual(record.company, company.strip())
+
+        fuzz.check(self, lambda rnd: "Ñ" + fuzz.text(rnd, fuzz.NAME_CHARS, 1, 98) + "🚚", prop)
+
+    def test_item_list_with_non_objects(self):
+        base = {"plate": "ABC-123", "driverName": "John Doe", "customer_id": "CUST01",
+                "date_time_at_gate": "2024-05-01T09:05:00"}
+        for item_list in ([1, 2], [["A", 1]], [{"item_id": "A", "quantity": 1}, None]):
+            with self.subTest(item_list=item_list):
+                record, errors = validate_record({**base, "item_list": item_list})
+                self.assertIsNone(record)
+                self.assertIn(ITEM_LIST_ERROR, errors)
+        self.assertEqual(items_raw({"item_list": [{"item_id": "A", "quantity": 1}, "B:2"]}), "A:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Puerta de regresión: tiempo y memoria de generación frente a ``benchmarks/baseline.json``
+
+Usa los mismos casos que ``python benchmarks/suite.py gate``. Si la línea
+base se grabó en otro entorno la prueba se omite (los tiempos no son
+comparables); se regenera con ``python benchmarks/suite.py baseline``.
+"""
+
+import importlib.util
+import json
+import os
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_suite():
+    spec = importlib.util.spec_from_file_location("benchmark_suite", os.path.join(ROOT, "benchmarks", "suite.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class RegressionGate(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.suite = _load_suite()
+        with open(cls.suite.BASELINE_PATH, encoding="utf-8") as f:
+            cls.baseline = json.load(f)
+
+    def test_baseline_covers_the_gate_cases(self):
+        recorded = {self.suite.case_key(case) for case in self.baseline["results"]}
+        expected = {f"generate_qr_optimized[codec={codec},items={items}]"
+                    for codec, items in self.suite.GATE_GENERATE_CASES}
+        expected |= {f"validate_items[items={items}]" for items in self.suite.GATE_ITEM_SIZES}
+        self.assertEqual(recorded, expected)
+
+    def test_time_and_memory_within_baseline(self):
+        mismatch = self.suite.environment_mismatch(self.baseline)
+        if mismatch:
+            self.skipTest(f"baseline recorded in another environment ({', '.join(mismatch)} differ)")
+        self.assertEqual(self.suite.gate(self.baseline), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
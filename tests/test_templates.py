@@ -0,0 +1,93 @@
+"""Plantillas de camiones recurrentes: guardado, búsqueda y reutilización al validar"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from truck_qr.history import GenerationHistory
+from truck_qr.record import validate_record
+from truck_qr.templates import TemplateStore
+
+START = datetime(2024, 5, 1, 6, 0)
+
+
+def payload(plate: str, customer_id: str = "CUST001", driver: str = "John Doe", **extra) -> dict:
+    return {"plate": plate, "driverName": driver, "customer_id": customer_id,
+            "date_time_at_gate": "2024-05-01T09:05:00", "item_list": [{"item_id": "SKU1", "quantity": 10}], **extra}
+
+
+class Templates(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "history.db")
+        self.store = TemplateStore(self.path)
+
+    def test_memory_database_is_rejected(self):
+        with self.assertRaises(ValueError):
+            TemplateStore(":memory:")
+
+    def test_save_and_lookup(self):
+        self.store.save(payload("ABC-123", truckType="Type B", company="ACME"), START)
+        template = self.store.lookup(" abc-123 ", "cust001")
+        self.assertEqual(template.key, ("ABC-123", "CUST001"))
+        self.assertEqual((template.driver_name, template.truck_type, template.company), ("John Doe", "Type B", "ACME"))
+        self.assertEqual((template.uses, template.last_used), (1, "2024-05-01T06:00:00"))
+        self.assertEqual(template.label, "ABC-123 · CUST001 · John Doe")
+        self.assertIsNone(self.store.lookup("ABC-123", "OTHER"))
+
+    def test_saving_again_counts_uses_and_keeps_latest_fields(self):
+        self.store.save(payload("ABC-123", company="ACME"), START + timedelta(hours=2))
+        # Un guardado con fecha anterior no retrocede last_used
+        self.store.save(payload("ABC-123", driver="Jane Roe"), START)
+        template = self.store.lookup("ABC-123", "CUST001")
+        self.assertEqual((template.uses, template.driver_name, template.company), (2, "Jane Roe", ""))
+        self.assertEqual(template.last_used, "2024-05-01T08:00:00")
+
+    def test_search_by_plate_or_customer_prefix(self):
+        for plate, customer, uses in [("ABC-123", "CUST001", 3), ("ABD-900", "ZED01", 1), ("XYZ-555", "ABCORP", 2)]:
+            for _ in range(uses):
+                self.store.save(payload(plate, customer), START)
+        self.assertEqual([t.plate for t in self.store.search("ab")], ["ABC-123", "XYZ-555", "ABD-900"])
+        self.assertEqual([t.plate for t in self.store.search("ABC")], ["ABC-123", "XYZ-555"])
+        self.assertEqual([t.plate for t in self.store.search("zed")], ["ABD-900"])
+        self.assertEqual([t.plate for t in self.store.search(limit=2)], ["ABC-123", "XYZ-555"])
+        self.assertEqual(self.store.search("Q"), [])
+
+    def test_delete(self):
+        self.store.save(payload("ABC-123"))
+        self.assertTrue(self.store.delete("abc-123", "cust001"))
+        self.assertFalse(self.store.delete("ABC-123", "CUST001"))
+        self.assertIsNone(self.store.lookup("ABC-123", "CUST001"))
+
+    def test_template_fields_are_reused_by_validate_record(self):
+        """Reemitir con la plantilla da el mismo registro que validar todos los campos"""
+        record, _ = validate_record(payload("abc-123", "cust001", "john doe", truckType="Type B", company="ACME"))
+        self.store.save(record.to_payload())
+        fields = self.store.lookup("ABC-123", "CUST001").fields()
+
+        form = dict(fields, date_time_at_gate="2024-05-02T07:30:00", items="SKU2:4")
+        reused, errors = validate_record(form, fields)
+        self.assertEqual(errors, [])
+        self.assertEqual(reused, validate_record(form)[0])
+        self.assertEqual(reused.item_list, [{"item_id": "SKU2", "quantity": 4}])
+
+        # Un campo cambiado se vuelve a validar
+        _, errors = validate_record(dict(form, plate="A"), fields)
+        self.assertEqual(len(errors), 1)
+
+    def test_import_history_is_idempotent(self):
+        with GenerationHistory(self.path, flush_interval=0.01) as history:
+            for hour, plate in enumerate(["ABC-123", "DEF-456", "ABC-123"]):
+                history.record(payload(plate, company="ACME"), f"payload-{hour}", "json",
+                               created_at=START + timedelta(hours=hour))
+        self.assertEqual(self.store.import_history(), 2)
+        self.assertEqual(self.store.import_history(), 2)
+        template = self.store.lookup("ABC-123", "CUST001")
+        self.assertEqual((template.uses, template.company, template.last_used), (2, "ACME", "2024-05-01T08:00:00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
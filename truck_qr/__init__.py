@@ -0,0 +1,6 @@
+"""Paquete principal para la generación de códigos QR de tracking de camiones"""
+
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.record import TruckRecord, validate_record
+
+__all__ = ["TruckQRGenerator", "TruckRecord", "ValidationError", "validate_record"]
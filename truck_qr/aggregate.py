@@ -0,0 +1,336 @@
+"""Totales por día, cliente y SKU sobre los QR generados
+
+La pantalla de resultado solo suma los items de un payload. Este módulo
+calcula los totales de operaciones sobre miles de códigos:
+
+    daily      por día: códigos, camiones, clientes, líneas de item y cantidad
+    customer   por día y cliente: códigos, camiones, líneas de item y cantidad
+    sku        por día y SKU: códigos, clientes y cantidad
+
+El día es el de llegada a la puerta (``date_time_at_gate``); con ``period``
+se agrupa por mes o por todo el rango en lugar de por día.
+
+Cada manifiesto cuenta una sola vez: si un QR se regenera (misma referencia
+de entrega o, sin ella, los mismos datos) o se lee varias veces, solo cuenta
+la última versión.
+
+Los datos nunca se cargan en memoria: las agregaciones son ``GROUP BY`` que
+SQLite ejecuta sobre una vista de una fila por item (``manifest_items``).
+
+- Histórico (``from_history``): la vista recorre ``generations`` y expande
+  ``item_list`` con ``json_each`` dentro de SQLite, sin pasar por Python.
+- Payloads exportados o leídos en puerta (``from_payloads``): una línea por
+  payload (JSON Lines o los codecs ``min``, ``short`` y ``b45``); se
+  decodifican en streaming hacia una tabla temporal en disco y se agregan con
+  las mismas consultas.
+
+Las filas de cada agregado se leen por lotes y se exportan a CSV o a Parquet
+(requiere ``pyarrow``, que se carga solo al exportar a Parquet).
+
+Uso:
+    python -m truck_qr.aggregate --db qr_history.db daily
+    python -m truck_qr.aggregate --db qr_history.db --from 2024-01-01 --to 2025-01-01 sku -o sku.parquet
+    python -m truck_qr.aggregate --input lecturas.txt customer --period month -o clientes.csv
+    python -m truck_qr.aggregate --db qr_history.db all -o reportes/
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from truck_qr.codec import clean_payload, decode_payload
+from truck_qr.generator import ValidationError
+from truck_qr.history import DEFAULT_HISTORY_DB
+from truck_qr.record import ITEM_LIST_ERROR
+
+# Filas que se leen de SQLite (y se escriben en cada grupo de filas de Parquet) a la vez
+FETCH_ROWS = 50_000
+EXPORT_FORMATS = ("csv", "parquet")
+# Líneas ilegibles que se informan una por una (el resto solo se cuenta)
+MAX_ERRORS = 100
+
+# Periodo -> expresión SQL sobre el día (YYYY-MM-DD)
+PERIODS = {
+    "day": "day",
+    "month": "substr(day, 1, 7)",
+    "all": "'all'",
+}
+
+_HISTORY_VIEW = """
+CREATE TEMP VIEW manifest_items AS
+SELECT g.id AS code_id,
+       substr(COALESCE(g.date_time_at_gate, g.created_at), 1, 10) AS day,
+       g.plate AS plate,
+       g.customer_id AS customer_id,
+       json_extract(i.value, '$.item_id') AS item_id,
+       json_extract(i.value, '$.quantity') AS quantity
+FROM main.generations AS g LEFT JOIN json_each(g.data, '$.item_list') AS i
+WHERE g.id IN (SELECT MAX(id) FROM main.generations GROUP BY COALESCE(NULLIF(delivery_ref, ''), data))
+"""
+
+_PAYLOADS_TABLE = """
+CREATE TABLE payload_items (
+    code_id INTEGER NOT NULL,
+    manifest BLOB NOT NULL,
+    day TEXT NOT NULL,
+    plate TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    item_id TEXT,
+    quantity INTEGER
+)
+"""
+_PAYLOADS_VIEW = """
+CREATE TEMP VIEW manifest_items AS
+SELECT code_id, day, plate, customer_id, item_id, quantity FROM payload_items
+WHERE code_id IN (SELECT MAX(code_id) FROM payload_items GROUP BY manifest)
+"""
+_INSERT_ITEM = "INSERT INTO payload_items VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+
+class Rollup(NamedTuple):
+    """Agregado: columnas de agrupación y columnas calculadas (SQL)"""
+    name: str
+    keys: Tuple[str, ...]
+    measures: Tuple[Tuple[str, str], ...]
+    where: str = ""
+
+    @property
+    def columns(self) -> List[str]:
+        return ["period", *self.keys, *(name for name, _ in self.measures)]
+
+
+_CODES = ("codes", "COUNT(DISTINCT code_id)")
+_TRUCKS = ("trucks", "COUNT(DISTINCT plate)")
+_CUSTOMERS = ("customers", "COUNT(DISTINCT customer_id)")
+_ITEM_LINES = ("item_lines", "COUNT(item_id)")
+_QUANTITY = ("total_quantity", "COALESCE(SUM(quantity), 0)")
+
+ROLLUPS = {
+    "daily": Rollup("daily", (), (_CODES, _TRUCKS, _CUSTOMERS, _ITEM_LINES, _QUANTITY)),
+    "customer": Rollup("customer", ("customer_id",), (_CODES, _TRUCKS, _ITEM_LINES, _QUANTITY)),
+    "sku": Rollup("sku", ("item_id",), (_CODES, _CUSTOMERS, _QUANTITY), "item_id IS NOT NULL"),
+}
+
+
+def _manifest_key(data: Dict) -> Union[str, bytes]:
+    """Identifica el manifiesto: su referencia de entrega (texto) o, sin ella, un hash de los datos (bytes)
+
+    El hash es de los datos decodificados, así que el mismo manifiesto en otro codec es el mismo.
+    """
+    ref = data.get("deliveryOrderRef")
+    if ref:
+        return str(ref)
+    canonical = json.dumps(clean_payload(data), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def _payload_rows(lines: Iterable[str], aggregator: "ManifestAggregator") -> Iterator[Tuple]:
+    """Una fila por item (o una sin item si el payload no tiene items); anota las líneas ilegibles"""
+    for code_id, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = decode_payload(line)
+        except ValidationError as e:
+            aggregator.skip(code_id, str(e))
+            continue
+        except (TypeError, ValueError, AttributeError, OverflowError) as e:
+            aggregator.skip(code_id, f"Invalid QR payload: {e}")
+            continue
+        items = data.get("item_list") or []
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            aggregator.skip(code_id, ITEM_LIST_ERROR)
+            continue
+        manifest = _manifest_key(data)
+        day = str(data.get("date_time_at_gate") or "")[:10]
+        plate = str(data.get("plate") or "")
+        customer_id = str(data.get("customer_id") or "")
+        if not items:
+            yield code_id, manifest, day, plate, customer_id, None, None
+        for item in items:
+            yield code_id, manifest, day, plate, customer_id, item.get("item_id"), item.get("quantity")
+
+
+class ManifestAggregator:
+    """Agregados de operaciones sobre una vista ``manifest_items`` en SQLite"""
+
+    def __init__(self, conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None):
+        self._conn = conn
+        self.start = start
+        self.end = end
+        self.errors: List[str] = []
+        self.skipped = 0
+
+    @classmethod
+    def from_history(cls, path: str = DEFAULT_HISTORY_DB, start: Optional[str] = None,
+                     end: Optional[str] = None) -> "ManifestAggregator":
+        """Agregados del histórico de QR generados (solo lectura); días en ``[start, end)``"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"History database not found: {path}")
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        conn.execute(_HISTORY_VIEW)
+        return cls(conn, start, end)
+
+    @classmethod
+    def from_payloads(cls, lines: Iterable[str], start: Optional[str] = None,
+                      end: Optional[str] = None) -> "ManifestAggregator":
+        """Agregados de payloads exportados o leídos en puerta (uno por línea, cualquier codec)"""
+        # Base temporal en disco: un año de items no se queda en memoria
+        conn = sqlite3.connect("")
+        conn.execute("PRAGMA temp_store=FILE")
+        conn.execute(_PAYLOADS_TABLE)
+        conn.execute(_PAYLOADS_VIEW)
+        aggregator = cls(conn, start, end)
+        with conn:
+            conn.executemany(_INSERT_ITEM, _payload_rows(lines, aggregator))
+        return aggregator
+
+    def skip(self, line: int, message: str) -> None:
+        """Anota una línea ilegible (solo se detallan las primeras ``MAX_ERRORS``)"""
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Line {line}: {message}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "ManifestAggregator":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _query(self, rollup: Rollup, period: str) -> Tuple[str, List[str]]:
+        conditions = [rollup.where] if rollup.where else []
+        params = []
+        if self.start:
+            conditions.append("day >= ?")
+            params.append(self.start[:10])
+        if self.end:
+            conditions.append("day < ?")
+            params.append(self.end[:10])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        groups = ", ".join(("period", *rollup.keys))
+        measures = ", ".join(f"{sql} AS {name}" for name, sql in rollup.measures)
+        keys = "".join(f", {key}" for key in rollup.keys)
+        sql = (f"SELECT {PERIODS[period]} AS period{keys}, {measures} FROM manifest_items {where} "
+               f"GROUP BY {groups} ORDER BY {groups}")
+        return sql, params
+
+    def rows(self, rollup: str, period: str = "day") -> Iterator[Tuple]:
+        """Filas del agregado ordenadas por periodo y clave, leídas por lotes"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: '{period}'. Use one of: {', '.join(PERIODS)}.")
+        cursor = self._conn.execute(*self._query(ROLLUPS[rollup], period))
+        while True:
+            batch = cursor.fetchmany(FETCH_ROWS)
+            if not batch:
+                return
+            yield from batch
+
+    def export(self, rollup: str, out, output_format: str = "csv", period: str = "day") -> int:
+        """Escribe el agregado en CSV (archivo de texto) o Parquet (ruta); devuelve las filas escritas"""
+        rows = self.rows(rollup, period)
+        if output_format == "parquet":
+            return write_parquet(ROLLUPS[rollup], rows, out)
+        writer = csv.writer(out)
+        writer.writerow(ROLLUPS[rollup].columns)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+
+def write_parquet(rollup: Rollup, rows: Iterable[Tuple], path: str) -> int:
+    """Escribe las filas de un agregado en Parquet por grupos de ``FETCH_ROWS`` filas"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs the 'pyarrow' package: pip install pyarrow")
+
+    # Texto para el periodo y las claves, enteros para los totales
+    schema = pa.schema([(name, pa.string()) for name in ("period", *rollup.keys)] +
+                       [(name, pa.int64()) for name, _ in rollup.measures])
+    count = 0
+    batch: List[Tuple] = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= FETCH_ROWS:
+                writer.write_table(pa.Table.from_arrays(list(map(list, zip(*batch))), schema=schema))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            arrays = list(map(list, zip(*batch))) if batch else [[] for _ in schema]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(batch)
+    return count
+
+
+def _output_format(path: Optional[str], requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    return "parquet" if path and path.endswith(".parquet") else "csv"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Daily, customer and SKU totals over generated truck QR codes.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--db", default=DEFAULT_HISTORY_DB, help=f"History database (default: {DEFAULT_HISTORY_DB})")
+    source.add_argument("--input", help="File with one payload per line: JSON Lines, min, short or b45 ('-' for stdin)")
+    parser.add_argument("--from", dest="start", help="First gate day, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--to", dest="end", help="Last gate day, YYYY-MM-DD (exclusive)")
+    parser.add_argument("--period", choices=list(PERIODS), default="day")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Output format (default: from the file extension)")
+    parser.add_argument("rollup", choices=[*ROLLUPS, "all"])
+    parser.add_argument("-o", "--output", help="Output file, or directory with 'all' (default: stdout, CSV)")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        aggregator = ManifestAggregator.from_payloads(sys.stdin, args.start, args.end)
+    elif args.input:
+        with open(args.input, encoding="utf-8") as f:
+            aggregator = ManifestAggregator.from_payloads(f, args.start, args.end)
+    else:
+        aggregator = ManifestAggregator.from_history(args.db, args.start, args.end)
+
+    with aggregator:
+        for error in aggregator.errors:
+            print(error, file=sys.stderr)
+        if aggregator.skipped > len(aggregator.errors):
+            print(f"{aggregator.skipped} unreadable lines skipped in total", file=sys.stderr)
+        if args.rollup == "all":
+            if not args.output:
+                parser.error("'all' needs an output directory (-o)")
+            os.makedirs(args.output, exist_ok=True)
+            output_format = args.format or "csv"
+            targets = [(name, os.path.join(args.output, f"{name}.{output_format}")) for name in ROLLUPS]
+        else:
+            output_format = _output_format(args.output, args.format)
+            targets = [(args.rollup, args.output)]
+
+        for name, path in targets:
+            if output_format == "parquet":
+                if not path:
+                    parser.error("Parquet output needs a file (-o)")
+                count = aggregator.export(name, path, output_format, args.period)
+            elif path:
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    count = aggregator.export(name, f, output_format, args.period)
+            else:
+                aggregator.export(name, sys.stdout, output_format, args.period)
+                continue
+            print(f"{count} {name} rows written to {path}")
+    return 1 if aggregator.skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Servicio HTTP (ASGI) para validar y generar códigos QR sin la UI de Streamlit
+
+Aplicación ASGI sin dependencias de framework; se sirve con cualquier
+servidor ASGI, por ejemplo uvicorn (``requirements-api.txt``):
+
+    pip install -r requirements-api.txt
+    uvicorn truck_qr.api:app --host 0.0.0.0 --port 8000
+
+Endpoints (JSON):
+    GET  /health      Estado del servicio
+    GET  /metrics     Histogramas por etapa en formato Prometheus (con TRUCK_QR_METRICS=1)
+    POST /validate    Valida un registro y devuelve el payload normalizado
+    POST /estimate    Bytes y versión de QR estimados sin renderizar (``codec`` opcional)
+    POST /qr          Valida y genera el QR (o varios si se indica max_version)
+    POST /batch       Igual que /qr para una lista de registros
+    POST /verify      Decodifica el texto leído de un QR (``payload``) y comprueba su firma
+
+Los registros usan los mismos campos que los manifiestos de ``truck_qr.batch``
+y se validan con ``truck_qr.record.validate_record``.
+Opciones de renderizado: ``codec``, ``max_version`` (dividir en varios QR) y
+``format`` (png, png-fast, svg, matrix); ``qr`` se devuelve en base64.
+El renderizado (CPU) se ejecuta en un pool de procesos para que el event loop
+siga respondiendo; la validación es barata y se hace en el propio loop.
+Con ``TRUCK_QR_BOOMI_URL`` cada registro generado se encola además para su
+envío a Boomi (``truck_qr.delivery``), sin esperar la respuesta.
+Con ``TRUCK_QR_SIGNING_KEY`` los payloads generados se firman
+(``truck_qr.signing``) antes de renderizar y enviar.
+"""
+
+import asyncio
+import base64
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from truck_qr import metrics
+from truck_qr.codec import CODECS, DEFAULT_CODEC, encode_payload
+from truck_qr.delivery import BoomiDelivery
+from truck_qr.estimate import estimate_size
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.output import DEFAULT_FORMAT, FORMAT_MIME_TYPES, OUTPUT_FORMATS, render_qr
+from truck_qr.checkin import verify_payload
+from truck_qr.record import build_payload
+from truck_qr.signing import Keyring, sign_payload, signing_key_from_env
+from truck_qr.split import split_payload
+
+# Configuración por variables de entorno
+WORKERS_ENV = "TRUCK_QR_API_WORKERS"
+MAX_BODY_BYTES = 5 * 1024 * 1024
+MAX_BATCH_RECORDS = 1000
+
+
+class HTTPError(Exception):
+    """Error que se devuelve al cliente con su código HTTP"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _render(data: Dict, codec: str, max_version: Optional[int],
+            output_format: str) -> Tuple[List[Tuple[str, str, int]], List]:
+    """Renderiza en un proceso del pool y devuelve [(contenido en base64, texto, versión)] y las métricas capturadas
+
+    La versión sale del mismo QR que se renderiza: el event loop no vuelve a
+    calcular el ajuste de ``qrcode``.
+    """
+    with metrics.registry.capture() as observations:
+        with metrics.span("payload_encode"):
+            texts = [encode_payload(data, codec)] if max_version is None else split_payload(data, codec, max_version)
+        parts = []
+        for text in texts:
+            qr = TruckQRGenerator.build_qr(text)
+            parts.append((base64.b64encode(render_qr(qr, output_format)).decode(), text, qr.version))
+    return parts, observations
+
+
+def _render_options(body: Dict) -> Tuple[str, Optional[int], str]:
+    """Extrae y valida el codec, la versión máxima y el formato de la petición"""
+    codec = body.get("codec", DEFAULT_CODEC)
+    if codec not in CODECS:
+        raise HTTPError(400, f"Unknown codec: '{codec}'. Use one of: {', '.join(CODECS)}.")
+    max_version = body.get("max_version")
+    # bool es subclase de int: true no es una versión
+    if max_version is not None and (not isinstance(max_version, int) or isinstance(max_version, bool)
+                                    or not 1 <= max_version <= 40):
+        raise HTTPError(400, "max_version must be an integer between 1 and 40.")
+    output_format = body.get("format", DEFAULT_FORMAT)
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPError(400, f"Unknown format: '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+    return codec, max_version, output_format
+
+
+class QRService:
+    """Aplicación ASGI con un pool de procesos para el renderizado"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or int(os.environ.get(WORKERS_ENV, 0)) or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.delivery: Optional[BoomiDelivery] = None
+        self.signer = signing_key_from_env()
+        self.keyring = Keyring.from_env()
+
+    # --- Ciclo de vida ---
+
+    def startup(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.delivery = BoomiDelivery.from_env()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.delivery is not None:
+            self.delivery.close()
+            self.delivery = None
+
+    async def _render_async(self, data: Dict, codec: str, max_version: Optional[int],
+                            output_format: str) -> List[Tuple[str, str, int]]:
+        self.startup()
+        loop = asyncio.get_running_loop()
+        with metrics.span("render_pool"):
+            parts, observations = await loop.run_in_executor(self._executor, _render, data, codec, max_version,
+                                                             output_format)
+        # Las etapas medidas en el proceso del pool se agregan aquí
+        metrics.registry.record_all(observations)
+        return parts
+
+    # --- Endpoints ---
+
+    async def health(self, body: Optional[Dict]) -> Dict:
+        return {"status": "ok", "workers": self.workers,
+                "delivery": dict(self.delivery.stats) if self.delivery is not None else None}
+
+    async def metrics(self, body: Optional[Dict]) -> str:
+        if not metrics.registry.enabled:
+            raise HTTPError(404, f"Metrics are disabled. Set {metrics.METRICS_ENV}=1 to enable them.")
+        return metrics.registry.render()
+
+    async def validate(self, body: Optional[Dict]) -> Dict:
+        record = self._record(body)
+        with metrics.span("validate"):
+            data, errors = build_payload(record)
+        return {"valid": not errors, "errors": errors, "payload": data}
+
+    async def estimate(self, body: Optional[Dict]) -> Dict:
+        record = self._record(body)
+        codec, _, _ = _render_options(record)
+        with metrics.span("estimate"):
+            estimate = estimate_size(record, codec, self.signer)
+        return {
+            "codec": codec,
+            "payload_bytes": estimate.payload_bytes,
+            "items": estimate.items,
+            "item_errors": estimate.item_errors,
+            "qr_version": estimate.version,
+            "modules": estimate.modules,
+        }
+
+    async def qr(self, body: Optional[Dict]) -> Dict:
+        record = self._record(body)
+        codec, max_version, output_format = _render_options(record)
+        with metrics.span("validate"):
+            data, errors = build_payload(record)
+        if errors:
+            raise HTTPError(422, "; ".join(errors))
+        data = self._sign(data)
+        response = await self._qr_response(data, codec, max_version, output_format)
+        self._deliver(data)
+        return response
+
+    async def batch(self, body: Optional[Dict]) -> Dict:
+        body = self._record(body)
+        records = body.get("records")
+        if not isinstance(records, list) or not records:
+            raise HTTPError(400, "'records' must be a non-empty list.")
+        if len(records) > MAX_BATCH_RECORDS:
+            raise HTTPError(413, f"At most {MAX_BATCH_RECORDS} records per batch.")
+        codec, max_version, output_format = _render_options(body)
+
+        async def one(row: int, record) -> Dict:
+            if not isinstance(record, dict):
+                return {"row": row, "valid": False, "errors": ["Record must be a JSON object."]}
+            with metrics.span("validate"):
+                data, errors = build_payload(record)
+            if errors:
+                return {"row": row, "valid": False, "errors": errors}
+            data = self._sign(data)
+            try:
+                result = await self._qr_response(data, codec, max_version, output_format)
+            except Exception as e:
+                return {"row": row, "valid": True, "errors": [f"Unexpected error: {str(e)}"]}
+            self._deliver(data)
+            return {"row": row, "valid": True, "errors": [], **result}
+
+        results = await asyncio.gather(*(one(row, record) for row, record in enumerate(records, start=1)))
+        return {
+            "results": results,
+            "generated": sum(1 for r in results if "qr" in r),
+            "failed": sum(1 for r in results if r["errors"]),
+        }
+
+    async def verify(self, body: Optional[Dict]) -> Dict:
+        text = self._record(body).get("payload")
+        if not isinstance(text, str) or not text:
+            raise HTTPError(400, "'payload' must be the text read from the QR code.")
+        with metrics.span("verify"):
+            record, errors = verify_payload(text, self.keyring or Keyring())
+        return {"valid": not errors, "errors": errors, "payload": record.to_payload() if record else None}
+
+    async def _qr_response(self, data: Dict, codec: str, max_version: Optional[int], output_format: str) -> Dict:
+        parts = await self._render_async(data, codec, max_version, output_format)
+        response = {
+            "payload": data,
+            "codec": codec,
+            "format": output_format,
+            "mime_type": FORMAT_MIME_TYPES[output_format],
+            "qr": [content for content, _, _ in parts],
+        }
+        if len(parts) == 1:
+            version = parts[0][2]
+            response["qr_version"], response["modules"] = version, version * 4 + 17
+        return response
+
+    def _sign(self, data: Dict) -> Dict:
+        if self.signer is None:
+            return data
+        with metrics.span("sign"):
+            return sign_payload(data, self.signer)
+
+    def _deliver(self, data: Dict) -> None:
+        """Encola el registro generado para Boomi (no bloquea el event loop)"""
+        if self.delivery is not None:
+            self.delivery.submit(data)
+
+    @staticmethod
+    def _record(body: Optional[Dict]) -> Dict:
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        return body
+
+    # --- ASGI ---
+
+    ROUTES = {
+        ("GET", "/health"): "health",
+        ("GET", "/metrics"): "metrics",
+        ("POST", "/validate"): "validate",
+        ("POST", "/estimate"): "estimate",
+        ("POST", "/qr"): "qr",
+        ("POST", "/batch"): "batch",
+        ("POST", "/verify"): "verify",
+    }
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        try:
+            handler_name = self.ROUTES.get((scope["method"], scope["path"]))
+            if handler_name is None:
+                raise HTTPError(404, "Not found.")
+            body = await self._read_body(receive) if scope["method"] == "POST" else None
+            with metrics.span(f"api_{handler_name}"):
+                status, response = 200, await getattr(self, handler_name)(body)
+        except HTTPError as e:
+            status, response = e.status, {"error": e.message}
+        except ValidationError as e:
+            # p. ej. un payload que no cabe en un QR sin max_version
+            status, response = 422, {"error": str(e)}
+        except Exception as e:
+            status, response = 500, {"error": f"Unexpected error: {str(e)}"}
+
+        # /metrics responde en texto plano; el resto en JSON
+        if isinstance(response, str):
+            content_type = b"text/plain; version=0.0.4; charset=utf-8"
+            content = response.encode("utf-8")
+        else:
+            content_type = b"application/json; charset=utf-8"
+            content = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(content)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> Dict:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body too large.")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        try:
+            return json.loads(b"".join(chunks) or b"null")
+        except ValueError:
+            raise HTTPError(400, "Request body must be valid JSON.")
+
+
+app = QRService()
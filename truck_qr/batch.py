@@ -0,0 +1,186 @@
+"""Generación masiva de códigos QR a partir de manifiestos CSV/JSONL
+
+Uso:
+    python -m truck_qr.batch manifest.csv -o salida.zip
+    python -m truck_qr.batch manifest.jsonl -o salida/ --workers 8
+    python -m truck_qr.batch manifest.csv -o salida.zip --codec b45 --max-version 15
+
+Cada fila se valida con ``truck_qr.record.validate_record`` (las mismas
+reglas que el formulario) y las filas válidas se renderizan en un pool de procesos.
+El resultado es un ZIP o directorio de PNGs (o SVG / matrices con ``--format``)
+más un ``errors.csv`` por fila.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from truck_qr.codec import CODECS, DEFAULT_CODEC, encode_payload
+from truck_qr.output import DEFAULT_FORMAT, FORMAT_EXTENSIONS, OUTPUT_FORMATS, OutputWriter, render
+from truck_qr.record import build_payload
+from truck_qr.split import split_payload
+
+ERROR_REPORT_NAME = "errors.csv"
+ERROR_REPORT_FIELDS = ["row", "plate", "error"]
+RECORD_OBJECT_ERROR = "Record must be a JSON object."
+
+# Caracteres no permitidos en nombres de archivo
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class BatchResult(NamedTuple):
+    """Resumen de una ejecución por lotes"""
+    total_rows: int
+    generated: int
+    failed: int
+    elapsed: float
+
+
+class UnreadableRow(NamedTuple):
+    """Línea JSONL que no es JSON válido; ocupa su fila para no alterar la numeración"""
+    error: str
+
+
+def read_manifest(path: str) -> Iterator[Union[Dict, UnreadableRow]]:
+    """Lee un manifiesto CSV o JSONL y devuelve los registros uno a uno
+
+    Las líneas JSONL mal formadas se devuelven como ``UnreadableRow`` y las que
+    no son objetos tal cual: ``check_row`` las convierte en errores de la fila.
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield UnreadableRow(f"Invalid JSON on line {line_number}: {e.msg} (column {e.colno}).")
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+
+def check_row(record) -> Tuple[Optional[Dict], List[str]]:
+    """``build_payload`` para una fila de ``read_manifest``: las ilegibles o que no son objetos son errores"""
+    if isinstance(record, UnreadableRow):
+        return None, [record.error]
+    if not isinstance(record, Mapping):
+        return None, [RECORD_OBJECT_ERROR]
+    return build_payload(record)
+
+
+def row_plate(record) -> str:
+    """Placa normalizada de una fila para los reportes de error ("" si no la tiene)"""
+    return str(record.get("plate") or "").strip().upper() if isinstance(record, Mapping) else ""
+
+
+def _render_job(job: Tuple[int, Dict, str, Optional[int], str]) -> Tuple[int, str, List[Tuple[str, bytes]], Optional[str]]:
+    """Renderiza los QR de una fila en un proceso del pool (debe ser serializable con pickle)"""
+    row, data, codec, max_version, output_format = job
+    basename = f"{row:05d}_{_UNSAFE_FILENAME.sub('_', data['plate'])}"
+    extension = FORMAT_EXTENSIONS[output_format]
+    try:
+        if max_version is None:
+            texts = [encode_payload(data, codec)]
+        else:
+            texts = split_payload(data, codec, max_version)
+
+        if len(texts) == 1:
+            return row, data['plate'], [(f"{basename}.{extension}", render(texts[0], output_format))], None
+        total = len(texts)
+        files = [
+            (f"{basename}_p{i:02d}of{total:02d}.{extension}", render(text, output_format))
+            for i, text in enumerate(texts, start=1)
+        ]
+        return row, data['plate'], files, None
+    except Exception as e:
+        return row, data['plate'], [], f"Unexpected error: {str(e)}"
+
+
+def run_batch(records: Iterator[Dict], output: str, workers: Optional[int] = None,
+              codec: str = DEFAULT_CODEC, max_version: Optional[int] = None,
+              output_format: str = DEFAULT_FORMAT) -> BatchResult:
+    """Valida los registros y genera los QR en paralelo con un pool de procesos
+
+    Con ``max_version`` los manifiestos que no caben se dividen en varios QR.
+    """
+    # El pool (multiprocessing) solo se importa al generar: read_manifest y los
+    # módulos que lo reutilizan (check-in, etiquetas) arrancan sin él
+    from concurrent.futures import ProcessPoolExecutor
+
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+
+    jobs = []
+    error_rows = []
+    total_rows = 0
+
+    # La validación es barata: se hace en el proceso principal
+    for row, record in enumerate(records, start=1):
+        total_rows += 1
+        data, errors = check_row(record)
+        if errors:
+            plate = row_plate(record)
+            error_rows.extend({"row": row, "plate": plate, "error": error} for error in errors)
+        else:
+            jobs.append((row, data, codec, max_version, output_format))
+
+    writer = OutputWriter(output)
+    generated = 0
+    failed_rows = {r["row"] for r in error_rows}
+    try:
+        if jobs:
+            # Lotes grandes por tarea para amortizar el coste de IPC
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for row, plate, files, error in executor.map(_render_job, jobs, chunksize=chunksize):
+                    if error:
+                        error_rows.append({"row": row, "plate": plate, "error": error})
+                        failed_rows.add(row)
+                        continue
+                    for filename, png_bytes in files:
+                        writer.write(filename, png_bytes)
+                    generated += 1
+
+        report = io.StringIO()
+        report_writer = csv.DictWriter(report, fieldnames=ERROR_REPORT_FIELDS)
+        report_writer.writeheader()
+        report_writer.writerows(sorted(error_rows, key=lambda r: r["row"]))
+        writer.write(ERROR_REPORT_NAME, report.getvalue().encode("utf-8"))
+    finally:
+        writer.close()
+
+    return BatchResult(total_rows, generated, len(failed_rows), time.perf_counter() - start)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Generate truck tracking QR codes from a CSV/JSONL manifest.")
+    parser.add_argument("manifest", help="CSV or JSONL file with one truck record per row")
+    parser.add_argument("-o", "--output", required=True, help="Output .zip file or directory")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--codec", choices=CODECS, default=DEFAULT_CODEC, help="QR payload format (default: json)")
+    parser.add_argument("--max-version", type=int, default=None, choices=range(1, 41), metavar="{1..40}",
+                        help="Split manifests into several QR codes that do not exceed this version")
+    parser.add_argument("--format", dest="output_format", choices=OUTPUT_FORMATS, default=DEFAULT_FORMAT,
+                        help="Output format: png (optimized), png-fast, svg or matrix (packed bits)")
+    args = parser.parse_args(argv)
+
+    result = run_batch(read_manifest(args.manifest), args.output, args.workers, args.codec, args.max_version,
+                       args.output_format)
+    rate = result.generated / result.elapsed if result.elapsed else 0.0
+    print(f"{result.total_rows} rows: {result.generated} generated, {result.failed} failed "
+          f"in {result.elapsed:.2f}s ({rate:.1f} QR/s)")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Caché LRU direccionada por contenido para los códigos QR renderizados
+
+La clave es un hash SHA-256 del payload limpio (serialización canónica) y de
+los parámetros de renderizado, de modo que regenerar el mismo camión/manifiesto
+(p. ej. tras "Back to Form") no vuelve a ejecutar ``qr.make`` ni el PNG.
+
+Opcionalmente se añade un nivel en disco (``disk_dir``) que sobrevive a
+reinicios del proceso y se comparte entre procesos.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from truck_qr.codec import clean_payload
+
+# Variable de entorno para activar el nivel en disco de la caché por defecto
+CACHE_DIR_ENV = "TRUCK_QR_CACHE_DIR"
+
+
+class QRCache:
+    """Caché LRU acotada de (PNG, payload) con nivel opcional en disco"""
+
+    def __init__(self, max_entries: int = 256, disk_dir: Optional[str] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data_dict: Dict, **settings) -> str:
+        """Calcula la clave de contenido del payload y los parámetros de renderizado"""
+        canonical = json.dumps(
+            [clean_payload(data_dict), settings],
+            sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _disk_paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.disk_dir, key[:2], key)
+        return base + ".png", base + ".txt"
+
+    def _read_disk(self, key: str) -> Optional[Tuple[bytes, str]]:
+        png_path, payload_path = self._disk_paths(key)
+        try:
+            with open(png_path, "rb") as f:
+                png_bytes = f.read()
+            with open(payload_path, encoding="utf-8") as f:
+                payload = f.read()
+        except OSError:
+            return None
+        return png_bytes, payload
+
+    def _write_disk(self, key: str, value: Tuple[bytes, str]) -> None:
+        png_path, payload_path = self._disk_paths(key)
+        os.makedirs(os.path.dirname(png_path), exist_ok=True)
+        # Escritura atómica: el payload se escribe antes que el PNG, que es
+        # el que se comprueba al leer
+        for path, content in ((payload_path, value[1].encode("utf-8")), (png_path, value[0])):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def _store(self, key: str, value: Tuple[bytes, str]) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Devuelve (PNG, payload) si está en caché, o None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk_dir:
+            value = self._read_disk(key)
+            if value is not None:
+                with self._lock:
+                    self._store(key, value)
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Tuple[bytes, str]) -> None:
+        """Guarda (PNG, payload) en memoria y, si está configurado, en disco"""
+        with self._lock:
+            self._store(key, value)
+        if self.disk_dir:
+            try:
+                self._write_disk(key, value)
+            except OSError:
+                # El nivel en disco es opcional: un fallo no debe impedir generar el QR
+                pass
+
+    def clear(self) -> None:
+        """Vacía el nivel en memoria y reinicia los contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de aciertos/fallos de la caché"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+# Caché compartida por el proceso (la usan la UI y quien no pase otra)
+default_cache = QRCache(disk_dir=os.environ.get(CACHE_DIR_ENV) or None)
@@ -0,0 +1,362 @@
+"""Lectura de QR en puerta y check-in contra las llegadas esperadas
+
+Decodifica los textos escaneados (cualquier codec, QR únicos o divididos en
+fragmentos), los valida con las mismas reglas que el formulario
+(``validate_record``) y los cruza con una tabla SQLite de llegadas esperadas
+indexada por placa, cliente y referencia de entrega, de modo que cada check-in
+es una búsqueda por índice (O(log n)) aunque el histórico crezca a millones
+de filas.
+
+Uso:
+    python -m truck_qr.checkin --db gate.db expect llegadas.csv
+    python -m truck_qr.checkin --db gate.db scan < lecturas.txt
+    python -m truck_qr.checkin --db gate.db scan --blocks < lecturas_multilinea.txt
+    python -m truck_qr.checkin --db gate.db find --plate ABC-123
+
+``scan`` lee una lectura por línea (lectores de código que actúan como
+teclado) y escribe el resultado de cada check-in. Un payload del codec
+``json`` (de una línea ``{`` a una línea ``}``) se lee entero como una sola
+lectura; con ``--blocks`` cada lectura empieza en una línea que comienza por
+``TQS:``, ``TQ1:`` o ``{``, lo que admite fragmentos multilínea de un payload
+``json`` dividido.
+
+Una lectura con ``deliveryOrderRef`` se cruza por referencia; si ninguna
+llegada esperada la tiene, se busca una cargada sin referencia con la misma
+placa y fecha.
+
+Con claves configuradas (``TRUCK_QR_VERIFY_KEYS`` o ``TRUCK_QR_SIGNING_KEY``,
+ver ``truck_qr.signing``) se rechazan los QR cuya firma no coincide.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from truck_qr.batch import check_row, read_manifest
+from truck_qr.codec import B45_PREFIX, decode_payload
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.record import TruckRecord, validate_record
+from truck_qr.signing import Keyring, verify_signature
+from truck_qr.split import CHUNK_PREFIX, ChunkAssembler, join_chunks
+
+# Estados de una llegada
+STATUS_EXPECTED = "expected"
+STATUS_CHECKED_IN = "checked_in"
+
+# Resultados de un check-in
+RESULT_CHECKED_IN = "checked_in"
+RESULT_ALREADY_CHECKED_IN = "already_checked_in"
+RESULT_MISMATCH = "mismatch"
+RESULT_UNEXPECTED = "unexpected"
+RESULT_INVALID = "invalid"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS arrivals (
+    id INTEGER PRIMARY KEY,
+    plate TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    delivery_ref TEXT,
+    expected_date TEXT,
+    status TEXT NOT NULL DEFAULT 'expected',
+    checked_in_at TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_arrivals_plate ON arrivals (plate, customer_id, status);
+CREATE INDEX IF NOT EXISTS idx_arrivals_customer ON arrivals (customer_id, status);
+CREATE INDEX IF NOT EXISTS idx_arrivals_delivery_ref ON arrivals (delivery_ref, status);
+"""
+
+# Comienzo de una lectura: fragmento, binario ``b45`` o JSON
+SCAN_PREFIXES = (CHUNK_PREFIX, B45_PREFIX, "{")
+
+_COLUMNS = "id, plate, customer_id, delivery_ref, expected_date, status, checked_in_at"
+
+
+class Arrival(NamedTuple):
+    """Llegada esperada (o ya registrada) en el almacén"""
+    id: int
+    plate: str
+    customer_id: str
+    delivery_ref: Optional[str]
+    expected_date: Optional[str]
+    status: str
+    checked_in_at: Optional[str]
+
+
+class CheckInResult(NamedTuple):
+    """Resultado de procesar una lectura en puerta"""
+    status: str
+    record: Optional[TruckRecord]
+    arrival: Optional[Arrival]
+    errors: List[str]
+
+
+def verify_payload(text: str, keyring: Optional[Keyring] = None) -> Tuple[Optional[TruckRecord], List[str]]:
+    """Decodifica un payload completo, comprueba su firma (con ``keyring``) y lo valida
+
+    Una lectura mal formada nunca lanza excepción: se devuelve como error.
+    """
+    try:
+        data = decode_payload(text)
+        if keyring is not None:
+            error = verify_signature(data, keyring)
+            if error is not None:
+                return None, [error]
+        return validate_record(data)
+    except ValidationError as e:
+        return None, [str(e)]
+    except (TypeError, ValueError, AttributeError, OverflowError) as e:
+        return None, [f"Invalid QR payload: {str(e)}"]
+
+
+def verify_scan(texts: Iterable[str], keyring: Optional[Keyring] = None) -> Tuple[Optional[TruckRecord], List[str]]:
+    """Igual que ``verify_payload`` para un QR único o todos los fragmentos de un payload"""
+    try:
+        payload = join_chunks(texts)
+    except ValidationError as e:
+        return None, [str(e)]
+    return verify_payload(payload, keyring)
+
+
+def read_scans(lines: Iterable[str], blocks: bool = False) -> Iterator[str]:
+    """Separa las lecturas de un flujo de texto
+
+    Por defecto una lectura por línea, salvo un payload ``json`` (de la línea
+    ``{`` a la línea ``}``), que se une en una sola. Con ``blocks`` cada
+    lectura empieza en una línea que comienza por ``TQS:``, ``TQ1:`` o ``{`` y
+    sigue hasta la siguiente, de modo que se conservan intactas las lecturas
+    multilínea (fragmentos de un payload ``json``, cuyo contenido se verifica
+    al reensamblar).
+    """
+    buffer: List[str] = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if blocks:
+            if buffer and line.startswith(SCAN_PREFIXES):
+                yield "\n".join(buffer)
+                buffer = []
+            if buffer or line.strip():
+                buffer.append(line)
+        elif buffer:
+            buffer.append(line)
+            if line == "}":
+                yield "\n".join(buffer)
+                buffer = []
+        elif line == "{":
+            buffer.append(line)
+        elif line.strip():
+            yield line
+    if buffer:
+        yield "\n".join(buffer)
+
+
+def _optional(value) -> Optional[str]:
+    value = str(value or "").strip().upper()
+    return value or None
+
+
+class ArrivalStore:
+    """Llegadas esperadas en SQLite con índices para el check-in"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "ArrivalStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def add_expected(self, rows: Iterable[Mapping]) -> Tuple[int, List[str]]:
+        """Carga llegadas esperadas en una sola transacción; devuelve (añadidas, errores)"""
+        g = TruckQRGenerator
+        values = []
+        errors = []
+        for n, row in enumerate(rows, start=1):
+            if not isinstance(row, Mapping):
+                errors.append(f"Row {n}: {check_row(row)[1][0]}")
+                continue
+            plate = str(row.get("plate") or "").strip().upper()
+            customer_id = str(row.get("customer_id") or "").strip().upper()
+            delivery_ref = _optional(row.get("deliveryOrderRef") or row.get("delivery_ref"))
+            if not g.PLATE_PATTERN.match(plate) or not g.CUSTOMER_ID_PATTERN.match(customer_id):
+                errors.append(f"Row {n}: invalid plate or customer ID.")
+                continue
+            if delivery_ref and not g.DELIVERY_REF_PATTERN.match(delivery_ref):
+                errors.append(f"Row {n}: invalid delivery reference.")
+                continue
+            expected_date = str(row.get("expected_date") or "").strip() or None
+            values.append((plate, customer_id, delivery_ref, expected_date))
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO arrivals (plate, customer_id, delivery_ref, expected_date) VALUES (?, ?, ?, ?)",
+                values,
+            )
+        return len(values), errors
+
+    def find(self, plate: Optional[str] = None, customer_id: Optional[str] = None,
+             delivery_ref: Optional[str] = None, status: Optional[str] = None,
+             limit: int = 100) -> List[Arrival]:
+        """Busca llegadas por cualquier combinación de campos indexados"""
+        conditions = []
+        params: List = []
+        for column, value in (("plate", plate), ("customer_id", customer_id), ("delivery_ref", delivery_ref)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value.strip().upper())
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        rows = self._conn.execute(f"SELECT {_COLUMNS} FROM arrivals {where} ORDER BY id LIMIT ?", params)
+        return [Arrival(*row) for row in rows]
+
+    def _first(self, where: str, params: Tuple, order: str = "id") -> Optional[Arrival]:
+        row = self._conn.execute(f"SELECT {_COLUMNS} FROM arrivals WHERE {where} ORDER BY {order} LIMIT 1",
+                                 params).fetchone()
+        return Arrival(*row) if row else None
+
+    def _match_without_ref(self, record: TruckRecord, status: str) -> Optional[Arrival]:
+        """Llegada cargada sin referencia con la placa y la fecha del registro (o sin fecha)"""
+        return self._first(
+            "plate = ? AND status = ? AND delivery_ref IS NULL "
+            "AND (expected_date IS NULL OR substr(expected_date, 1, 10) = ?)",
+            (record.plate, status, record.date_time_at_gate[:10]),
+            order="expected_date IS NULL, id",
+        )
+
+    def _match(self, record: TruckRecord) -> Optional[Arrival]:
+        """Llegada esperada que corresponde al registro (por referencia o por placa y cliente)"""
+        if record.delivery_ref:
+            arrival = self._first("delivery_ref = ? AND status = ?", (record.delivery_ref, STATUS_EXPECTED))
+            if arrival is None:
+                arrival = self._match_without_ref(record, STATUS_EXPECTED)
+            return arrival
+        return self._first("plate = ? AND customer_id = ? AND status = ?",
+                           (record.plate, record.customer_id, STATUS_EXPECTED))
+
+    def check_in(self, record: TruckRecord, payload: Optional[str] = None,
+                 checked_in_at: Optional[datetime] = None) -> CheckInResult:
+        """Marca como llegada la entrada esperada que corresponde a un registro ya validado"""
+        arrival = self._match(record)
+        if arrival is None:
+            previous = self.find(record.plate, record.customer_id, record.delivery_ref,
+                                 status=STATUS_CHECKED_IN, limit=1)
+            if not previous and record.delivery_ref:
+                without_ref = self._match_without_ref(record, STATUS_CHECKED_IN)
+                previous = [without_ref] if without_ref is not None else []
+            if previous:
+                return CheckInResult(RESULT_ALREADY_CHECKED_IN, record, previous[0],
+                                     [f"Truck {record.plate} was already checked in at {previous[0].checked_in_at}."])
+            return CheckInResult(RESULT_UNEXPECTED, record, None,
+                                 [f"No expected arrival for plate {record.plate} and customer {record.customer_id}."])
+
+        errors = []
+        expected = f"Delivery {arrival.delivery_ref}" if arrival.delivery_ref else f"Arrival {arrival.id}"
+        if arrival.plate != record.plate:
+            errors.append(f"{expected} is expected for plate {arrival.plate}, not {record.plate}.")
+        if arrival.customer_id != record.customer_id:
+            errors.append(f"{expected} belongs to customer {arrival.customer_id}, not {record.customer_id}.")
+        if errors:
+            return CheckInResult(RESULT_MISMATCH, record, arrival, errors)
+
+        timestamp = (checked_in_at or datetime.now()).strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
+        with self._conn:
+            self._conn.execute(
+                "UPDATE arrivals SET status = ?, checked_in_at = ?, payload = ? WHERE id = ?",
+                (STATUS_CHECKED_IN, timestamp, payload, arrival.id),
+            )
+        return CheckInResult(RESULT_CHECKED_IN, record, arrival._replace(status=STATUS_CHECKED_IN,
+                                                                          checked_in_at=timestamp), [])
+
+
+class GateScanner:
+    """Procesa lecturas de un lector en puerta, reensamblando los QR divididos"""
+
+    def __init__(self, store: ArrivalStore, keyring: Optional[Keyring] = None):
+        self.store = store
+        self.keyring = keyring
+        self._assembler = ChunkAssembler()
+
+    def scan(self, text: str) -> Optional[CheckInResult]:
+        """Procesa una lectura; devuelve ``None`` mientras falten fragmentos del mismo payload"""
+        try:
+            payload = self._assembler.add(text)
+        except ValidationError as e:
+            return CheckInResult(RESULT_INVALID, None, None, [str(e)])
+        if payload is None:
+            return None
+
+        record, errors = verify_payload(payload, self.keyring)
+        if errors:
+            return CheckInResult(RESULT_INVALID, None, None, errors)
+        return self.store.check_in(record, payload)
+
+    def pending(self) -> Dict[str, List[int]]:
+        """Fragmentos que faltan por escanear de cada payload incompleto"""
+        return {chunk_id: self._assembler.missing(chunk_id) for chunk_id in self._assembler.pending()}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Verify scanned truck QR codes and check them in at the gate.")
+    parser.add_argument("--db", required=True, help="SQLite database with the expected arrivals")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    expect_parser = sub.add_parser("expect", help="Load expected arrivals from a CSV/JSONL file")
+    expect_parser.add_argument("manifest")
+
+    scan_parser = sub.add_parser("scan",
+                                 help="Check in scanned payloads read from stdin, one per line (see --blocks)")
+    scan_parser.add_argument("--blocks", action="store_true",
+                             help="Multi-line scans: each one starts at a line beginning with TQS:, TQ1: or {")
+
+    find_parser = sub.add_parser("find", help="Look up arrivals")
+    find_parser.add_argument("--plate")
+    find_parser.add_argument("--customer-id")
+    find_parser.add_argument("--delivery-ref")
+    find_parser.add_argument("--status", choices=[STATUS_EXPECTED, STATUS_CHECKED_IN])
+    args = parser.parse_args(argv)
+
+    with ArrivalStore(args.db) as store:
+        if args.command == "expect":
+            added, errors = store.add_expected(read_manifest(args.manifest))
+            for error in errors:
+                print(error, file=sys.stderr)
+            print(f"{added} expected arrivals loaded, {len(errors)} rejected")
+            return 1 if errors else 0
+
+        if args.command == "find":
+            for arrival in store.find(args.plate, args.customer_id, args.delivery_ref, args.status):
+                print(json.dumps(arrival._asdict()))
+            return 0
+
+        scanner = GateScanner(store, Keyring.from_env())
+        failed = 0
+        for text in read_scans(sys.stdin, args.blocks):
+            result = scanner.scan(text)
+            if result is None:
+                continue
+            plate = result.record.plate if result.record else "-"
+            print(f"{result.status}\t{plate}\t{' '.join(result.errors)}".rstrip())
+            failed += result.status != RESULT_CHECKED_IN
+        for chunk_id, missing in scanner.pending().items():
+            print(f"{RESULT_INVALID}\t-\tMissing QR chunks of {chunk_id}: {', '.join(map(str, missing))}.")
+            failed += 1
+        return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
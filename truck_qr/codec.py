@@ -0,0 +1,442 @@
+"""Codecs de payload para reducir la versión (tamaño) del código QR
+
+Codecs disponibles:
+    json   JSON indentado (formato original, legible)
+    min    JSON minificado
+    short  JSON minificado con claves cortas e items como pares [SKU, cantidad]
+    b45    Binario empaquetado (+ zlib si reduce tamaño) codificado en base45,
+           de modo que el QR use el modo alfanumérico
+
+``decode_payload`` detecta el codec automáticamente y devuelve siempre el
+diccionario con las claves originales. La firma opcional (campo ``sig``, ver
+``truck_qr.signing``) viaja en todos los codecs; en ``b45`` en binario.
+
+Uso:
+    python -m truck_qr.codec payload.json
+"""
+
+import base64
+import binascii
+import json
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from truck_qr.generator import ERROR_CORRECT_M, TruckQRGenerator, ValidationError
+
+CODECS = ("json", "min", "short", "b45")
+DEFAULT_CODEC = "json"
+
+# Esquema de claves cortas
+SHORT_KEYS = {
+    "plate": "p",
+    "driverName": "d",
+    "customer_id": "c",
+    "date_time_at_gate": "t",
+    "item_list": "i",
+    "truckType": "y",
+    "company": "o",
+    "deliveryOrderRef": "r",
+    "sig": "s",
+}
+LONG_KEYS = {v: k for k, v in SHORT_KEYS.items()}
+
+# Formato binario
+B45_PREFIX = "TQ1:"
+B45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+_B45_INDEX = {c: i for i, c in enumerate(B45_ALPHABET)}
+_FLAG_TRUCK_TYPE = 0x01
+_FLAG_COMPANY = 0x02
+_FLAG_DELIVERY_REF = 0x04
+_FLAG_SIGNED = 0x08
+_FLAG_ZLIB = 0x80
+_EPOCH = datetime(2000, 1, 1)
+
+
+def clean_payload(data_dict: Dict) -> Dict:
+    """Elimina los valores nulos o vacíos para optimizar el tamaño"""
+    return {k: v for k, v in data_dict.items() if v is not None and v != ""}
+
+
+# --- base45 (RFC 9285) ---
+
+def b45encode(data: bytes) -> str:
+    """Codifica bytes en base45"""
+    out = []
+    for i in range(0, len(data) - 1, 2):
+        n = data[i] * 256 + data[i + 1]
+        e, n = divmod(n, 2025)
+        d, c = divmod(n, 45)
+        out.append(B45_ALPHABET[c] + B45_ALPHABET[d] + B45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        out.append(B45_ALPHABET[c] + B45_ALPHABET[d])
+    return "".join(out)
+
+
+def b45decode(text: str) -> bytes:
+    """Decodifica texto base45"""
+    try:
+        values = [_B45_INDEX[c] for c in text]
+    except KeyError as e:
+        raise ValidationError(f"Invalid base45 character: {e.args[0]!r}.")
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            n = chunk[0] + chunk[1] * 45 + chunk[2] * 2025
+            if n > 0xFFFF:
+                raise ValidationError("Invalid base45 payload.")
+            out.extend(divmod(n, 256))
+        elif len(chunk) == 2:
+            n = chunk[0] + chunk[1] * 45
+            if n > 0xFF:
+                raise ValidationError("Invalid base45 payload.")
+            out.append(n)
+        else:
+            raise ValidationError("Invalid base45 payload length.")
+    return bytes(out)
+
+
+# --- base64url sin relleno (firmas) ---
+
+def b64url_encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def b64url_decode(text: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+    except (binascii.Error, ValueError):
+        raise ValidationError("Invalid base64url text.")
+
+
+# --- Empaquetado binario ---
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_str(out: bytearray, s: str) -> None:
+    raw = s.encode("utf-8")
+    _write_varint(out, len(raw))
+    out.extend(raw)
+
+
+# Bytes máximos de un varint (64 bits) y último instante representable por ``datetime``
+_MAX_VARINT_BYTES = 10
+_MAX_GATE_SECONDS = int((datetime.max.replace(microsecond=0) - _EPOCH).total_seconds())
+
+
+class _Reader:
+    """Lector secuencial del formato binario"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def varint(self) -> int:
+        n = shift = 0
+        while True:
+            if self.pos >= len(self.data):
+                raise ValidationError("Truncated binary payload.")
+            b = self.data[self.pos]
+            self.pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+            if shift >= 7 * _MAX_VARINT_BYTES:
+                raise ValidationError("Invalid number in binary payload.")
+
+    def blob(self) -> bytes:
+        length = self.varint()
+        raw = self.data[self.pos:self.pos + length]
+        if len(raw) != length:
+            raise ValidationError("Truncated binary payload.")
+        self.pos += length
+        return bytes(raw)
+
+    def string(self) -> str:
+        raw = self.blob()
+        try:
+            return raw.decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValidationError("Invalid text in binary payload.")
+
+
+def pack_header(data: Dict) -> Tuple[int, bytearray]:
+    """Empaqueta los campos de cabecera (todo menos los items); devuelve (flags, cuerpo)"""
+    truck_types = TruckQRGenerator.BOOMI_CONFIG['truck_types']
+    flags = 0
+    if data.get("truckType"):
+        flags |= _FLAG_TRUCK_TYPE
+    if data.get("company"):
+        flags |= _FLAG_COMPANY
+    if data.get("deliveryOrderRef"):
+        flags |= _FLAG_DELIVERY_REF
+    if data.get("sig"):
+        flags |= _FLAG_SIGNED
+
+    body = bytearray()
+    _write_str(body, data["plate"])
+    _write_str(body, data["driverName"])
+    _write_str(body, data["customer_id"])
+    try:
+        dt = datetime.strptime(data["date_time_at_gate"], TruckQRGenerator.BOOMI_CONFIG['date_format'])
+    except ValueError:
+        raise ValidationError(f"Invalid date_time_at_gate: '{data['date_time_at_gate']}'.")
+    # Segundos desde 2000 como varint sin signo: las fechas anteriores no se pueden empaquetar
+    if dt < _EPOCH:
+        raise ValidationError(f"Date and time before {_EPOCH.year} cannot be encoded with the b45 codec.")
+    _write_varint(body, int((dt - _EPOCH).total_seconds()))
+    if flags & _FLAG_TRUCK_TYPE:
+        if data["truckType"] not in truck_types:
+            raise ValidationError(f"Invalid truck type: '{data['truckType']}'.")
+        _write_varint(body, truck_types.index(data["truckType"]))
+    if flags & _FLAG_COMPANY:
+        _write_str(body, data["company"])
+    if flags & _FLAG_DELIVERY_REF:
+        _write_str(body, data["deliveryOrderRef"])
+    return flags, body
+
+
+def pack_item(item_id: str, quantity: int) -> bytes:
+    """Empaqueta un item del manifiesto"""
+    out = bytearray()
+    _write_str(out, item_id)
+    _write_varint(out, quantity)
+    return bytes(out)
+
+
+def pack_signature(out: bytearray, sig: str) -> None:
+    """Empaqueta la firma ``<clave>.<base64url>`` como identificador y bytes sin codificar"""
+    key_id, _, encoded = sig.partition(".")
+    raw = b64url_decode(encoded)
+    _write_str(out, key_id)
+    _write_varint(out, len(raw))
+    out.extend(raw)
+
+
+def finish_binary(flags: int, body: bytes) -> bytes:
+    """Añade los flags y comprime el cuerpo solo si realmente reduce el tamaño"""
+    compressed = zlib.compress(bytes(body), 9)
+    if len(compressed) < len(body):
+        return bytes([flags | _FLAG_ZLIB]) + compressed
+    return bytes([flags]) + bytes(body)
+
+
+def pack_binary(data: Dict) -> bytes:
+    """Empaqueta el payload en el formato binario compacto"""
+    flags, body = pack_header(data)
+    _write_varint(body, len(data["item_list"]))
+    for item in data["item_list"]:
+        _write_str(body, item["item_id"])
+        _write_varint(body, item["quantity"])
+    if flags & _FLAG_SIGNED:
+        pack_signature(body, data["sig"])
+    return finish_binary(flags, body)
+
+
+def unpack_binary(raw: bytes) -> Dict:
+    """Desempaqueta el formato binario compacto"""
+    if not raw:
+        raise ValidationError("Empty binary payload.")
+    flags = raw[0]
+    body = raw[1:]
+    if flags & _FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            raise ValidationError("Corrupted binary payload.")
+
+    reader = _Reader(body)
+    data = {
+        "plate": reader.string(),
+        "driverName": reader.string(),
+        "customer_id": reader.string(),
+    }
+    seconds = reader.varint()
+    if seconds > _MAX_GATE_SECONDS:
+        raise ValidationError("Invalid date and time in binary payload.")
+    dt = _EPOCH + timedelta(seconds=seconds)
+    data["date_time_at_gate"] = dt.strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
+    if flags & _FLAG_TRUCK_TYPE:
+        truck_types = TruckQRGenerator.BOOMI_CONFIG['truck_types']
+        index = reader.varint()
+        if index >= len(truck_types):
+            raise ValidationError("Unknown truck type in binary payload.")
+        data["truckType"] = truck_types[index]
+    if flags & _FLAG_COMPANY:
+        data["company"] = reader.string()
+    if flags & _FLAG_DELIVERY_REF:
+        data["deliveryOrderRef"] = reader.string()
+    count = reader.varint()
+    data["item_list"] = [{"item_id": reader.string(), "quantity": reader.varint()} for _ in range(count)]
+    if flags & _FLAG_SIGNED:
+        key_id = reader.string()
+        data["sig"] = f"{key_id}.{b64url_encode(reader.blob())}"
+    if reader.pos != len(body):
+        raise ValidationError("Unexpected trailing bytes in binary payload.")
+    return data
+
+
+# --- API pública ---
+
+def encode_payload(data_dict: Dict, codec: str = DEFAULT_CODEC) -> str:
+    """Serializa el payload con el codec indicado"""
+    cleaned_data = clean_payload(data_dict)
+
+    if codec == "json":
+        return json.dumps(cleaned_data, indent=2, ensure_ascii=False)
+    if codec == "min":
+        return json.dumps(cleaned_data, separators=(",", ":"), ensure_ascii=False)
+    if codec == "short":
+        short = {}
+        for key, value in cleaned_data.items():
+            if key == "item_list":
+                value = [[item["item_id"], item["quantity"]] for item in value]
+            short[SHORT_KEYS.get(key, key)] = value
+        return json.dumps(short, separators=(",", ":"), ensure_ascii=False)
+    if codec == "b45":
+        return B45_PREFIX + b45encode(pack_binary(cleaned_data))
+    raise ValueError(f"Unknown codec: '{codec}'. Use one of: {', '.join(CODECS)}.")
+
+
+def detect_codec(text: str) -> str:
+    """Detecta el codec con el que se generó un payload"""
+    if text.startswith(B45_PREFIX):
+        return "b45"
+    if text.startswith("{\n"):
+        return "json"
+    if text.startswith('{"') and '"' + SHORT_KEYS["plate"] + '":' in text and '"plate":' not in text:
+        return "short"
+    return "min"
+
+
+def _invalid(message: str) -> ValidationError:
+    return ValidationError(f"Invalid QR payload: {message}")
+
+
+def _check_fields(data: Dict) -> None:
+    """Los campos conocidos de la cabecera deben ser texto"""
+    for key in SHORT_KEYS:
+        if key != "item_list" and key in data and not isinstance(data[key], str):
+            raise _invalid(f"'{key}' must be a string.")
+
+
+def _check_item(item_id, quantity) -> None:
+    if not isinstance(item_id, str) or not isinstance(quantity, int) or isinstance(quantity, bool):
+        raise _invalid("each item needs a text item_id and an integer quantity.")
+
+
+def _expand_items(value) -> List[Dict]:
+    """Items del codec ``short`` (pares [SKU, cantidad]) como lista de dicts"""
+    if not isinstance(value, list):
+        raise _invalid("'item_list' must be a list.")
+    items = []
+    for pair in value:
+        if not isinstance(pair, list) or len(pair) != 2:
+            raise _invalid("each item must be a [item_id, quantity] pair.")
+        _check_item(*pair)
+        items.append({"item_id": pair[0], "quantity": pair[1]})
+    return items
+
+
+def _check_items(value) -> None:
+    """Items de los codecs JSON: lista de dicts ``{"item_id", "quantity"}``"""
+    if not isinstance(value, list):
+        raise _invalid("'item_list' must be a list.")
+    for item in value:
+        if not isinstance(item, dict):
+            raise _invalid("each item must be an object.")
+        _check_item(item.get("item_id"), item.get("quantity"))
+
+
+def decode_payload(text: str) -> Dict:
+    """Decodifica un payload de cualquier codec al diccionario original
+
+    Comprueba la forma del resultado (campos de texto, items con SKU y
+    cantidad entera); un payload mal formado da ``ValidationError``.
+    """
+    text = text.strip()
+    codec = detect_codec(text)
+    if codec == "b45":
+        return unpack_binary(b45decode(text[len(B45_PREFIX):]))
+
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ValidationError(f"Invalid QR payload: {str(e)}")
+    if not isinstance(data, dict):
+        raise ValidationError("Invalid QR payload: expected a JSON object.")
+
+    if codec == "short":
+        expanded = {}
+        for key, value in data.items():
+            key = LONG_KEYS.get(key, key)
+            if key == "item_list":
+                value = _expand_items(value)
+            expanded[key] = value
+        data = expanded
+    elif "item_list" in data:
+        _check_items(data["item_list"])
+    _check_fields(data)
+    return data
+
+
+def qr_stats(payload: str, error_correction: int = ERROR_CORRECT_M) -> Tuple[Optional[int], Optional[int]]:
+    """Devuelve la versión del QR y el número de módulos por lado sin renderizar
+
+    Si el payload no cabe en la versión 40 devuelve ``(None, None)``.
+    """
+    import qrcode
+    import qrcode.exceptions
+
+    qr = qrcode.QRCode(version=None, error_correction=error_correction)
+    qr.add_data(payload)
+    try:
+        version = qr.best_fit()
+    except (ValueError, qrcode.exceptions.DataOverflowError):
+        return None, None
+    return version, version * 4 + 17
+
+
+def compare_codecs(data_dict: Dict, codecs: Optional[List[str]] = None) -> List[Dict]:
+    """Compara bytes, versión y módulos del QR resultante con cada codec"""
+    results = []
+    for codec in codecs or CODECS:
+        payload = encode_payload(data_dict, codec)
+        version, modules = qr_stats(payload)
+        results.append({
+            "codec": codec,
+            "bytes": len(payload.encode("utf-8")),
+            "version": version,
+            "modules": modules,
+        })
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Muestra la ganancia de cada codec para un payload JSON"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python -m truck_qr.codec payload.json", file=sys.stderr)
+        return 2
+    with open(argv[0], encoding="utf-8") as f:
+        data = json.load(f)
+
+    print(f"{'codec':<8}{'bytes':>8}{'version':>9}{'modules':>9}")
+    for row in compare_codecs(data):
+        version = row['version'] or "> 40"
+        modules = row['modules'] or "-"
+        print(f"{row['codec']:<8}{row['bytes']:>8}{version:>9}{modules:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
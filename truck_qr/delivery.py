@@ -0,0 +1,711 @@
+"""Envío asíncrono de los registros generados a Boomi (o cualquier endpoint HTTP)
+
+``BoomiDelivery.submit`` solo encola el registro y retorna de inmediato; un
+hilo propio con un event loop de asyncio agrupa los registros en lotes y los
+publica como JSON (``POST {"records": [...]}``) con:
+
+- un pool de conexiones HTTP/1.1 keep-alive (``max_concurrency`` a la vez),
+- reintentos con backoff exponencial y jitter para errores de red, 429 y 5xx,
+- un spool en disco (JSON Lines) para los lotes que agotan los reintentos o
+  que no caben en la cola en memoria; se reenvía cada ``replay_interval``
+  segundos (``None`` lo desactiva). Las respuestas 4xx definitivas van a
+  ``rejected.jsonl`` y las líneas del spool que no se pueden leer (p. ej. una
+  escritura truncada) a ``corrupt.jsonl``, sin detener el reenvío.
+
+Así una integración lenta o caída nunca bloquea la generación de QR. La
+entrega es "al menos una vez": cada registro lleva un ``id`` para que el
+receptor descarte duplicados.
+
+Configuración por variables de entorno (UI y servicio HTTP):
+    TRUCK_QR_BOOMI_URL     endpoint que recibe los lotes (sin él no se envía nada)
+    TRUCK_QR_BOOMI_TOKEN   token opcional para la cabecera Authorization: Bearer
+    TRUCK_QR_BOOMI_SPOOL   directorio del spool (por defecto ``boomi_spool``)
+
+Servidor de pruebas local y reenvío manual del spool:
+    python -m truck_qr.delivery stub --port 8089 --fail-rate 0.2 --delay 0.1
+    python -m truck_qr.delivery replay --url http://127.0.0.1:8089/records
+"""
+
+import argparse
+import asyncio
+import atexit
+import glob
+import json
+import os
+import random
+import ssl
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+from truck_qr.codec import clean_payload
+from truck_qr.generator import TruckQRGenerator
+
+# Variables de entorno
+BOOMI_URL_ENV = "TRUCK_QR_BOOMI_URL"
+BOOMI_TOKEN_ENV = "TRUCK_QR_BOOMI_TOKEN"
+SPOOL_DIR_ENV = "TRUCK_QR_BOOMI_SPOOL"
+DEFAULT_SPOOL_DIR = "boomi_spool"
+
+# Respuestas que se reintentan; el resto de 4xx se consideran definitivas
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class DeliveryError(Exception):
+    """Respuesta HTTP inválida del endpoint"""
+    pass
+
+
+class _Endpoint(NamedTuple):
+    host: str
+    port: int
+    path: str
+    tls: bool
+
+
+def _parse_url(url: str) -> _Endpoint:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Invalid delivery URL: '{url}'. Use http://host[:port]/path or https://...")
+    tls = parts.scheme == "https"
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return _Endpoint(parts.hostname, parts.port or (443 if tls else 80), path, tls)
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, bytes, Dict[str, str]]:
+    """Línea de estado y cabeceras: código, versión HTTP y cabeceras en minúsculas"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    try:
+        version, code = status_line.split()[:2]
+        status = int(code)
+    except ValueError:
+        raise DeliveryError(f"Invalid HTTP status line: {status_line[:80]!r}")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, version, headers
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes]:
+    """Lee una respuesta HTTP/1.1 (Content-Length, chunked o hasta el cierre)
+
+    1xx, 204 y 304 no tienen cuerpo. Sin longitud solo se lee hasta el cierre
+    si el servidor lo anuncia (``Connection: close`` o HTTP/1.0); en una
+    conexión keep-alive esperar al cierre colgaría la petición hasta el
+    timeout, así que el cuerpo se da por vacío y la conexión no se reutiliza.
+    """
+    try:
+        status, version, headers = await _read_head(reader)
+        # Las respuestas 1xx son provisionales: la definitiva viene a continuación
+        while 100 <= status < 200:
+            status, version, headers = await _read_head(reader)
+        connection = headers.get("connection", "").lower()
+
+        if status in (204, 304):
+            body = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size < 0:
+                    raise ValueError(f"negative chunk size {size}")
+                if size == 0:
+                    # Trailers opcionales hasta la línea vacía
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length < 0:
+                raise ValueError(f"negative Content-Length {length}")
+            body = await reader.readexactly(length)
+        elif connection == "close" or (version == b"HTTP/1.0" and connection != "keep-alive"):
+            headers["connection"] = "close"
+            body = await reader.read()
+        else:
+            headers["connection"] = "close"
+            body = b""
+    except ValueError as e:
+        # int() de un tamaño mal formado o una línea que supera el límite del StreamReader
+        raise DeliveryError(f"Invalid HTTP response: {e}")
+    return status, headers, body
+
+
+class ConnectionPool:
+    """Conexiones keep-alive reutilizables hacia un único endpoint HTTP(S)"""
+
+    def __init__(self, url: str, max_connections: int = 4, timeout: float = 10.0,
+                 headers: Optional[Dict[str, str]] = None):
+        self.endpoint = _parse_url(url)
+        self.timeout = timeout
+        self.opened = 0
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        host = self.endpoint.host
+        if self.endpoint.port not in (80, 443):
+            host = f"{host}:{self.endpoint.port}"
+        extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+        self._request_head = (
+            f"POST {self.endpoint.path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            "Accept: application/json\r\n"
+            f"{extra}"
+        )
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        context = ssl.create_default_context() if self.endpoint.tls else None
+        connection = await asyncio.open_connection(self.endpoint.host, self.endpoint.port, ssl=context)
+        self.opened += 1
+        return connection
+
+    async def post_json(self, body: bytes) -> Tuple[int, bytes]:
+        """Publica ``body`` y devuelve el código HTTP y el cuerpo de la respuesta"""
+        request = (self._request_head + f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+        async with self._semaphore:
+            # Una conexión reutilizada puede haber sido cerrada por el servidor: se reintenta una vez
+            while True:
+                reused = bool(self._idle)
+                reader, writer = self._idle.pop() if reused else await asyncio.wait_for(self._open(), self.timeout)
+                try:
+                    writer.write(request)
+                    await writer.drain()
+                    status, headers, content = await asyncio.wait_for(_read_response(reader), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if headers.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    self._idle.append((reader, writer))
+                return status, content
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+class RetrySpool:
+    """Registros pendientes de envío en archivos JSON Lines"""
+
+    PENDING = "pending.jsonl"
+    REJECTED = "rejected.jsonl"
+    CORRUPT = "corrupt.jsonl"
+
+    def __init__(self, directory: str = DEFAULT_SPOOL_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.quarantined = 0
+
+    def _append(self, name: str, records: List[Dict]) -> None:
+        lines = "".join(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n" for record in records)
+        with self._lock, open(os.path.join(self.directory, name), "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def append(self, records: List[Dict]) -> None:
+        """Guarda registros para reenviarlos más tarde"""
+        self._append(self.PENDING, records)
+
+    def reject(self, records: List[Dict]) -> None:
+        """Guarda registros que el endpoint rechazó de forma definitiva"""
+        self._append(self.REJECTED, records)
+
+    def quarantine(self, line: bytes) -> None:
+        """Aparta una línea ilegible del spool para revisarla a mano"""
+        with self._lock, open(os.path.join(self.directory, self.CORRUPT), "ab") as f:
+            f.write(line if line.endswith(b"\n") else line + b"\n")
+            self.quarantined += 1
+
+    def claim(self) -> List[str]:
+        """Aparta los pendientes en un archivo de reenvío y devuelve todos los archivos por reenviar
+
+        Incluye los archivos de reenvíos anteriores que no terminaron. Varios
+        procesos pueden compartir el directorio: si otro ya apartó los
+        pendientes no es un error.
+        """
+        with self._lock:
+            try:
+                os.replace(os.path.join(self.directory, self.PENDING),
+                           os.path.join(self.directory, f"replay-{time.time_ns()}.jsonl"))
+            except FileNotFoundError:
+                pass
+        return sorted(glob.glob(os.path.join(self.directory, "replay-*.jsonl")))
+
+    def read(self, path: str) -> Iterator[Dict]:
+        """Registros de un archivo del spool; las líneas ilegibles van a ``CORRUPT``
+
+        El archivo se abre de inmediato, así que ``FileNotFoundError`` se lanza
+        aquí y no al iterar.
+        """
+        return self._records(open(path, "rb"))
+
+    def _records(self, f) -> Iterator[Dict]:
+        with f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    print(f"Corrupt line in {f.name}; moved to {self.CORRUPT}", file=sys.stderr)
+                    self.quarantine(line)
+                    continue
+                yield record
+
+    def pending(self) -> int:
+        """Número de registros a la espera de reenvío"""
+        count = 0
+        with self._lock:
+            paths = glob.glob(os.path.join(self.directory, "replay-*.jsonl"))
+            paths.append(os.path.join(self.directory, self.PENDING))
+            for path in paths:
+                try:
+                    with open(path, "rb") as f:
+                        count += sum(1 for _ in f)
+                except FileNotFoundError:
+                    continue
+        return count
+
+
+def envelope(data: Dict) -> Dict:
+    """Registro tal como se envía: id para deduplicar, hora de generación y payload"""
+    return {
+        "id": uuid.uuid4().hex,
+        "generated_at": datetime.now().strftime(TruckQRGenerator.BOOMI_CONFIG['date_format']),
+        "payload": clean_payload(data),
+    }
+
+
+class BoomiDelivery:
+    """Cola de salida hacia Boomi con su propio event loop en segundo plano"""
+
+    def __init__(self, url: str, spool_dir: str = DEFAULT_SPOOL_DIR, token: Optional[str] = None,
+                 batch_size: int = 50, batch_interval: float = 0.5, max_concurrency: int = 4,
+                 max_queue: int = 10000, max_retries: int = 5, backoff_base: float = 0.5,
+                 backoff_max: float = 30.0, timeout: float = 10.0, replay_interval: Optional[float] = 30.0):
+        _parse_url(url)
+        self.url = url
+        self.token = token
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.replay_interval = replay_interval
+        self.spool = RetrySpool(spool_dir)
+        self.stats = {"submitted": 0, "sent": 0, "batches": 0, "retries": 0, "spooled": 0, "rejected": 0,
+                      "replayed": 0}
+
+        # Registros aceptados y aún no resueltos (enviados, al spool o rechazados)
+        self._unfinished = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._main(),),
+                                        name="boomi-delivery", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> Optional["BoomiDelivery"]:
+        """Instancia configurada por variables de entorno, o ``None`` si no hay endpoint"""
+        url = os.environ.get(BOOMI_URL_ENV)
+        if not url:
+            return None
+        return cls(url, spool_dir=os.environ.get(SPOOL_DIR_ENV) or DEFAULT_SPOOL_DIR,
+                   token=os.environ.get(BOOMI_TOKEN_ENV) or None)
+
+    # --- API síncrona (cualquier hilo) ---
+
+    def submit(self, data: Dict) -> bool:
+        """Encola un registro generado sin bloquear
+
+        Devuelve False si la cola en memoria está llena o cerrada; en ese caso
+        el registro va directamente al spool de disco (escrito por el hilo de
+        entrega, salvo que ya se haya cerrado).
+        """
+        record = envelope(data)
+        with self._condition:
+            self.stats["submitted"] += 1
+            closed = self._closed
+            accepted = not closed and self._unfinished < self.max_queue
+            if not closed:
+                self._unfinished += 1
+                # Se programa con el lock tomado para quedar antes del fin de cola de close()
+                self._loop.call_soon_threadsafe(self._queue.put_nowait if accepted else self._overflow, record)
+        if closed:
+            self.spool.append([record])
+            self._spooled(1)
+        return accepted
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado se haya enviado o guardado en el spool"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def replay(self, timeout: Optional[float] = None) -> int:
+        """Reenvía ahora el spool; devuelve los registros entregados"""
+        future = asyncio.run_coroutine_threadsafe(self._replay_spool(), self._loop)
+        return future.result(timeout)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Intenta enviar lo encolado (sin más reintentos) y detiene el hilo"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        self._loop.call_soon_threadsafe(self._closing.set)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def __enter__(self) -> "BoomiDelivery":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _finished(self, count: int) -> None:
+        with self._condition:
+            self._unfinished -= count
+            self._condition.notify_all()
+
+    def _spooled(self, count: int) -> None:
+        # submit también lo cuenta desde otros hilos cuando la entrega ya se cerró
+        with self._condition:
+            self.stats["spooled"] += count
+
+    # --- Event loop ---
+
+    async def _main(self) -> None:
+        self._queue: "asyncio.Queue[Optional[Dict]]" = asyncio.Queue()
+        self._closing = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        headers = {"Authorization": f"Bearer {self.token}"} if self.token else None
+        self._pool = ConnectionPool(self.url, self.max_concurrency, self.timeout, headers)
+        self._replaying = asyncio.Lock()
+        self._overflowed: List[Dict] = []
+        self._in_flight: set = set()
+        self._ready.set()
+
+        replayer = asyncio.create_task(self._replay_forever()) if self.replay_interval is not None else None
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if not batch:
+                continue
+            # Con todos los envíos ocupados los registros esperan en la cola (nunca en submit)
+            await self._slots.acquire()
+            self._track(asyncio.create_task(self._deliver(batch)))
+
+        await asyncio.gather(*self._in_flight)
+        if replayer is not None:
+            replayer.cancel()
+            try:
+                await replayer
+            except asyncio.CancelledError:
+                pass
+        await self._pool.close()
+
+    async def _next_batch(self) -> Tuple[List[Dict], bool]:
+        """Espera un registro y junta hasta ``batch_size`` durante ``batch_interval`` segundos"""
+        record = await self._queue.get()
+        if record is None:
+            return [], True
+        batch = [record]
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size:
+            try:
+                record = await asyncio.wait_for(self._queue.get(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                break
+            if record is None:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    def _overflow(self, record: Dict) -> None:
+        """Registro que no cupo en la cola: se junta con los siguientes y se escribe en un hilo aparte"""
+        self._overflowed.append(record)
+        if len(self._overflowed) == 1:
+            self._track(asyncio.create_task(self._spool_overflow()))
+
+    async def _spool_overflow(self) -> None:
+        records, self._overflowed = self._overflowed, []
+        try:
+            await asyncio.to_thread(self.spool.append, records)
+            self._spooled(len(records))
+        finally:
+            self._finished(len(records))
+
+    async def _deliver(self, batch: List[Dict]) -> None:
+        try:
+            await self._send(batch, self.max_retries)
+        finally:
+            self._slots.release()
+            self._finished(len(batch))
+
+    async def _send(self, batch: List[Dict], retries: int) -> str:
+        """Publica un lote con reintentos; devuelve ``"sent"``, ``"rejected"`` o ``"spooled"``"""
+        body = json.dumps({"records": batch}, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        for attempt in range(retries + 1):
+            try:
+                status, _ = await self._pool.post_json(body)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, DeliveryError) as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if 200 <= status < 300:
+                    self.stats["sent"] += len(batch)
+                    self.stats["batches"] += 1
+                    return "sent"
+                error = f"HTTP {status}"
+                if status not in RETRYABLE_STATUS:
+                    print(f"Boomi rejected {len(batch)} records ({error}); see {self.spool.REJECTED}",
+                          file=sys.stderr)
+                    await asyncio.to_thread(self.spool.reject, batch)
+                    self.stats["rejected"] += len(batch)
+                    return "rejected"
+
+            if attempt == retries or self._closing.is_set():
+                break
+            self.stats["retries"] += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+            # Al cerrar no se espera el backoff: el lote va directo al spool
+            try:
+                await asyncio.wait_for(self._closing.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+        print(f"Could not deliver {len(batch)} records to Boomi ({error}); spooled for retry", file=sys.stderr)
+        await asyncio.to_thread(self.spool.append, batch)
+        self._spooled(len(batch))
+        return "spooled"
+
+    async def _replay_forever(self) -> None:
+        while True:
+            # Un fallo en un ciclo no debe detener los siguientes
+            try:
+                await self._replay_spool()
+            except Exception as e:
+                print(f"Spool replay failed ({type(e).__name__}: {e}); retrying in {self.replay_interval}s",
+                      file=sys.stderr)
+            await asyncio.sleep(self.replay_interval)
+
+    async def _replay_spool(self) -> int:
+        """Reenvía los archivos del spool; al primer fallo devuelve el resto al spool"""
+        delivered = 0
+        async with self._replaying:
+            for path in await asyncio.to_thread(self.spool.claim):
+                try:
+                    records = self.spool.read(path)
+                except FileNotFoundError:
+                    # Otro proceso con el mismo directorio ya lo reenvió
+                    continue
+                failed = False
+                try:
+                    while not failed:
+                        batch = [record for _, record in zip(range(self.batch_size), records)]
+                        if not batch:
+                            break
+                        async with self._slots:
+                            # Un solo intento: si sigue caído, se espera al siguiente ciclo
+                            result = await self._send(batch, retries=0)
+                        if result == "sent":
+                            delivered += len(batch)
+                            self.stats["replayed"] += len(batch)
+                        failed = result == "spooled"
+                    rest = list(records)
+                finally:
+                    # Cerrar el archivo antes de borrarlo (necesario en Windows)
+                    records.close()
+                if rest:
+                    await asyncio.to_thread(self.spool.append, rest)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                if failed:
+                    break
+        return delivered
+
+
+# --- Servidor de pruebas ---
+
+class StubServer:
+    """Endpoint HTTP local que acepta lotes como lo haría Boomi
+
+    ``fail_rate`` responde 503 a una fracción de las peticiones y ``delay``
+    simula un endpoint lento; ``status`` fuerza un código fijo.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_rate: float = 0.0, delay: float = 0.0,
+                 status: int = 200, out: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.status = status
+        self.out = out
+        self.requests = 0
+        self.connections = 0
+        self.records = 0
+        self.ids = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: set = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/records"
+
+    async def start(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Las conexiones keep-alive abiertas no se cierran con el servidor
+            for handler in list(self._handlers):
+                handler.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                status, response = self._respond(body)
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                content = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n\r\n".encode("latin-1")
+                    + content
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(handler)
+            writer.close()
+
+    def _respond(self, body: bytes) -> Tuple[int, Dict]:
+        if self.status != 200:
+            return self.status, {"error": "forced status"}
+        if self.fail_rate and random.random() < self.fail_rate:
+            return 503, {"error": "simulated outage"}
+        try:
+            records = json.loads(body)["records"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "body must be {\"records\": [...]}"}
+        # Como haría el receptor real: los ids repetidos no se duplican
+        new = [record for record in records if record.get("id") not in self.ids]
+        self.ids.update(record.get("id") for record in new)
+        self.records += len(new)
+        if self.out and new:
+            with open(self.out, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in new)
+        return 200, {"accepted": len(new), "duplicates": len(records) - len(new)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Boomi delivery tools: local stub endpoint and spool replay.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stub = commands.add_parser("stub", help="Run a local endpoint that accepts record batches")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8089)
+    stub.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    stub.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before each response")
+    stub.add_argument("--status", type=int, default=200, help="Answer every request with this status")
+    stub.add_argument("-o", "--output", help="Append the received records to this JSON Lines file")
+
+    replay = commands.add_parser("replay", help="Send the records waiting in the spool")
+    replay.add_argument("--url", default=os.environ.get(BOOMI_URL_ENV), help=f"Endpoint (default: ${BOOMI_URL_ENV})")
+    replay.add_argument("--spool", default=os.environ.get(SPOOL_DIR_ENV) or DEFAULT_SPOOL_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "stub":
+        server = StubServer(args.host, args.port, args.fail_rate, args.delay, args.status, args.output)
+        print(f"Stub Boomi endpoint on http://{args.host}:{args.port}/records (Ctrl+C to stop)")
+        try:
+            asyncio.run(server.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        print(f"{server.records} records in {server.requests} requests over {server.connections} connections")
+        return 0
+
+    if not args.url:
+        parser.error(f"--url or ${BOOMI_URL_ENV} is required")
+    with BoomiDelivery(args.url, spool_dir=args.spool, replay_interval=None) as delivery:
+        delivered = delivery.replay()
+        left = delivery.spool.pending()
+    print(f"{delivered} records delivered, {left} still in {args.spool}")
+    if delivery.spool.quarantined:
+        print(f"{delivery.spool.quarantined} unreadable lines moved to {RetrySpool.CORRUPT}")
+    return 0 if left == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Estimación en vivo del tamaño del payload y de la versión del QR
+
+``PayloadEstimator.estimate`` calcula, a partir de los mismos campos que
+``validate_record``, los bytes del payload con el codec elegido y la versión
+de QR resultante sin construir la matriz ni renderizar la imagen.
+
+Es incremental: cada entrada "SKU:Quantity" se interpreta y se serializa una
+sola vez (se guarda su coste en bytes), así que al añadir items solo se
+procesan los nuevos y el resto del cálculo son sumas. Con el codec ``b45``
+solo se vuelve a ejecutar la compresión zlib sobre los items ya empaquetados.
+
+La versión se calcula como si todo el payload fuera un único segmento (byte
+para JSON, alfanumérico para ``b45``); la segmentación real de ``qrcode``
+puede ahorrar algo más, así que la estimación es un límite superior.
+
+Con ``signer`` se cuenta la firma con un valor de relleno de su misma
+longitud: los codecs JSON dan el tamaño exacto; en ``b45`` la compresión de
+la firma real puede variar en unos pocos caracteres.
+"""
+
+from datetime import datetime
+from hashlib import sha512
+from typing import TYPE_CHECKING, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from truck_qr.codec import (_EPOCH, B45_PREFIX, CODECS, DEFAULT_CODEC, _write_varint, b64url_encode,
+                            encode_payload, finish_binary, pack_header, pack_item, pack_signature)
+from truck_qr.generator import ERROR_CORRECT_M, TruckQRGenerator
+from truck_qr.record import _gate_datetime, _text, items_raw
+from truck_qr.split import DEFAULT_MAX_VERSION
+
+if TYPE_CHECKING:
+    from truck_qr.signing import SigningKey
+
+# Item de referencia para calcular el coste fijo de la lista de items
+_PLACEHOLDER = {"item_id": "X", "quantity": 1}
+# Máximo de costes por item guardados antes de vaciar la caché
+_MAX_CACHED_ITEMS = 50000
+
+
+class SizeEstimate(NamedTuple):
+    """Tamaño estimado del QR para los valores actuales del formulario"""
+    codec: str
+    payload_bytes: int
+    items: int
+    item_errors: int
+    version: Optional[int]
+
+    @property
+    def modules(self) -> Optional[int]:
+        return None if self.version is None else self.version * 4 + 17
+
+    @property
+    def fits(self) -> bool:
+        """Cabe en un solo código QR"""
+        return self.version is not None
+
+    def dense(self, max_version: int = DEFAULT_MAX_VERSION) -> bool:
+        """Supera la versión a partir de la cual el código cuesta leerlo"""
+        return self.version is None or self.version > max_version
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def estimate_version(length: int, alphanumeric: bool = False,
+                     error_correction: int = ERROR_CORRECT_M) -> Optional[int]:
+    """Menor versión para ``length`` caracteres en un único segmento, o ``None`` si no cabe"""
+    import qrcode.util
+
+    mode = qrcode.util.MODE_ALPHA_NUM if alphanumeric else qrcode.util.MODE_8BIT_BYTE
+    data_bits = 11 * (length // 2) + 6 * (length % 2) if alphanumeric else 8 * length
+    limits = qrcode.util.BIT_LIMIT_TABLE[error_correction]
+    for version in range(1, 41):
+        if limits[version] >= 4 + qrcode.util.mode_sizes_for_version(version)[mode] + data_bits:
+            return version
+    return None
+
+
+def header_fields(fields: Mapping) -> Dict:
+    """Campos de cabecera normalizados como en ``validate_record``, sin exigir que sean válidos"""
+    dt_iso = _gate_datetime(fields, [])
+    date_format = TruckQRGenerator.BOOMI_CONFIG['date_format']
+    if dt_iso is None or dt_iso < _EPOCH.strftime(date_format):
+        # Mientras la fecha no es válida (o ``b45`` no la puede empaquetar) se usa
+        # la hora actual, de la misma longitud
+        dt_iso = datetime.now().strftime(date_format)
+    truck_type = _text(fields, "truckType", "truck_type").strip()
+    return {
+        "plate": _text(fields, "plate").strip().upper(),
+        "driverName": _text(fields, "driverName", "driver").strip().title(),
+        "customer_id": _text(fields, "customer_id").strip().upper(),
+        "date_time_at_gate": dt_iso,
+        "truckType": truck_type if truck_type in TruckQRGenerator.BOOMI_CONFIG['truck_types'] else "",
+        "company": _text(fields, "company").strip(),
+        "deliveryOrderRef": _text(fields, "deliveryOrderRef", "delivery_ref").strip().upper(),
+    }
+
+
+class PayloadEstimator:
+    """Estimador incremental; conviene una instancia por formulario o sesión"""
+
+    def __init__(self, error_correction: int = ERROR_CORRECT_M, signer: Optional["SigningKey"] = None):
+        self.error_correction = error_correction
+        # Firma de relleno de la misma longitud que la real; bytes sin patrón para
+        # que en ``b45`` zlib la comprima igual de mal que una firma de verdad
+        self._signature = (None if signer is None else
+                           f"{signer.key_id}.{b64url_encode(sha512(signer.key_id.encode()).digest()[:signer.signature_size])}")
+        # Entrada de texto -> (item_id, cantidad) o None si no es válida
+        self._entries: Dict[str, Optional[Tuple[str, int]]] = {}
+        # Codec -> (item_id, cantidad) -> bytes que añade el item (bytes empaquetados en b45)
+        self._item_costs: Dict[str, Dict[Tuple[str, int], object]] = {codec: {} for codec in CODECS}
+        self._list_overhead: Dict[str, int] = {}
+
+    def _parse(self, entry: str) -> Optional[Tuple[str, int]]:
+        parsed = self._entries.get(entry, False)
+        if parsed is False:
+            item, _ = next(TruckQRGenerator.iter_items(entry), (None, None))
+            parsed = None if item is None else (item["item_id"], item["quantity"])
+            self._entries[entry] = parsed
+        return parsed
+
+    def _cost(self, codec: str, item: Tuple[str, int]):
+        costs = self._item_costs[codec]
+        cost = costs.get(item)
+        if cost is None:
+            cost = costs[item] = self._item_cost(codec, *item)
+        return cost
+
+    def _item_cost(self, codec: str, item_id: str, quantity: int):
+        if codec == "b45":
+            return pack_item(item_id, quantity)
+        # f([a, b]) = f([a]) + f([b]) - K: cada item suma f([item]) - K bytes
+        overhead = self._list_overhead.get(codec)
+        if overhead is None:
+            one = _utf8_len(encode_payload({"item_list": [_PLACEHOLDER]}, codec))
+            two = _utf8_len(encode_payload({"item_list": [_PLACEHOLDER, dict(_PLACEHOLDER, item_id="Y")]}, codec))
+            overhead = self._list_overhead[codec] = 2 * one - two
+        return _utf8_len(encode_payload({"item_list": [{"item_id": item_id, "quantity": quantity}]}, codec)) - overhead
+
+    def _items(self, text: str, codec: str) -> Tuple[List, int]:
+        """Costes de los items válidos (sin duplicados) y número de entradas con error"""
+        if len(self._item_costs[codec]) > _MAX_CACHED_ITEMS or len(self._entries) > _MAX_CACHED_ITEMS:
+            self._item_costs[codec].clear()
+            self._entries.clear()
+
+        seen = set()
+        items = []
+        errors = 0
+        for line in text.splitlines():
+            for entry in line.split(","):
+                if not entry.strip():
+                    continue
+                parsed = self._parse(entry)
+                if parsed is None or parsed[0] in seen:
+                    errors += 1
+                    continue
+                seen.add(parsed[0])
+                items.append(self._cost(codec, parsed))
+        return items, errors
+
+    def estimate(self, fields: Mapping, codec: str = DEFAULT_CODEC) -> SizeEstimate:
+        """Estima bytes y versión del QR para los valores actuales de los campos"""
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: '{codec}'. Use one of: {', '.join(CODECS)}.")
+        header = header_fields(fields)
+        if self._signature is not None:
+            header["sig"] = self._signature
+        items, errors = self._items(items_raw(fields), codec)
+
+        if codec == "b45":
+            flags, body = pack_header(header)
+            _write_varint(body, len(items))
+            body += b"".join(items)
+            if self._signature is not None:
+                pack_signature(body, self._signature)
+            packed = finish_binary(flags, body)
+            length = len(B45_PREFIX) + 3 * (len(packed) // 2) + 2 * (len(packed) % 2)
+        elif items:
+            # Cabecera medida con un item de referencia, más lo que suma cada item
+            length = (_utf8_len(encode_payload(dict(header, item_list=[_PLACEHOLDER]), codec))
+                      - self._cost(codec, (_PLACEHOLDER["item_id"], _PLACEHOLDER["quantity"])) + sum(items))
+        else:
+            length = _utf8_len(encode_payload(dict(header, item_list=[]), codec))
+
+        version = estimate_version(length, codec == "b45", self.error_correction)
+        return SizeEstimate(codec, length, len(items), errors, version)
+
+
+def estimate_size(fields: Mapping, codec: str = DEFAULT_CODEC, signer: Optional["SigningKey"] = None) -> SizeEstimate:
+    """Estimación puntual (sin estado incremental)"""
+    return PayloadEstimator(signer=signer).estimate(fields, codec)
@@ -0,0 +1,355 @@
+"""Lógica principal de validación y generación de códigos QR (sin dependencias de Streamlit)
+
+``qrcode`` (y con él PIL) se importa al construir el primer QR: los procesos
+que solo validan, consultan el histórico o envían a Boomi no lo cargan.
+"""
+
+import base64
+import io
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from truck_qr import metrics
+
+if TYPE_CHECKING:
+    import qrcode
+    from truck_qr.cache import QRCache
+    from truck_qr.policy import QRPolicy, RenderSettings
+    from truck_qr.signing import SigningKey
+
+# Valor de qrcode.constants.ERROR_CORRECT_M (importar qrcode.constants carga todo qrcode)
+ERROR_CORRECT_M = 0
+
+
+class ValidationError(Exception):
+    """Excepción personalizada para errores de validación"""
+    pass
+
+class TruckQRGenerator:
+    """Clase principal para generar códigos QR de tracking de camiones"""
+    
+    # Patrones de validación
+    PLATE_PATTERN = re.compile(r'^[A-Z0-9-]{3,10}$')
+    DRIVER_NAME_PATTERN = re.compile(r'^[A-Za-z\s\.\-\']{2,50}$')  # Solo letras, espacios y algunos caracteres especiales
+    CUSTOMER_ID_PATTERN = re.compile(r'^[A-Z0-9_-]{3,20}$')
+    DELIVERY_REF_PATTERN = re.compile(r'^[A-Z0-9_-]{3,30}$')
+    ITEM_ID_PATTERN = re.compile(r'^[A-Z0-9_-]{1,20}$')
+    
+    # Máximo de errores de items que se muestran individualmente
+    MAX_ITEM_ERRORS = 20
+    
+    # Configuración para Boomi
+    BOOMI_CONFIG = {
+        'date_format': '%Y-%m-%dT%H:%M:%S',  # Formato ISO para Boomi
+        'required_fields': ['plate', 'driverName', 'customer_id', 'date_time_at_gate', 'item_list'],
+        'truck_types': ['Type A', 'Type B', 'Type C', 'Type D', 'Type E']
+    }
+    
+    # Configuración de renderizado del QR
+    QR_RENDER_CONFIG = {
+        'error_correction': ERROR_CORRECT_M,  # Mejor balance entre corrección y tamaño
+        'box_size': 8,  # Tamaño óptimo para lectura
+        'border': 4
+    }
+    
+    @staticmethod
+    def validate_plate(plate: str) -> bool:
+        """Valida el formato de la placa"""
+        if not plate or len(plate.strip()) < 3:
+            return False
+        return bool(TruckQRGenerator.PLATE_PATTERN.match(plate.strip().upper()))
+    
+    @staticmethod
+    def validate_driver_name(driver: str) -> bool:
+        """Valida el nombre del conductor"""
+        if not driver or len(driver.strip()) < 2:
+            return False
+        return bool(TruckQRGenerator.DRIVER_NAME_PATTERN.match(driver.strip()))
+    
+    @staticmethod
+    def validate_customer_id(customer_id: str) -> bool:
+        """Valida el ID del cliente"""
+        if not customer_id or len(customer_id.strip()) < 3:
+            return False
+        return bool(TruckQRGenerator.CUSTOMER_ID_PATTERN.match(customer_id.strip().upper()))
+    
+    @staticmethod
+    def validate_delivery_ref(delivery_ref: str) -> bool:
+        """Valida la referencia de entrega"""
+        if not delivery_ref:
+            return True  # Campo opcional
+        return bool(TruckQRGenerator.DELIVERY_REF_PATTERN.match(delivery_ref.strip().upper()))
+    
+    @staticmethod
+    def validate_company(company: str) -> bool:
+        """Valida el nombre de la empresa"""
+        if not company:
+            return True  # Campo opcional
+        return len(company.strip()) >= 2 and len(company.strip()) <= 100
+    
+    @staticmethod
+    def iter_items(items_raw: str) -> Iterator[Tuple[Optional[Dict], Optional[str]]]:
+        """Recorre los items en streaming y devuelve (item, None) o (None, error) por cada uno
+        
+        Acepta items separados por comas o saltos de línea, y columnas
+        "SKU<TAB>Quantity" pegadas desde una hoja de cálculo.
+        """
+        seen_items = set()
+        # Referencias locales para el bucle caliente
+        match_item_id = TruckQRGenerator.ITEM_ID_PATTERN.match
+        
+        # Se recorre línea a línea: str.split es bastante más rápido que un
+        # regex finditer y solo se materializa una línea cada vez
+        for line in items_raw.splitlines():
+            for item_entry in line.split(','):
+                item_entry = item_entry.strip()
+                if not item_entry:
+                    continue
+                
+                # "SKU:Quantity" o "SKU<TAB>Quantity" (hoja de cálculo)
+                separator = ':' if ':' in item_entry or '\t' not in item_entry else '\t'
+                item_id, found, quantity_str = item_entry.partition(separator)
+                if not found or separator in quantity_str:
+                    yield None, f"Invalid item format: '{item_entry}'. Use 'SKU:Quantity'."
+                    continue
+                
+                item_id = item_id.strip().upper()
+                
+                # Validar ID del item
+                if not match_item_id(item_id):
+                    yield None, f"Invalid item ID format: '{item_id}'. Use only letters, numbers, hyphens and underscores."
+                    continue
+                
+                # Validar duplicados
+                if item_id in seen_items:
+                    yield None, f"Duplicate item ID: '{item_id}'."
+                    continue
+                
+                seen_items.add(item_id)
+                
+                # Validar cantidad (int() ya ignora los espacios)
+                try:
+                    quantity = int(quantity_str)
+                except ValueError:
+                    yield None, f"Quantity '{quantity_str.strip()}' for '{item_id}' is not a valid number."
+                    continue
+                
+                if quantity <= 0:
+                    yield None, f"Quantity for '{item_id}' must be a positive number."
+                    continue
+                
+                yield {"item_id": item_id, "quantity": quantity}, None
+    
+    @staticmethod
+    def validate_items(items_raw: str, max_errors: int = MAX_ITEM_ERRORS) -> Tuple[bool, List[Dict], List[str]]:
+        """Valida y procesa la lista de items
+        
+        Solo se conservan los primeros ``max_errors`` mensajes; el resto se
+        resume en un mensaje final con el número de errores omitidos.
+        """
+        if not items_raw or not items_raw.strip():
+            return False, [], ["The 'Items' field is required."]
+        
+        errors = []
+        item_list = []
+        error_count = 0
+        
+        for item, error in TruckQRGenerator.iter_items(items_raw):
+            if error is None:
+                item_list.append(item)
+                continue
+            error_count += 1
+            if error_count <= max_errors:
+                errors.append(error)
+        
+        if not item_list and not error_count:
+            return False, [], ["The 'Items' field is required and does not contain valid items."]
+        
+        if error_count > max_errors:
+            errors.append(f"... and {error_count - max_errors} more item errors ({error_count} in total).")
+        
+        return error_count == 0, item_list, errors
+    
+    @staticmethod
+    def validate_datetime(selected_date, selected_hour: str, selected_minute: str, selected_ampm: str) -> Tuple[bool, Optional[str], List[str]]:
+        """Valida y procesa la fecha y hora"""
+        errors = []
+        
+        if not selected_date:
+            errors.append("The 'Date' field is required.")
+        
+        if not selected_hour or not selected_minute:
+            errors.append("The 'Hours' and 'Minutes' fields are required.")
+        
+        if errors:
+            return False, None, errors
+        
+        try:
+            h_12 = int(selected_hour)
+            m = int(selected_minute)
+            
+            # Convertir a formato 24 horas
+            if selected_ampm == "PM" and h_12 != 12:
+                h_24 = h_12 + 12
+            elif selected_ampm == "AM" and h_12 == 12:
+                h_24 = 0
+            else:
+                h_24 = h_12
+            
+            if not (0 <= h_24 <= 23 and 0 <= m <= 59):
+                errors.append("Invalid time format.")
+                return False, None, errors
+            
+            # Crear datetime y validar que no sea en el futuro
+            combined_datetime = datetime(selected_date.year, selected_date.month, selected_date.day, h_24, m)
+            
+            if combined_datetime > datetime.now():
+                errors.append("Date and time cannot be in the future.")
+                return False, None, errors
+            
+            # Formato ISO para Boomi
+            dt_iso = combined_datetime.strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
+            
+            return True, dt_iso, []
+            
+        except ValueError as e:
+            errors.append(f"Error processing time: {str(e)}")
+            return False, None, errors
+    
+    @staticmethod
+    def build_qr(payload: str, settings: Optional["RenderSettings"] = None) -> "qrcode.QRCode":
+        """Construye la matriz del código QR para un texto ya serializado
+        
+        Sin ``settings`` se usa ``QR_RENDER_CONFIG``; con la configuración de
+        ``truck_qr.policy.choose_settings`` se respetan su versión, nivel de
+        corrección y segmentos. Si el texto no cabe en la versión 40 se lanza
+        ``ValidationError``.
+        """
+        import qrcode
+        import qrcode.exceptions
+        import qrcode.util
+        
+        if settings is None:
+            # Generar QR con configuración optimizada
+            qr = qrcode.QRCode(
+                version=None,  # Auto-determinar versión
+                **TruckQRGenerator.QR_RENDER_CONFIG
+            )
+        else:
+            qr = qrcode.QRCode(
+                version=settings.version,
+                error_correction=settings.error_correction,
+                box_size=settings.box_size,
+                border=settings.border,
+            )
+        
+        with metrics.span("qr_make"):
+            if settings is None:
+                qr.add_data(payload)
+                try:
+                    qr.make(fit=True)
+                except (ValueError, qrcode.exceptions.DataOverflowError):
+                    # qrcode solo informa "Invalid version (was 41, ...)"
+                    raise ValidationError(f"Payload does not fit in a single QR code "
+                                          f"({len(payload.encode('utf-8'))} bytes). "
+                                          "Use the b45 format or split the manifest.")
+            else:
+                for mode, text in settings.segments:
+                    qr.add_data(qrcode.util.QRData(text.encode("utf-8"), mode=mode, check_data=False))
+                qr.make(fit=False)
+        metrics.observe(metrics.QR_VERSION, qr.version)
+        metrics.observe(metrics.PAYLOAD_BYTES, len(payload.encode("utf-8")))
+        return qr
+    
+    @staticmethod
+    def render_png(payload: str, settings: Optional["RenderSettings"] = None) -> bytes:
+        """Renderiza un texto ya serializado como código QR en PNG"""
+        return TruckQRGenerator.qr_to_png(TruckQRGenerator.build_qr(payload, settings))
+    
+    @staticmethod
+    def qr_to_png(qr: "qrcode.QRCode") -> bytes:
+        """PNG de un QR ya construido con ``build_qr``"""
+        with metrics.span("png_encode"):
+            # Crear imagen con alta calidad
+            img = qr.make_image(fill_color="black", back_color="white")
+            
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", optimize=True)
+            return buf.getvalue()
+    
+    @staticmethod
+    def generate_qr_png(data_dict: Dict, codec: str = "json", cache: Optional["QRCache"] = None,
+                        signer: Optional["SigningKey"] = None) -> Tuple[bytes, str]:
+        """Genera el código QR como bytes PNG junto con el payload embebido
+        
+        Con ``signer`` el payload lleva la firma ``sig`` (ver ``truck_qr.signing``).
+        """
+        from truck_qr.codec import encode_payload
+        
+        if signer is not None:
+            from truck_qr.signing import sign_payload
+            data_dict = sign_payload(data_dict, signer)
+        
+        # Servir desde caché si el mismo payload ya se renderizó con la misma configuración
+        if cache is not None:
+            cache_key = cache.make_key(data_dict, codec=codec, **TruckQRGenerator.QR_RENDER_CONFIG)
+            cached = cache.get(cache_key)
+            metrics.inc(metrics.CACHE_REQUESTS, result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+        
+        # Limpiar datos nulos o vacíos y serializar con el codec elegido
+        # ("json" mantiene el formato legible original)
+        with metrics.span("payload_encode"):
+            payload = encode_payload(data_dict, codec)
+        
+        result = (TruckQRGenerator.render_png(payload), payload)
+        if cache is not None:
+            cache.put(cache_key, result)
+        return result
+    
+    @staticmethod
+    def generate_qr_adaptive(data_dict: Dict, codec: str = "json", policy: Optional["QRPolicy"] = None,
+                             cache: Optional["QRCache"] = None,
+                             signer: Optional["SigningKey"] = None) -> Tuple[bytes, str, "RenderSettings"]:
+        """Genera el PNG con la corrección, versión y segmentos elegidos por ``truck_qr.policy``
+        
+        Devuelve también la configuración elegida para informarla al usuario.
+        Lanza ``ValidationError`` si el payload no cabe en ``policy.max_version``.
+        """
+        from truck_qr.codec import encode_payload
+        from truck_qr.policy import QRPolicy, choose_settings
+        
+        policy = policy or QRPolicy()
+        if signer is not None:
+            from truck_qr.signing import sign_payload
+            data_dict = sign_payload(data_dict, signer)
+        with metrics.span("payload_encode"):
+            payload = encode_payload(data_dict, codec)
+        # choose_settings guarda en caché sus resultados por payload y política
+        settings = choose_settings(payload, policy)
+        
+        if cache is not None:
+            cache_key = cache.make_key(data_dict, codec=codec, policy=policy._asdict())
+            cached = cache.get(cache_key)
+            metrics.inc(metrics.CACHE_REQUESTS, result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached[0], cached[1], settings
+        
+        result = (TruckQRGenerator.render_png(payload, settings), payload)
+        if cache is not None:
+            cache.put(cache_key, result)
+        return result[0], result[1], settings
+    
+    @staticmethod
+    @metrics.registry.timed("generate_qr_optimized")
+    def generate_qr_optimized(data_dict: Dict, codec: str = "json", cache: Optional["QRCache"] = None,
+                              signer: Optional["SigningKey"] = None) -> Tuple[str, str]:
+        """Genera un código QR optimizado para Boomi (firmado si se pasa ``signer``)"""
+        png_bytes, payload = TruckQRGenerator.generate_qr_png(data_dict, codec, cache, signer)
+        
+        # Convertir a base64
+        base64_qr = base64.b64encode(png_bytes).decode()
+        
+        return base64_qr, payload
@@ -0,0 +1,264 @@
+"""Histórico persistente de los códigos QR generados
+
+Cada QR generado se guarda en una base SQLite (modo WAL) como registro de
+auditoría: qué placa recibió qué payload y cuándo. ``record`` solo encola la
+fila; un hilo escritor las inserta por lotes (``batch_size`` filas o cada
+``flush_interval`` segundos, lo que ocurra antes), de modo que la escritura no
+añade latencia al botón "Generate QR".
+
+Consultas por rango de fechas y placa (para reportes de turno):
+    python -m truck_qr.history --db qr_history.db --from 2024-05-01T06:00 --to 2024-05-01T14:00
+    python -m truck_qr.history --db qr_history.db --plate ABC-123 -o reporte.csv
+"""
+
+import argparse
+import atexit
+import csv
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+from truck_qr.codec import clean_payload
+from truck_qr.generator import TruckQRGenerator
+
+# Variable de entorno con la ruta de la base del histórico de la UI
+HISTORY_DB_ENV = "TRUCK_QR_HISTORY_DB"
+DEFAULT_HISTORY_DB = "qr_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generations (
+    id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    plate TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    delivery_ref TEXT,
+    date_time_at_gate TEXT,
+    codec TEXT NOT NULL,
+    parts INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_generations_created_at ON generations (created_at);
+CREATE INDEX IF NOT EXISTS idx_generations_plate ON generations (plate, created_at);
+"""
+
+_INSERT = (
+    "INSERT INTO generations (created_at, plate, customer_id, delivery_ref, date_time_at_gate, codec, parts, "
+    "data, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_COLUMNS = "id, created_at, plate, customer_id, delivery_ref, date_time_at_gate, codec, parts, data, payload"
+
+REPORT_FIELDS = ["created_at", "plate", "customer_id", "delivery_ref", "date_time_at_gate", "codec", "parts",
+                 "items", "total_quantity"]
+
+
+class Generation(NamedTuple):
+    """Un QR generado tal como se guardó en el histórico"""
+    id: int
+    created_at: str
+    plate: str
+    customer_id: str
+    delivery_ref: Optional[str]
+    date_time_at_gate: Optional[str]
+    codec: str
+    parts: int
+    data: str
+    payload: str
+
+    def item_list(self) -> List[Dict]:
+        return json.loads(self.data).get("item_list", [])
+
+
+def _timestamp(value: Union[str, datetime]) -> str:
+    if isinstance(value, datetime):
+        return value.strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
+    return value
+
+
+class GenerationHistory:
+    """Histórico en SQLite con inserciones en segundo plano y por lotes"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_DB, batch_size: int = 200, flush_interval: float = 1.0):
+        if path == ":memory:":
+            raise ValueError("The history needs a database file shared by the writer and the readers.")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+
+        # El esquema se crea antes de arrancar el escritor para que las consultas no fallen
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._thread = threading.Thread(target=self._run, name="qr-history-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # En WAL, NORMAL solo puede perder las últimas transacciones ante un corte de energía
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def record(self, data: Dict, payload: str, codec: str, parts: int = 1,
+               created_at: Optional[datetime] = None) -> None:
+        """Encola un QR generado; no bloquea ni toca la base de datos"""
+        if self._closed:
+            raise RuntimeError("The generation history is closed.")
+        data = clean_payload(data)
+        self._queue.put((
+            _timestamp(created_at or datetime.now()),
+            data.get("plate", ""),
+            data.get("customer_id", ""),
+            data.get("deliveryOrderRef"),
+            data.get("date_time_at_gate"),
+            codec,
+            parts,
+            json.dumps(data, separators=(",", ":"), ensure_ascii=False),
+            payload,
+        ))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todo lo encolado esté escrito; devuelve False si vence ``timeout``"""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        """Escribe lo pendiente y detiene el hilo escritor"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def __enter__(self) -> "GenerationHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """Bucle del hilo escritor: agrupa filas y las inserta en una transacción por lote"""
+        conn = self._connect()
+        try:
+            stop = False
+            while not stop:
+                rows = []
+                waiters = []
+                item = self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        waiters.append(item)
+                    else:
+                        rows.append(item)
+                    if stop or waiters or len(rows) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+
+                if rows:
+                    try:
+                        with conn:
+                            conn.executemany(_INSERT, rows)
+                        self.written += len(rows)
+                    except sqlite3.Error as e:
+                        # No se puede propagar al usuario: se cuenta y se informa
+                        self.failed += len(rows)
+                        print(f"Could not write {len(rows)} QR history rows: {e}", file=sys.stderr)
+                for waiter in waiters:
+                    waiter.set()
+        finally:
+            conn.close()
+
+    def query(self, start: Optional[Union[str, datetime]] = None, end: Optional[Union[str, datetime]] = None,
+              plate: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Generation]:
+        """Recorre los QR generados en ``[start, end)`` y/o de una placa, por fecha de generación"""
+        self.flush()
+        conditions = []
+        params: List = []
+        if plate:
+            conditions.append("plate = ?")
+            params.append(plate.strip().upper())
+        if start:
+            conditions.append("created_at >= ?")
+            params.append(_timestamp(start))
+        if end:
+            conditions.append("created_at < ?")
+            params.append(_timestamp(end))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {_COLUMNS} FROM generations {where} ORDER BY created_at, id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect()
+        try:
+            for row in conn.execute(sql, params):
+                yield Generation(*row)
+        finally:
+            conn.close()
+
+
+def write_report(rows: Iterator[Generation], out) -> int:
+    """Escribe un reporte CSV de turno; devuelve el número de filas"""
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        items = row.item_list()
+        writer.writerow({
+            "created_at": row.created_at,
+            "plate": row.plate,
+            "customer_id": row.customer_id,
+            "delivery_ref": row.delivery_ref or "",
+            "date_time_at_gate": row.date_time_at_gate or "",
+            "codec": row.codec,
+            "parts": row.parts,
+            "items": len(items),
+            "total_quantity": sum(item.get("quantity", 0) for item in items),
+        })
+        count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Query the history of generated truck QR codes.")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_DB, help=f"History database (default: {DEFAULT_HISTORY_DB})")
+    parser.add_argument("--from", dest="start", help="First generation time, ISO format (inclusive)")
+    parser.add_argument("--to", dest="end", help="Last generation time, ISO format (exclusive)")
+    parser.add_argument("--plate", help="Only codes generated for this plate")
+    parser.add_argument("-o", "--output", help="CSV report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with GenerationHistory(args.db) as history:
+        rows = history.query(args.start, args.end, args.plate)
+        if args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as f:
+                count = write_report(rows, f)
+            print(f"{count} generated QR codes written to {args.output}")
+        else:
+            write_report(rows, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""Hojas de etiquetas imprimibles (PDF o PNG por página) con muchos códigos QR
+
+Cada etiqueta lleva el QR, la placa y un resumen del manifiesto. Las páginas
+se generan y escriben una a una: solo se mantienen en memoria las etiquetas de
+la página en curso, de modo que una hoja de 2.000 camiones no acumula todas
+las imágenes.
+
+    pdf  QR vectorial (rectángulos por tramo) y texto Helvetica; se escribe
+         directamente en el archivo sin dependencias adicionales
+    png  una imagen de 1 bit por página (``--dpi``) en un ZIP o directorio
+
+Con ``--workers`` las páginas se renderizan en un pool de procesos, con un
+número acotado de páginas en vuelo.
+
+Uso:
+    python -m truck_qr.labels manifest.csv -o etiquetas.pdf --page a4
+    python -m truck_qr.labels manifest.jsonl -o etiquetas.zip --page thermal --format png
+"""
+
+import argparse
+import io
+import os
+import sys
+import zlib
+from collections import deque
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from truck_qr.batch import check_row, read_manifest
+from truck_qr.codec import CODECS, DEFAULT_CODEC, encode_payload, qr_stats
+from truck_qr.generator import ValidationError
+from truck_qr.output import OutputWriter, get_matrix, pack_matrix
+from truck_qr.split import split_payload
+
+if TYPE_CHECKING:
+    from truck_qr.policy import RenderSettings
+
+LABEL_FORMATS = ("pdf", "png")
+
+POINTS_PER_MM = 72 / 25.4
+
+
+class PageLayout(NamedTuple):
+    """Tamaño de página (mm) y rejilla de etiquetas"""
+    width_mm: float
+    height_mm: float
+    columns: int
+    rows: int
+    margin_mm: float
+
+    @property
+    def per_page(self) -> int:
+        return self.columns * self.rows
+
+
+PAGE_LAYOUTS = {
+    "a4": PageLayout(210, 297, 3, 4, 10),
+    "letter": PageLayout(215.9, 279.4, 3, 4, 10),
+    "thermal": PageLayout(101.6, 152.4, 1, 1, 3),  # Etiqueta térmica de 4x6 pulgadas
+}
+DEFAULT_LAYOUT = "a4"
+
+
+class Label(NamedTuple):
+    """Contenido de una etiqueta: payload del QR, título (placa) y líneas de resumen
+
+    ``settings`` es la configuración adaptativa con la que se mostró el QR
+    (``None`` usa la de ``build_qr``).
+    """
+    payload: str
+    title: str
+    lines: List[str]
+    settings: Optional["RenderSettings"] = None
+
+
+def labels_for(data: Dict, codec: str = DEFAULT_CODEC, max_version: Optional[int] = None,
+               adaptive: bool = False) -> List[Label]:
+    """Etiquetas de un registro ya validado (una por QR si el manifiesto se divide)
+
+    Con ``adaptive`` el QR se elige como en ``render_record``: un solo código
+    con ``truck_qr.policy`` si cabe en ``max_version`` y, si no, dividido.
+    Lanza ``ValidationError`` si el payload no cabe en ningún QR.
+    """
+    settings = None
+    if adaptive:
+        from truck_qr.policy import QRPolicy, choose_settings
+        text = encode_payload(data, codec)
+        try:
+            settings = choose_settings(text, QRPolicy(max_version=max_version))
+        except ValidationError:
+            if max_version is None:
+                raise
+    if settings is not None:
+        texts = [text]
+    elif max_version is None:
+        texts = [encode_payload(data, codec)]
+    else:
+        texts = split_payload(data, codec, max_version)
+    items = data.get("item_list", [])
+    summary = f"{len(items)} items, {sum(item['quantity'] for item in items)} units"
+    if data.get("deliveryOrderRef"):
+        summary += f" - {data['deliveryOrderRef']}"
+    lines = [
+        f"Customer: {data['customer_id']}",
+        f"Gate: {data['date_time_at_gate'].replace('T', ' ')}",
+        summary,
+    ]
+    total = len(texts)
+    if total == 1:
+        return [Label(texts[0], data["plate"], lines, settings)]
+    return [Label(text, f"{data['plate']} ({i}/{total})", lines) for i, text in enumerate(texts, start=1)]
+
+
+def _pages(labels: Iterable[Label], per_page: int) -> Iterator[List[Label]]:
+    """Agrupa las etiquetas por página sin materializar el resto"""
+    page = []
+    for label in labels:
+        page.append(label)
+        if len(page) == per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _render_pages(func: Callable, pages: Iterator[List[Label]], args: Tuple, workers: int) -> Iterator[bytes]:
+    """Renderiza las páginas en orden, en paralelo si ``workers`` > 1
+
+    Solo hay ``2 * workers`` páginas en vuelo a la vez, así que la memoria no
+    depende del número total de etiquetas.
+    """
+    if workers <= 1:
+        for page in pages:
+            yield func(page, *args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for page in pages:
+            in_flight.append(executor.submit(func, page, *args))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class _Cell(NamedTuple):
+    """Geometría de una etiqueta dentro de la página (origen arriba a la izquierda)"""
+    x: float
+    y: float
+    qr_size: float
+    title_size: float
+    line_size: float
+    max_chars: int
+
+
+def _cells(layout: PageLayout, scale: float) -> List[_Cell]:
+    """Posición del QR y tamaños de texto de cada etiqueta, en las unidades de ``scale`` por mm"""
+    margin = layout.margin_mm * scale
+    cell_w = (layout.width_mm * scale - 2 * margin) / layout.columns
+    cell_h = (layout.height_mm * scale - 2 * margin) / layout.rows
+    padding = 3 * scale
+    title_size = min(cell_w * 0.08, 9 * scale)
+    line_size = title_size * 0.65
+    text_h = title_size * 1.3 + 3 * line_size * 1.3
+    qr_size = min(cell_w - 2 * padding, cell_h - 2 * padding - text_h)
+    # Helvetica/Aileron ocupan de media ~0.55 em por carácter
+    max_chars = int((cell_w - 2 * padding) / (line_size * 0.55))
+    cells = []
+    for r in range(layout.rows):
+        for c in range(layout.columns):
+            x = margin + c * cell_w + (cell_w - qr_size) / 2
+            y = margin + r * cell_h + padding
+            cells.append(_Cell(x, y, qr_size, title_size, line_size, max_chars))
+    return cells
+
+
+def _clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max(1, max_chars - 3)] + "..."
+
+
+# --- PDF ---
+
+def _pdf_text(text: str) -> bytes:
+    """Literal de texto PDF en WinAnsiEncoding"""
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _pdf_page_content(page: List[Label], layout: PageLayout) -> bytes:
+    """Operadores de dibujo de una página comprimidos (coordenadas PDF con origen abajo a la izquierda)"""
+    cells = _cells(layout, POINTS_PER_MM)
+    page_height = layout.height_mm * POINTS_PER_MM
+    out = []
+    for label, cell in zip(page, cells):
+        matrix = get_matrix(label.payload, label.settings)
+        module = cell.qr_size / len(matrix)
+        top = page_height - cell.y
+        # Tramos horizontales de módulos oscuros como rectángulos
+        for r, row in enumerate(matrix):
+            y = top - (r + 1) * module
+            c = 0
+            size = len(row)
+            while c < size:
+                if not row[c]:
+                    c += 1
+                    continue
+                run = 1
+                while c + run < size and row[c + run]:
+                    run += 1
+                out.append(f"{cell.x + c * module:.2f} {y:.2f} {run * module:.2f} {module:.2f} re")
+                c += run
+        out.append("f")
+
+        text_y = top - cell.qr_size - cell.title_size * 1.1
+        text = [f"BT /F1 {cell.title_size:.1f} Tf {cell.x:.2f} {text_y:.2f} Td ".encode()
+                + _pdf_text(_clip(label.title, int(cell.max_chars / 1.6))) + b" Tj ET"]
+        for line in label.lines:
+            text_y -= cell.line_size * 1.3
+            text.append(f"BT /F2 {cell.line_size:.1f} Tf {cell.x:.2f} {text_y:.2f} Td ".encode()
+                        + _pdf_text(_clip(line, cell.max_chars)) + b" Tj ET")
+        out.append(b"\n".join(text).decode("latin-1"))
+    return zlib.compress("\n".join(out).encode("latin-1"))
+
+
+class _PdfWriter:
+    """Escritor PDF incremental: cada objeto se escribe en cuanto está listo"""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.offsets: Dict[int, int] = {}
+        self.position = 0
+        self.next_id = 1
+
+    def write(self, data: bytes) -> None:
+        self.out.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> int:
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def obj(self, obj_id: int, body: bytes, stream: Optional[bytes] = None) -> None:
+        self.offsets[obj_id] = self.position
+        self.write(f"{obj_id} 0 obj\n".encode() + body)
+        if stream is not None:
+            self.write(b"\nstream\n" + stream + b"\nendstream")
+        self.write(b"\nendobj\n")
+
+    def finish(self, root_id: int) -> None:
+        xref = self.position
+        count = self.next_id
+        self.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        self.write(b"".join(f"{self.offsets[i]:010d} 00000 n \n".encode() for i in range(1, count)))
+        self.write(f"trailer\n<< /Size {count} /Root {root_id} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def write_pdf(labels: Iterable[Label], out: BinaryIO, layout: PageLayout = PAGE_LAYOUTS[DEFAULT_LAYOUT],
+              workers: int = 1) -> int:
+    """Escribe la hoja de etiquetas en PDF página a página; devuelve el número de páginas"""
+    width = layout.width_mm * POINTS_PER_MM
+    height = layout.height_mm * POINTS_PER_MM
+
+    pdf = _PdfWriter(out)
+    pdf.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    catalog_id, pages_id, bold_id, regular_id = (pdf.reserve() for _ in range(4))
+    pdf.obj(catalog_id, f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+    pdf.obj(bold_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+    pdf.obj(regular_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    resources = f"/Resources << /Font << /F1 {bold_id} 0 R /F2 {regular_id} 0 R >> >>"
+    page_ids = []
+    for content in _render_pages(_pdf_page_content, _pages(labels, layout.per_page), (layout,), workers):
+        content_id, page_id = pdf.reserve(), pdf.reserve()
+        pdf.obj(content_id, f"<< /Length {len(content)} /Filter /FlateDecode >>".encode(), content)
+        pdf.obj(page_id, (f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {width:.2f} {height:.2f}] "
+                          f"{resources} /Contents {content_id} 0 R >>").encode())
+        page_ids.append(page_id)
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    pdf.obj(pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+    pdf.finish(catalog_id)
+    return len(page_ids)
+
+
+# --- PNG ---
+
+def _png_page(page: List[Label], layout: PageLayout, dpi: int) -> bytes:
+    """PNG de 1 bit de una página"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    scale = dpi / 25.4
+    cells = _cells(layout, scale)
+    title_font = ImageFont.load_default(size=round(cells[0].title_size))
+    line_font = ImageFont.load_default(size=round(cells[0].line_size))
+
+    img = Image.new("1", (round(layout.width_mm * scale), round(layout.height_mm * scale)), 1)
+    draw = ImageDraw.Draw(img)
+    for label, cell in zip(page, cells):
+        matrix = get_matrix(label.payload, label.settings)
+        # Escalado entero de los módulos para que sigan siendo nítidos
+        box = max(1, int(cell.qr_size // len(matrix)))
+        qr = Image.frombytes("1", (len(matrix), len(matrix)), pack_matrix(matrix, dark_bit=False))
+        qr = qr.resize((len(matrix) * box, len(matrix) * box), Image.NEAREST)
+        offset = (cell.qr_size - qr.width) / 2
+        img.paste(qr, (round(cell.x + offset), round(cell.y + offset)))
+
+        text_y = cell.y + cell.qr_size + cell.title_size * 0.3
+        draw.text((cell.x, text_y), _clip(label.title, int(cell.max_chars / 1.6)), font=title_font, fill=0)
+        text_y += cell.title_size * 1.3
+        for line in label.lines:
+            draw.text((cell.x, text_y), _clip(line, cell.max_chars), font=line_font, fill=0)
+            text_y += cell.line_size * 1.3
+
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", dpi=(dpi, dpi))
+    return buf.getvalue()
+
+
+def iter_png_pages(labels: Iterable[Label], layout: PageLayout = PAGE_LAYOUTS[DEFAULT_LAYOUT],
+                   dpi: int = 200, workers: int = 1) -> Iterator[bytes]:
+    """Genera un PNG de 1 bit por página, uno cada vez"""
+    return _render_pages(_png_page, _pages(labels, layout.per_page), (layout, dpi), workers)
+
+
+def _check_fits(labels: List[Label]) -> None:
+    """Comprueba sin renderizar que cada QR cabe; un fallo dentro de una página cortaría la hoja"""
+    for label in labels:
+        if label.settings is None and qr_stats(label.payload)[0] is None:
+            raise ValidationError(f"Payload does not fit in a single QR code ({len(label.payload.encode('utf-8'))} "
+                                  "bytes). Use --codec b45 or --max-version to split the manifest.")
+
+
+def labels_from_records(records: Iterable, codec: str = DEFAULT_CODEC, max_version: Optional[int] = None,
+                        errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Label]:
+    """Valida los registros en streaming y devuelve sus etiquetas; los errores se añaden a ``errors``
+
+    Las filas ilegibles, las que no son objetos y las que no caben en un QR se
+    omiten antes de llegar al renderizado de páginas.
+    """
+    for row, record in enumerate(records, start=1):
+        data, record_errors = check_row(record)
+        if not record_errors:
+            try:
+                labels = labels_for(data, codec, max_version)
+                _check_fits(labels)
+            except ValidationError as e:
+                record_errors = [str(e)]
+        if record_errors:
+            if errors is not None:
+                errors.extend((row, error) for error in record_errors)
+            continue
+        yield from labels
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Render printable QR label sheets from a CSV/JSONL manifest.")
+    parser.add_argument("manifest", help="CSV or JSONL file with one truck record per row")
+    parser.add_argument("-o", "--output", required=True, help="Output .pdf file, or .zip / directory for PNG pages")
+    parser.add_argument("--page", choices=list(PAGE_LAYOUTS), default=DEFAULT_LAYOUT, help="Page size and grid")
+    parser.add_argument("--format", dest="label_format", choices=LABEL_FORMATS, default=None,
+                        help="pdf or png (default: from the output name)")
+    parser.add_argument("--dpi", type=int, default=200, help="Resolution of PNG pages (default: 200)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--codec", choices=CODECS, default=DEFAULT_CODEC, help="QR payload format (default: json)")
+    parser.add_argument("--max-version", type=int, default=None, choices=range(1, 41), metavar="{1..40}",
+                        help="Split manifests into several QR codes (one label each)")
+    args = parser.parse_args(argv)
+
+    label_format = args.label_format or ("pdf" if args.output.lower().endswith(".pdf") else "png")
+    layout = PAGE_LAYOUTS[args.page]
+    workers = args.workers or os.cpu_count() or 1
+    errors: List[Tuple[int, str]] = []
+    labels = labels_from_records(read_manifest(args.manifest), args.codec, args.max_version, errors)
+
+    if label_format == "pdf":
+        with open(args.output, "wb") as f:
+            pages = write_pdf(labels, f, layout, workers)
+    else:
+        writer = OutputWriter(args.output)
+        pages = 0
+        try:
+            for pages, png in enumerate(iter_png_pages(labels, layout, args.dpi, workers), start=1):
+                writer.write(f"labels_p{pages:04d}.png", png)
+        finally:
+            writer.close()
+
+    for row, error in errors:
+        print(f"Row {row}: {error}", file=sys.stderr)
+    print(f"{pages} pages written to {args.output}, {len({row for row, _ in errors})} rows rejected")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
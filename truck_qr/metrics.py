@@ -0,0 +1,261 @@
+"""Instrumentación opcional del camino de generación de QR
+
+Con ``TRUCK_QR_METRICS=1`` (o ``TRUCK_QR_METRICS_FILE``) se miden las etapas
+de "Generate QR" y ``generate_qr_optimized`` (validación, serialización,
+``qr.make``, codificación PNG/SVG, reruns de Streamlit), junto con la versión
+de QR elegida y los bytes del payload. Todo se agrega en histogramas en
+memoria y se exporta en formato de texto de Prometheus:
+
+    GET /metrics                       en el servicio HTTP (``truck_qr.api``)
+    TRUCK_QR_METRICS_FILE=/ruta.prom   archivo para el textfile collector de
+                                       node_exporter (UI de Streamlit)
+
+Desactivado, ``span`` devuelve un contexto vacío compartido y ``observe``
+retorna de inmediato, así que el coste en el camino caliente es despreciable.
+"""
+
+import atexit
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Variables de entorno
+METRICS_ENV = "TRUCK_QR_METRICS"
+METRICS_FILE_ENV = "TRUCK_QR_METRICS_FILE"
+
+# Nombres de las métricas
+STAGE_SECONDS = "truck_qr_stage_seconds"
+QR_VERSION = "truck_qr_version"
+PAYLOAD_BYTES = "truck_qr_payload_bytes"
+CACHE_REQUESTS = "truck_qr_cache_requests_total"
+POOL_WAIT_SECONDS = "truck_qr_pool_wait_seconds"
+POOL_REJECTED = "truck_qr_pool_rejected_total"
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+VERSION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30, 35, 40)
+BYTES_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Nombre -> (tipo, ayuda, buckets)
+METRICS = {
+    STAGE_SECONDS: ("histogram", "Time spent in each stage of QR generation.", STAGE_BUCKETS),
+    QR_VERSION: ("histogram", "QR symbol version chosen by qr.make(fit=True).", VERSION_BUCKETS),
+    PAYLOAD_BYTES: ("histogram", "Size in bytes of the text embedded in each QR.", BYTES_BUCKETS),
+    CACHE_REQUESTS: ("counter", "Rendered QR cache lookups by result.", None),
+    POOL_WAIT_SECONDS: ("histogram", "Time render jobs wait in the shared pool queue, by tenant.", STAGE_BUCKETS),
+    POOL_REJECTED: ("counter", "Render jobs rejected because the tenant or pool queue was full.", None),
+}
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_NO_SPAN = nullcontext()
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos (semántica ``le`` de Prometheus)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Span:
+    """Mide una etapa con ``perf_counter`` y la registra al salir (también si hay excepción)"""
+
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry: "MetricsRegistry", stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.registry.observe(STAGE_SECONDS, time.perf_counter() - self.start, stage=self.stage)
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Histogramas y contadores en memoria, seguros entre hilos"""
+
+    def __init__(self, enabled: bool = False, textfile: Optional[str] = None, textfile_interval: float = 5.0):
+        self.enabled = enabled
+        self.textfile = textfile
+        self.textfile_interval = textfile_interval
+        self._lock = threading.Lock()
+        self._histograms: Dict[_Key, Histogram] = {}
+        self._counters: Dict[_Key, float] = {}
+        self._local = threading.local()
+        self._last_textfile = 0.0
+
+    # --- Registro ---
+
+    def span(self, stage: str):
+        """Contexto que mide la duración de una etapa"""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, stage)
+
+    def timed(self, stage: str):
+        """Decorador equivalente a envolver la función en ``span(stage)``"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Añade una observación a un histograma"""
+        if not self.enabled:
+            return
+        self._record("h", (name, tuple(sorted(labels.items()))), value)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Incrementa un contador"""
+        if not self.enabled:
+            return
+        self._record("c", (name, tuple(sorted(labels.items()))), amount)
+
+    def _record(self, kind: str, key: _Key, value: float) -> None:
+        captured = getattr(self._local, "captured", None)
+        if captured is not None:
+            captured.append((kind, key, value))
+            return
+        with self._lock:
+            if kind == "c":
+                self._counters[key] = self._counters.get(key, 0) + value
+                return
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[key[0]][2])
+            histogram.observe(value)
+
+    @contextmanager
+    def capture(self) -> Iterator[List[Tuple[str, _Key, float]]]:
+        """Acumula las observaciones del hilo en una lista en lugar de agregarlas
+
+        Se usa en los procesos del pool: la lista se devuelve al proceso
+        principal, que la agrega con ``record_all``.
+        """
+        observations: List[Tuple[str, _Key, float]] = []
+        previous = getattr(self._local, "captured", None)
+        self._local.captured = observations
+        try:
+            yield observations
+        finally:
+            self._local.captured = previous
+
+    def record_all(self, observations: List[Tuple[str, _Key, float]]) -> None:
+        """Agrega observaciones capturadas en otro proceso"""
+        for kind, key, value in observations:
+            self._record(kind, (key[0], tuple(tuple(label) for label in key[1])), value)
+
+    def histogram(self, name: str, **labels: str) -> Tuple[int, float]:
+        """(observaciones, suma) de un histograma; ``(0, 0.0)`` si aún no tiene datos"""
+        with self._lock:
+            histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+            return (histogram.count, histogram.sum) if histogram is not None else (0, 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # --- Exportación ---
+
+    def render(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus (0.0.4)"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_label_text(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _label_text(labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = _label_text(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Optional[str] = None) -> None:
+        """Escribe las métricas de forma atómica (para el textfile collector de node_exporter)"""
+        path = path or self.textfile
+        if not path:
+            return
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        self._last_textfile = time.monotonic()
+
+    def maybe_write_textfile(self) -> None:
+        """Escribe el archivo de métricas como mucho una vez cada ``textfile_interval`` segundos"""
+        if self.enabled and self.textfile and time.monotonic() - self._last_textfile >= self.textfile_interval:
+            self.write_textfile()
+
+
+def _enabled_from_env() -> bool:
+    return os.environ.get(METRICS_ENV, "").lower() in ("1", "true", "yes") or bool(os.environ.get(METRICS_FILE_ENV))
+
+
+# Registro del proceso, configurado por variables de entorno
+registry = MetricsRegistry(enabled=_enabled_from_env(), textfile=os.environ.get(METRICS_FILE_ENV) or None)
+if registry.textfile:
+    # Última escritura al terminar, aunque no haya pasado ``textfile_interval``
+    atexit.register(registry.write_textfile)
+
+
+def span(stage: str):
+    """Atajo de ``registry.span``"""
+    return registry.span(stage)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Atajo de ``registry.observe``"""
+    registry.observe(name, value, **labels)
+
+
+def inc(name: str, amount: float = 1, **labels: str) -> None:
+    """Atajo de ``registry.inc``"""
+    registry.inc(name, amount, **labels)
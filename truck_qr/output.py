@@ -0,0 +1,173 @@
+"""Formatos de salida alternativos al PNG optimizado
+
+Formatos:
+    png       PNG de qrcode con ``optimize=True`` (formato original)
+    png-fast  PNG de 1 bit generado directamente desde la matriz, sin dibujar
+              módulo a módulo ni optimizar la compresión
+    svg       SVG con un único ``<path>`` trazado por filas (tramos fusionados)
+    matrix    Matriz de bits empaquetada para impresoras: 1 byte con el lado
+              en módulos (incluido el borde) y luego cada fila con 8 módulos
+              por byte, MSB primero, rellenada hasta byte completo; 1 = oscuro
+
+Todos parten de ``TruckQRGenerator.build_qr``, por lo que usan la misma
+versión, corrección de errores y borde que el PNG original.
+
+``OutputWriter`` guarda los archivos generados (lotes de QR, páginas de
+etiquetas) en un ZIP o en un directorio.
+"""
+
+import io
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+from truck_qr import metrics
+from truck_qr.generator import TruckQRGenerator
+
+if TYPE_CHECKING:
+    import qrcode
+
+    from truck_qr.policy import RenderSettings
+
+OUTPUT_FORMATS = ("png", "png-fast", "svg", "matrix")
+DEFAULT_FORMAT = "png"
+
+# Extensión y tipo MIME de cada formato
+FORMAT_EXTENSIONS = {"png": "png", "png-fast": "png", "svg": "svg", "matrix": "bin"}
+FORMAT_MIME_TYPES = {
+    "png": "image/png",
+    "png-fast": "image/png",
+    "svg": "image/svg+xml",
+    "matrix": "application/octet-stream",
+}
+
+
+def get_matrix(payload: str, settings: Optional["RenderSettings"] = None) -> List[List[bool]]:
+    """Matriz de módulos (True = oscuro) incluyendo el borde, con la configuración de ``build_qr``"""
+    return TruckQRGenerator.build_qr(payload, settings).get_matrix()
+
+
+def pack_matrix(matrix: List[List[bool]], dark_bit: bool = True) -> bytes:
+    """Empaqueta las filas de la matriz a 8 módulos por byte (MSB primero)"""
+    out = bytearray()
+    for row in matrix:
+        for start in range(0, len(row), 8):
+            byte = 0
+            for cell in row[start:start + 8]:
+                byte = (byte << 1) | (cell == dark_bit)
+            # Rellenar el último byte de la fila
+            byte <<= 8 - len(row[start:start + 8])
+            out.append(byte)
+    return bytes(out)
+
+
+def matrix_to_bytes(matrix: List[List[bool]]) -> bytes:
+    """Serializa la matriz en el formato ``matrix`` (lado + filas empaquetadas)"""
+    return bytes([len(matrix)]) + pack_matrix(matrix)
+
+
+def matrix_from_bytes(data: bytes) -> List[List[bool]]:
+    """Reconstruye la matriz a partir del formato ``matrix``"""
+    size = data[0]
+    row_bytes = (size + 7) // 8
+    if len(data) != 1 + size * row_bytes:
+        raise ValueError("Invalid matrix payload length.")
+    matrix = []
+    for r in range(size):
+        row = data[1 + r * row_bytes:1 + (r + 1) * row_bytes]
+        matrix.append([bool(row[c // 8] & (0x80 >> (c % 8))) for c in range(size)])
+    return matrix
+
+
+def matrix_to_png(matrix: List[List[bool]], box_size: int) -> bytes:
+    """PNG de 1 bit a partir de la matriz, escalado sin interpolación"""
+    from PIL import Image
+
+    size = len(matrix)
+    # En modo "1" de PIL el bit 1 es blanco
+    img = Image.frombytes("1", (size, size), pack_matrix(matrix, dark_bit=False))
+    img = img.resize((size * box_size, size * box_size), Image.NEAREST)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def matrix_to_svg(matrix: List[List[bool]], box_size: int) -> bytes:
+    """SVG escalable con un único path; los módulos contiguos de una fila se fusionan
+
+    Cada tramo es una línea de grosor 1 en el centro de la fila, lo que
+    ocupa bastante menos que un rectángulo cerrado por tramo.
+    """
+    size = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            run = 1
+            while x + run < size and row[x + run]:
+                run += 1
+            path.append(f"M{x} {y}.5h{run}")
+            x += run
+    pixels = size * box_size
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" stroke="#000"/></svg>'
+    )
+    return svg.encode("utf-8")
+
+
+def render_qr(qr: "qrcode.QRCode", output_format: str = DEFAULT_FORMAT) -> bytes:
+    """Renderiza un QR ya construido con ``TruckQRGenerator.build_qr`` en el formato indicado"""
+    if output_format == "png":
+        return TruckQRGenerator.qr_to_png(qr)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+
+    matrix = qr.get_matrix()
+    box_size = TruckQRGenerator.QR_RENDER_CONFIG['box_size']
+    with metrics.span(f"{output_format.replace('-', '_')}_encode"):
+        if output_format == "png-fast":
+            return matrix_to_png(matrix, box_size)
+        if output_format == "svg":
+            return matrix_to_svg(matrix, box_size)
+        return matrix_to_bytes(matrix)
+
+
+def render(payload: str, output_format: str = DEFAULT_FORMAT) -> bytes:
+    """Renderiza un payload ya serializado en el formato indicado"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: '{output_format}'. Use one of: {', '.join(OUTPUT_FORMATS)}.")
+    return render_qr(TruckQRGenerator.build_qr(payload), output_format)
+
+
+class OutputWriter:
+    """Escribe archivos generados (QR, páginas, reportes) en un ZIP o en un directorio"""
+
+    def __init__(self, output: str):
+        self.is_zip = output.lower().endswith(".zip")
+        self.output = output
+        if self.is_zip:
+            import zipfile
+            parent = os.path.dirname(os.path.abspath(output))
+            os.makedirs(parent, exist_ok=True)
+            self._zip = zipfile.ZipFile(output, "w")
+            # Los PNG ya están comprimidos: se almacenan sin recomprimir
+            self._stored, self._deflated = zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, name: str, content: bytes) -> None:
+        if self.is_zip:
+            compression = self._stored if name.endswith(".png") else self._deflated
+            self._zip.writestr(name, content, compress_type=compression)
+        else:
+            with open(os.path.join(self.output, name), "wb") as f:
+                f.write(content)
+
+    def close(self) -> None:
+        if self.is_zip:
+            self._zip.close()
@@ -0,0 +1,281 @@
+"""Selección adaptativa de corrección de errores, versión y modos de codificación
+
+En lugar de usar siempre ``ERROR_CORRECT_M``, ``box_size=8`` y ``border=4``,
+``choose_settings`` elige para cada payload:
+
+1. Los segmentos de codificación (numérico, alfanumérico o byte) con menos
+   bits, mediante programación dinámica sobre los tramos de caracteres: las
+   placas, SKUs y el codec ``b45`` van en modo alfanumérico (5,5 bits por
+   carácter) y las cifras en modo numérico (3,3 bits) aunque estén dentro de
+   un JSON, en vez del modo byte (8 bits).
+2. La menor versión que cabe con el nivel de corrección mínimo (``min_ec``);
+   si no cabe en ``max_version`` se baja el nivel hasta ``L``.
+3. El nivel de corrección más alto que cabe en esa misma versión (mejor
+   lectura sin agrandar el símbolo).
+4. El ``box_size`` que respeta ``max_pixels``, si se indica.
+
+Uso:
+    python -m truck_qr.policy payload.json --codec b45 --max-version 15 --max-pixels 400
+"""
+
+import argparse
+import json
+import sys
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import qrcode
+import qrcode.util
+
+from truck_qr.codec import CODECS, DEFAULT_CODEC, encode_payload, qr_stats
+from truck_qr.generator import TruckQRGenerator, ValidationError
+
+# Niveles de menor a mayor redundancia
+EC_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+EC_ORDER = list(EC_LEVELS)
+
+MODE_NAMES = {
+    qrcode.util.MODE_NUMBER: "numeric",
+    qrcode.util.MODE_ALPHA_NUM: "alphanumeric",
+    qrcode.util.MODE_8BIT_BYTE: "byte",
+}
+
+_MODES = (qrcode.util.MODE_NUMBER, qrcode.util.MODE_ALPHA_NUM, qrcode.util.MODE_8BIT_BYTE)
+# Coste por carácter (byte en modo byte) en sextos de bit: 10/3, 11/2 y 8 bits
+_UNIT_COST = (20, 33, 48)
+_ALNUM_ONLY = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+# Clases de carácter: 0 = dígito, 1 = alfanumérico no dígito, 2 = resto
+_ALLOWED_MODES = ((0, 1, 2), (1, 2), (2,))
+# Rangos de versión que comparten el tamaño del contador de caracteres
+_VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+
+
+class QRPolicy(NamedTuple):
+    """Objetivos de la política; ``None`` significa sin límite"""
+    max_version: Optional[int] = None
+    max_pixels: Optional[int] = None
+    min_ec: str = "M"
+    boost_ec: bool = True
+    box_size: int = TruckQRGenerator.QR_RENDER_CONFIG['box_size']
+    min_box_size: int = 2
+    border: int = TruckQRGenerator.QR_RENDER_CONFIG['border']
+
+
+class RenderSettings(NamedTuple):
+    """Configuración elegida para un payload"""
+    ec_level: str
+    error_correction: int
+    version: int
+    box_size: int
+    border: int
+    segments: Tuple[Tuple[int, str], ...]
+    data_bits: int
+    capacity_bits: int
+
+    @property
+    def modules(self) -> int:
+        return self.version * 4 + 17
+
+    @property
+    def pixels(self) -> int:
+        return (self.modules + 2 * self.border) * self.box_size
+
+    def segment_summary(self) -> Dict[str, int]:
+        """Caracteres codificados en cada modo"""
+        summary: Dict[str, int] = {}
+        for mode, text in self.segments:
+            summary[MODE_NAMES[mode]] = summary.get(MODE_NAMES[mode], 0) + len(text)
+        return summary
+
+    def describe(self) -> str:
+        modes = ", ".join(f"{name} {count}" for name, count in self.segment_summary().items())
+        return (f"EC {self.ec_level} · version {self.version} ({self.modules}x{self.modules} modules) · "
+                f"{self.pixels}px · {len(self.segments)} segments ({modes})")
+
+
+def _char_class(ch: str) -> int:
+    if "0" <= ch <= "9":
+        return 0
+    if ch in _ALNUM_ONLY:
+        return 1
+    return 2
+
+
+def _runs(text: str) -> List[Tuple[int, str]]:
+    """Divide el texto en tramos de caracteres de la misma clase"""
+    runs = []
+    start = 0
+    current = None
+    for i, ch in enumerate(text):
+        cls = _char_class(ch)
+        if cls != current:
+            if current is not None:
+                runs.append((current, text[start:i]))
+            current, start = cls, i
+    if current is not None:
+        runs.append((current, text[start:]))
+    return runs
+
+
+def _data_bits(mode: int, text: str) -> int:
+    if mode == qrcode.util.MODE_NUMBER:
+        n = len(text)
+        return 10 * (n // 3) + (0, 4, 7)[n % 3]
+    if mode == qrcode.util.MODE_ALPHA_NUM:
+        n = len(text)
+        return 11 * (n // 2) + 6 * (n % 2)
+    return 8 * len(text.encode("utf-8"))
+
+
+def optimal_segments(text: str, version: int) -> Tuple[Tuple[int, str], ...]:
+    """Segmentación con menos bits para los contadores de la versión indicada"""
+    runs = _runs(text)
+    if not runs:
+        return ((qrcode.util.MODE_8BIT_BYTE, ""),)
+
+    mode_sizes = qrcode.util.mode_sizes_for_version(version)
+    # Cabecera de segmento (modo + contador) en sextos de bit
+    head = [(4 + mode_sizes[mode]) * 6 for mode in _MODES]
+    infinity = float("inf")
+
+    previous = None
+    back: List[List[Optional[int]]] = []
+    for cls, run in runs:
+        units = len(run.encode("utf-8")) if cls == 2 else len(run)
+        current = [infinity] * 3
+        origin: List[Optional[int]] = [None] * 3
+        for m in _ALLOWED_MODES[cls]:
+            run_cost = (units if m == 2 else len(run)) * _UNIT_COST[m]
+            if previous is None:
+                current[m] = head[m] + run_cost
+                continue
+            for f in range(3):
+                if previous[f] == infinity:
+                    continue
+                # Cambiar de modo obliga a redondear el segmento anterior a bits enteros
+                cost = previous[f] if f == m else -(-previous[f] // 6) * 6 + head[m]
+                if cost + run_cost < current[m]:
+                    current[m] = cost + run_cost
+                    origin[m] = f
+        back.append(origin)
+        previous = current
+
+    # Reconstruir los modos elegidos de atrás hacia delante
+    mode = min(range(3), key=lambda m: previous[m])
+    chosen = []
+    for origin in reversed(back):
+        chosen.append(mode)
+        if origin[mode] is not None:
+            mode = origin[mode]
+    chosen.reverse()
+
+    segments: List[Tuple[int, str]] = []
+    for (cls, run), m in zip(runs, chosen):
+        if segments and segments[-1][0] == _MODES[m]:
+            segments[-1] = (_MODES[m], segments[-1][1] + run)
+        else:
+            segments.append((_MODES[m], run))
+    return tuple(segments)
+
+
+def _segments_bits(segments: Tuple[Tuple[int, str], ...], version: int) -> int:
+    mode_sizes = qrcode.util.mode_sizes_for_version(version)
+    return sum(4 + mode_sizes[mode] + _data_bits(mode, text) for mode, text in segments)
+
+
+def _smallest_version(text: str, error_correction: int,
+                      max_version: int) -> Optional[Tuple[int, Tuple[Tuple[int, str], ...], int]]:
+    """Menor versión (con sus segmentos y bits) que cabe, o ``None``"""
+    limits = qrcode.util.BIT_LIMIT_TABLE[error_correction]
+    for first, last in _VERSION_CLASSES:
+        if first > max_version:
+            break
+        segments = optimal_segments(text, first)
+        bits = _segments_bits(segments, first)
+        for version in range(first, min(last, max_version) + 1):
+            if limits[version] >= bits:
+                return version, segments, bits
+    return None
+
+
+@lru_cache(maxsize=256)
+def choose_settings(payload: str, policy: QRPolicy = QRPolicy()) -> RenderSettings:
+    """Elige corrección, versión, segmentos y tamaño de módulo para un payload"""
+    max_version = min(policy.max_version or 40, 40)
+    if policy.max_pixels:
+        # Mayor versión cuyo símbolo cabe en max_pixels con el módulo mínimo
+        max_modules = policy.max_pixels // policy.min_box_size - 2 * policy.border
+        max_version = min(max_version, (max_modules - 17) // 4)
+    if max_version < 1:
+        raise ValidationError(f"No QR version fits in {policy.max_pixels} pixels.")
+
+    # Menor versión con el nivel mínimo; si no cabe se baja el nivel
+    floor = EC_ORDER.index(policy.min_ec)
+    found = None
+    for level in reversed(EC_ORDER[:floor + 1]):
+        found = _smallest_version(payload, EC_LEVELS[level], max_version)
+        if found is not None:
+            break
+    if found is None:
+        raise ValidationError(f"Payload does not fit in a QR code of version {max_version} or lower.")
+    version, segments, bits = found
+
+    # Subir el nivel mientras quepa en la misma versión
+    if policy.boost_ec:
+        for candidate in EC_ORDER[EC_ORDER.index(level) + 1:]:
+            if qrcode.util.BIT_LIMIT_TABLE[EC_LEVELS[candidate]][version] >= bits:
+                level = candidate
+
+    box_size = policy.box_size
+    if policy.max_pixels:
+        box_size = max(policy.min_box_size, min(box_size, policy.max_pixels // (version * 4 + 17 + 2 * policy.border)))
+
+    return RenderSettings(
+        ec_level=level,
+        error_correction=EC_LEVELS[level],
+        version=version,
+        box_size=box_size,
+        border=policy.border,
+        segments=segments,
+        data_bits=bits,
+        capacity_bits=qrcode.util.BIT_LIMIT_TABLE[EC_LEVELS[level]][version],
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compara la configuración fija con la elegida por la política para un payload JSON"""
+    parser = argparse.ArgumentParser(description="Show the adaptive QR settings chosen for a payload.")
+    parser.add_argument("payload", help="JSON file with the QR data")
+    parser.add_argument("--codec", choices=CODECS, default=DEFAULT_CODEC)
+    parser.add_argument("--max-version", type=int, default=None, choices=range(1, 41), metavar="{1..40}")
+    parser.add_argument("--max-pixels", type=int, default=None, help="Maximum image side in pixels")
+    parser.add_argument("--min-ec", choices=EC_ORDER, default="M", help="Lowest preferred error correction")
+    args = parser.parse_args(argv)
+
+    with open(args.payload, encoding="utf-8") as f:
+        data = json.load(f)
+    text = encode_payload(data, args.codec)
+
+    config = TruckQRGenerator.QR_RENDER_CONFIG
+    version, modules = qr_stats(text, config['error_correction'])
+    if version is None:
+        print("fixed:    does not fit in a single QR code")
+    else:
+        print(f"fixed:    EC M · version {version} ({modules}x{modules} modules) · "
+              f"{(modules + 2 * config['border']) * config['box_size']}px")
+    try:
+        settings = choose_settings(text, QRPolicy(args.max_version, args.max_pixels, args.min_ec))
+    except ValidationError as e:
+        print(f"adaptive: {e}")
+        return 1
+    print(f"adaptive: {settings.describe()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+"""Pool de renderizado compartido por las sesiones, con reparto justo por tenant
+
+Cuando varias plantas (tenants) usan el mismo despliegue, cada sesión de
+Streamlit renderizaba el QR dentro de su propia ejecución del script y una
+ráfaga en una planta acaparaba la CPU del servidor. ``RenderPool`` reúne todos
+los trabajos en una cola local acotada y los ejecuta en un número fijo de
+procesos:
+
+- cada tenant tiene su propia cola; un hilo despachador las atiende por
+  turnos (round-robin), un trabajo por turno, así que una planta con muchos
+  trabajos en cola no retrasa a las demás más de un trabajo por worker;
+- cuotas por tenant (``TenantQuota``): trabajos en cola y workers ocupados a
+  la vez;
+- contrapresión: si la cola del tenant (o la global) está llena, ``submit``
+  lanza ``PoolBusy`` de inmediato en lugar de acumular trabajo que el usuario
+  ya habrá abandonado; si ``run`` agota su espera lanza ``RenderTimeout``;
+- la cola de un tenant se elimina en cuanto queda vacía, así que
+  ``MAX_TENANTS`` limita los tenants con trabajo pendiente, no los vistos.
+
+Solo se envían al pool tantos trabajos como workers libres, de modo que el
+orden lo decide siempre el despachador y no la cola FIFO del executor.
+
+Configuración por variables de entorno (UI de Streamlit):
+    TRUCK_QR_RENDER_WORKERS   procesos del pool (sin ella se renderiza en la sesión, como antes)
+    TRUCK_QR_TENANT_QUEUE     trabajos en cola por tenant (por defecto 16)
+    TRUCK_QR_TENANT_QUOTAS    cuotas por tenant: ``yard-a=32:2,yard-b=8:1`` (cola[:workers])
+    TRUCK_QR_TENANT_HEADER    cabecera HTTP con el tenant, fijada por el proxy inverso
+                              (p. ej. ``X-Yard``); sin ella todas las sesiones son ``default``
+
+El tenant nunca sale de la URL: un parámetro que elige el usuario permitiría
+saltarse la cuota de su planta.
+Prueba de carga: ``python benchmarks/load_pool.py``.
+"""
+
+import atexit
+import base64
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from truck_qr import metrics
+from truck_qr.cache import QRCache, default_cache
+from truck_qr.generator import TruckQRGenerator, ValidationError
+from truck_qr.split import DEFAULT_MAX_VERSION, generate_qr_chunks, join_chunks
+
+if TYPE_CHECKING:
+    from truck_qr.policy import RenderSettings
+
+# Variables de entorno
+RENDER_WORKERS_ENV = "TRUCK_QR_RENDER_WORKERS"
+TENANT_QUEUE_ENV = "TRUCK_QR_TENANT_QUEUE"
+TENANT_QUOTAS_ENV = "TRUCK_QR_TENANT_QUOTAS"
+TENANT_HEADER_ENV = "TRUCK_QR_TENANT_HEADER"
+
+DEFAULT_TENANT = "default"
+# Tenants con trabajos en cola a la vez; el resto comparte la cola de DEFAULT_TENANT
+MAX_TENANTS = 64
+_TENANT_PATTERN = re.compile(r'[^a-z0-9_-]')
+
+
+class PoolBusy(Exception):
+    """La cola del tenant (o la global) está llena; se puede reintentar más tarde"""
+    pass
+
+
+class RenderTimeout(PoolBusy):
+    """El trabajo no terminó dentro del tiempo de espera de ``RenderPool.run``"""
+    pass
+
+
+class TenantQuota(NamedTuple):
+    """Límites de un tenant; ``max_running=None`` permite usar todos los workers"""
+    max_pending: int = 16
+    max_running: Optional[int] = None
+
+
+class RenderResult(NamedTuple):
+    """QR generados para un registro (varios si se dividió el manifiesto)"""
+    images: List[str]
+    payload: str
+    settings: Optional["RenderSettings"]
+
+
+def render_record(data_dict: Dict, codec: str = "json", split: bool = False, adaptive: bool = False,
+                  max_version: int = DEFAULT_MAX_VERSION, cache: Optional[QRCache] = default_cache) -> RenderResult:
+    """Genera el QR (o varios si se divide el manifiesto) con las opciones del formulario
+
+    Es el trabajo que ejecuta la UI, en la propia sesión o en un proceso del
+    ``RenderPool``; en ese caso ``cache`` es la caché del proceso del pool
+    (con ``TRUCK_QR_CACHE_DIR`` el nivel en disco se comparte entre todos).
+    """
+    if adaptive:
+        from truck_qr.policy import QRPolicy
+        # Con división, primero se intenta un solo código dentro de la versión máxima
+        policy = QRPolicy(max_version=max_version if split else None)
+        try:
+            png_bytes, payload, settings = TruckQRGenerator.generate_qr_adaptive(data_dict, codec, policy, cache=cache)
+            return RenderResult([_b64(png_bytes)], payload, settings)
+        except ValidationError:
+            if not split:
+                raise
+    if split:
+        parts = generate_qr_chunks(data_dict, codec, max_version, cache=cache)
+        return RenderResult([_b64(png_bytes) for png_bytes, _ in parts], join_chunks(text for _, text in parts), None)
+    base64_qr, payload = TruckQRGenerator.generate_qr_optimized(data_dict, codec, cache=cache)
+    return RenderResult([base64_qr], payload, None)
+
+
+def _b64(png_bytes: bytes) -> str:
+    return base64.b64encode(png_bytes).decode()
+
+
+def tenant_name(value: Optional[str]) -> str:
+    """Normaliza el identificador de tenant (minúsculas, ``[a-z0-9_-]``, 32 caracteres)"""
+    name = _TENANT_PATTERN.sub("", (value or "").strip().lower())[:32]
+    return name or DEFAULT_TENANT
+
+
+def tenant_from_headers(headers: Mapping[str, str]) -> str:
+    """Tenant de una petición según la cabecera configurada en ``TRUCK_QR_TENANT_HEADER``
+
+    La cabecera debe fijarla el proxy inverso (sobrescribiendo la del
+    cliente); sin la variable se usa siempre ``DEFAULT_TENANT``.
+    """
+    header = os.environ.get(TENANT_HEADER_ENV, "").strip()
+    if not header:
+        return DEFAULT_TENANT
+    return tenant_name(headers.get(header))
+
+
+def parse_quotas(text: str) -> Dict[str, TenantQuota]:
+    """Interpreta ``yard-a=32:2,yard-b=8`` como cuotas por tenant"""
+    quotas = {}
+    for entry in text.split(","):
+        if not entry.strip():
+            continue
+        name, _, limits = entry.partition("=")
+        pending, _, running = limits.partition(":")
+        try:
+            quota = TenantQuota(int(pending), int(running) if running.strip() else None)
+        except ValueError:
+            quota = None
+        if quota is None or quota.max_pending < 1 or (quota.max_running is not None and quota.max_running < 1):
+            raise ValueError(f"Invalid tenant quota: '{entry.strip()}'. Use name=max_pending[:max_running].")
+        quotas[tenant_name(name)] = quota
+    return quotas
+
+
+def _call(func: Callable, args: Tuple, kwargs: Dict) -> Tuple[object, List]:
+    """Ejecuta el trabajo en el proceso del pool y devuelve el resultado y las métricas capturadas"""
+    with metrics.registry.capture() as observations:
+        result = func(*args, **kwargs)
+    return result, observations
+
+
+def _warm_worker() -> None:
+    """Carga qrcode y PIL al arrancar cada worker, no con el primer QR"""
+    import qrcode.image.pil  # noqa: F401
+    import truck_qr.policy  # noqa: F401
+
+
+class _Job:
+    __slots__ = ("tenant", "func", "args", "kwargs", "future", "queued_at")
+
+    def __init__(self, tenant: str, func: Callable, args: Tuple, kwargs: Dict):
+        self.tenant = tenant
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future: futures.Future = futures.Future()
+        self.queued_at = time.monotonic()
+
+
+class RenderPool:
+    """Workers de renderizado compartidos con colas por tenant y despacho por turnos"""
+
+    def __init__(self, workers: int, quota: TenantQuota = TenantQuota(),
+                 quotas: Optional[Dict[str, TenantQuota]] = None, max_queue: int = 256):
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers
+        self.quota = quota
+        self.quotas = {tenant_name(name): q for name, q in (quotas or {}).items()}
+        self.max_queue = max_queue
+        self._executor_class = ProcessPoolExecutor
+        self._executor = self._new_executor()
+
+        self._condition = threading.Condition()
+        self._queues: Dict[str, Deque[_Job]] = {}
+        # Tenants con trabajos en cola, en el orden en que les toca
+        self._turns: Deque[str] = deque()
+        self._running: Dict[str, int] = {}
+        self._queued = 0
+        self._busy = 0
+        self._closed = False
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        self._thread = threading.Thread(target=self._dispatch_forever, name="render-pool", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> Optional["RenderPool"]:
+        """Pool configurado por variables de entorno, o ``None`` si no se pide"""
+        workers = int(os.environ.get(RENDER_WORKERS_ENV) or 0)
+        if workers < 1:
+            return None
+        quota = TenantQuota(max_pending=int(os.environ.get(TENANT_QUEUE_ENV) or TenantQuota().max_pending))
+        return cls(workers, quota, parse_quotas(os.environ.get(TENANT_QUOTAS_ENV, "")))
+
+    def _new_executor(self):
+        return self._executor_class(max_workers=self.workers, initializer=_warm_worker)
+
+    def quota_for(self, tenant: str) -> TenantQuota:
+        return self.quotas.get(tenant, self.quota)
+
+    # --- API síncrona (cualquier hilo) ---
+
+    def submit(self, tenant: Optional[str], func: Callable, *args, **kwargs) -> futures.Future:
+        """Encola ``func(*args, **kwargs)`` para un tenant sin bloquear
+
+        ``func`` y sus argumentos deben poder serializarse con pickle.
+        Lanza ``PoolBusy`` si la cola del tenant o la global está llena.
+        """
+        tenant = tenant_name(tenant)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Render pool is closed.")
+            if tenant not in self._queues and len(self._queues) >= MAX_TENANTS:
+                tenant = DEFAULT_TENANT
+            queue = self._queues.setdefault(tenant, deque())
+            stats = self._tenant_stats(tenant)
+            if len(queue) >= self.quota_for(tenant).max_pending or self._queued >= self.max_queue:
+                stats["rejected"] += 1
+                metrics.inc(metrics.POOL_REJECTED, tenant=tenant)
+                raise PoolBusy("The QR render queue is full right now. Try again in a few seconds.")
+            job = _Job(tenant, func, args, kwargs)
+            if not queue:
+                self._turns.append(tenant)
+            queue.append(job)
+            self._queued += 1
+            stats["submitted"] += 1
+            self._condition.notify_all()
+        return job.future
+
+    def run(self, tenant: Optional[str], func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """Como ``submit`` pero espera el resultado; si vence ``timeout`` cancela el trabajo en cola"""
+        future = self.submit(tenant, func, *args, **kwargs)
+        try:
+            return future.result(timeout)
+        except futures.TimeoutError:
+            future.cancel()
+            raise RenderTimeout(f"The QR code was not rendered within {timeout:g} seconds. "
+                                "Try again in a few seconds.") from None
+
+    def stats(self) -> Dict:
+        """Trabajos en cola y en curso, y contadores por tenant"""
+        with self._condition:
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "running": self._busy,
+                "tenants": {
+                    tenant: dict(stats, queued=len(self._queues.get(tenant, ())), running=self._running.get(tenant, 0))
+                    for tenant, stats in self._stats.items()
+                },
+            }
+
+    def close(self, cancel_pending: bool = True) -> None:
+        """Detiene el despachador y los workers; lo que siga en cola se cancela o, si no, se termina"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            if cancel_pending:
+                for queue in self._queues.values():
+                    for job in queue:
+                        job.future.cancel()
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+        atexit.unregister(self.close)
+
+    def __enter__(self) -> "RenderPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- Despacho ---
+
+    def _tenant_stats(self, tenant: str) -> Dict[str, int]:
+        stats = self._stats.get(tenant)
+        if stats is None:
+            stats = self._stats[tenant] = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                                           "cancelled": 0}
+        return stats
+
+    def _next_job(self) -> Optional[_Job]:
+        """Siguiente trabajo por turnos entre los tenants que no superan su cuota de workers"""
+        for _ in range(len(self._turns)):
+            tenant = self._turns.popleft()
+            queue = self._queues[tenant]
+            max_running = self.quota_for(tenant).max_running
+            if max_running is not None and self._running.get(tenant, 0) >= max_running:
+                self._turns.append(tenant)
+                continue
+            job = queue.popleft()
+            if queue:
+                self._turns.append(tenant)
+            else:
+                # Sin trabajos pendientes la cola se libera para otros tenants
+                del self._queues[tenant]
+            self._queued -= 1
+            return job
+        return None
+
+    def _dispatch_forever(self) -> None:
+        while True:
+            with self._condition:
+                job = None
+                while job is None:
+                    if self._closed and not self._queued:
+                        return
+                    if self._busy < self.workers:
+                        job = self._next_job()
+                    if job is None:
+                        self._condition.wait()
+                if not job.future.set_running_or_notify_cancel():
+                    self._stats[job.tenant]["cancelled"] += 1
+                    continue
+                self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+                self._busy += 1
+            metrics.observe(metrics.POOL_WAIT_SECONDS, time.monotonic() - job.queued_at, tenant=job.tenant)
+            self._start(job)
+
+    def _start(self, job: _Job) -> None:
+        for attempt in (1, 2):
+            try:
+                inner = self._executor.submit(_call, job.func, job.args, job.kwargs)
+            except futures.BrokenExecutor:
+                # Un worker murió (p. ej. por memoria): se recrea el pool y se reintenta una vez
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                if attempt == 1:
+                    continue
+                self._finished(job, None, futures.BrokenExecutor("Render workers are unavailable."))
+                return
+            except Exception as e:
+                self._finished(job, None, e)
+                return
+            inner.add_done_callback(lambda done, job=job: self._done(job, done))
+            return
+
+    def _done(self, job: _Job, inner: futures.Future) -> None:
+        try:
+            result, observations = inner.result()
+        except BaseException as e:
+            self._finished(job, None, e)
+            return
+        # Las etapas medidas en el worker se agregan en este proceso
+        metrics.registry.record_all(observations)
+        self._finished(job, result, None)
+
+    def _finished(self, job: _Job, result, error: Optional[BaseException]) -> None:
+        with self._condition:
+            self._running[job.tenant] -= 1
+            if not self._running[job.tenant]:
+                del self._running[job.tenant]
+            self._busy -= 1
+            self._stats[job.tenant]["failed" if error is not None else "completed"] += 1
+            self._condition.notify_all()
+        if error is not None:
+            job.future.set_exception(error)
+        else:
+            job.future.set_result(result)
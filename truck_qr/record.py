@@ -0,0 +1,218 @@
+"""Validación de un registro de camión completo en una sola pasada
+
+``validate_record`` normaliza cada campo una sola vez (strip/upper/title),
+usa únicamente los patrones precompilados de ``TruckQRGenerator`` y devuelve
+el ``TruckRecord`` normalizado junto con todos los errores. Lo comparten el
+formulario de Streamlit, el procesamiento por lotes y la API HTTP.
+
+Campos de entrada (mismos nombres que el payload del QR):
+    plate, driverName, customer_id, truckType, company, deliveryOrderRef
+    date_time_at_gate (ISO) o date + hour + minute + ampm
+    items ("SKU:Quantity, ...") o item_list (lista de dicts)
+
+Con ``validated`` (p. ej. los campos de una plantilla de ``truck_qr.templates``)
+los campos cuyo valor normalizado coincide no se vuelven a validar.
+"""
+
+from datetime import date, datetime
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from truck_qr.generator import TruckQRGenerator
+
+# Mensajes de error (los mismos que mostraba el formulario)
+PLATE_ERROR = "Invalid plate number format. Use 3-10 characters with letters, numbers, and hyphens only."
+DRIVER_NAME_ERROR = "Invalid driver name. Use 2-50 characters with letters, spaces, dots, hyphens, and apostrophes only."
+CUSTOMER_ID_ERROR = "Invalid customer ID format. Use 3-20 characters with letters, numbers, hyphens, and underscores only."
+COMPANY_ERROR = "Company name must be between 2 and 100 characters."
+DELIVERY_REF_ERROR = "Invalid delivery reference format. Use 3-30 characters with letters, numbers, hyphens, and underscores only."
+ITEM_LIST_ERROR = "Invalid item list. Each item must be an object with item_id and quantity."
+
+
+class TruckRecord(NamedTuple):
+    """Registro de camión ya validado y normalizado (inmutable, sin ``__dict__``)"""
+    plate: str
+    driver_name: str
+    customer_id: str
+    date_time_at_gate: str
+    item_list: List[Dict]
+    truck_type: str = ""
+    company: str = ""
+    delivery_ref: str = ""
+
+    def to_payload(self) -> Dict:
+        """Datos para el QR (SIN METADATA ADICIONAL), con los opcionales solo si tienen valor"""
+        data = {
+            "plate": self.plate,
+            "driverName": self.driver_name,
+            "customer_id": self.customer_id,
+            "date_time_at_gate": self.date_time_at_gate,
+            "item_list": self.item_list
+        }
+        if self.truck_type:
+            data["truckType"] = self.truck_type
+        if self.company:
+            data["company"] = self.company
+        if self.delivery_ref:
+            data["deliveryOrderRef"] = self.delivery_ref
+        return data
+
+
+def _text(fields: Mapping, *names: str) -> str:
+    """Devuelve el primer campo presente como texto"""
+    for name in names:
+        value = fields.get(name)
+        if value is not None:
+            return str(value)
+    return ""
+
+
+def _parse_date(value) -> Optional[date]:
+    """Acepta un ``date`` o texto ISO (YYYY-MM-DD) / DD/MM/YYYY"""
+    if isinstance(value, date):
+        return value
+    value = str(value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_iso(value: str) -> Optional[datetime]:
+    """Fecha/hora ISO como hora local sin zona; con zona horaria se convierte primero a la local"""
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def datetime_parts(fields: Mapping) -> Tuple[Optional[date], str, str, str]:
+    """Extrae fecha, hora, minuto y AM/PM tal como los recibe ``validate_datetime``"""
+    dt_raw = _text(fields, "date_time_at_gate").strip()
+    if dt_raw:
+        dt = _parse_iso(dt_raw)
+        if dt is None:
+            return None, "", "", ""
+        return dt.date(), dt.strftime("%I"), dt.strftime("%M"), dt.strftime("%p")
+
+    hour = _text(fields, "hour").strip()
+    minute = _text(fields, "minute").strip()
+    return (
+        _parse_date(fields.get("date")),
+        hour.zfill(2) if hour else "",
+        minute.zfill(2) if minute else "",
+        _text(fields, "ampm").strip().upper() or "AM",
+    )
+
+
+def _gate_datetime(fields: Mapping, errors: List[str]) -> Optional[str]:
+    """Valida la fecha/hora de llegada y devuelve el texto ISO para Boomi
+
+    Un ``date_time_at_gate`` ISO se valida directamente, sin el paso por
+    hora/minuto en texto que necesita ``validate_datetime`` (mismo resultado).
+    """
+    dt_raw = _text(fields, "date_time_at_gate").strip()
+    if dt_raw:
+        gate = _parse_iso(dt_raw)
+        if gate is None:
+            errors.append(f"Invalid date_time_at_gate: '{dt_raw}'. Use ISO format YYYY-MM-DDTHH:MM:SS.")
+            return None
+        # Como en el formulario, solo cuentan horas y minutos
+        gate = gate.replace(second=0, microsecond=0)
+        if gate > datetime.now():
+            errors.append("Date and time cannot be in the future.")
+            return None
+        return gate.strftime(TruckQRGenerator.BOOMI_CONFIG['date_format'])
+
+    is_valid, dt_iso, datetime_errors = TruckQRGenerator.validate_datetime(*datetime_parts(fields))
+    if not is_valid:
+        errors.extend(datetime_errors)
+    return dt_iso
+
+
+def items_raw(fields: Mapping) -> str:
+    """Normaliza la lista de items al formato 'SKU:Quantity' separado por comas
+
+    Los elementos de ``item_list`` que no son diccionarios se omiten;
+    ``validate_record`` los informa con ``ITEM_LIST_ERROR``.
+    """
+    item_list = fields.get("item_list")
+    if isinstance(item_list, list):
+        return ", ".join(f"{item.get('item_id', '')}:{item.get('quantity', '')}"
+                         for item in item_list if isinstance(item, dict))
+    return _text(fields, "items", "item_list")
+
+
+def validate_record(fields: Mapping,
+                    validated: Optional[Mapping[str, str]] = None) -> Tuple[Optional[TruckRecord], List[str]]:
+    """Valida y normaliza un registro completo; devuelve (registro, errores)
+
+    ``validated`` son valores ya normalizados y validados (nombres del
+    payload); solo se revalidan los campos que difieren de ellos.
+    """
+    g = TruckQRGenerator
+    errors = []
+    known = validated or {}
+
+    # Cada campo se normaliza una sola vez
+    plate = _text(fields, "plate").strip().upper()
+    if plate != known.get("plate") and not g.PLATE_PATTERN.match(plate):
+        errors.append(PLATE_ERROR)
+
+    driver_name = _text(fields, "driverName", "driver").strip()
+    if driver_name.title() != known.get("driverName") and not g.DRIVER_NAME_PATTERN.match(driver_name):
+        errors.append(DRIVER_NAME_ERROR)
+
+    customer_id = _text(fields, "customer_id").strip().upper()
+    if customer_id != known.get("customer_id") and not g.CUSTOMER_ID_PATTERN.match(customer_id):
+        errors.append(CUSTOMER_ID_ERROR)
+
+    # Opcionales: vacío es válido, pero solo espacios no lo es
+    company_raw = _text(fields, "company")
+    company = company_raw.strip()
+    if company_raw and company != known.get("company") and not 2 <= len(company) <= 100:
+        errors.append(COMPANY_ERROR)
+
+    delivery_ref_raw = _text(fields, "deliveryOrderRef", "delivery_ref")
+    delivery_ref = delivery_ref_raw.strip().upper()
+    if delivery_ref_raw and not g.DELIVERY_REF_PATTERN.match(delivery_ref):
+        errors.append(DELIVERY_REF_ERROR)
+
+    truck_type = _text(fields, "truckType", "truck_type").strip()
+    if truck_type and truck_type != known.get("truckType") and truck_type not in g.BOOMI_CONFIG['truck_types']:
+        errors.append(f"Invalid truck type: '{truck_type}'.")
+
+    dt_iso = _gate_datetime(fields, errors)
+
+    raw_list = fields.get("item_list")
+    if isinstance(raw_list, list) and not all(isinstance(item, dict) for item in raw_list):
+        errors.append(ITEM_LIST_ERROR)
+    is_valid_items, item_list, item_errors = g.validate_items(items_raw(fields))
+    if not is_valid_items:
+        errors.extend(item_errors)
+
+    if errors:
+        return None, errors
+
+    return TruckRecord(
+        plate=plate,
+        driver_name=driver_name.title(),
+        customer_id=customer_id,
+        date_time_at_gate=dt_iso,
+        item_list=item_list,
+        truck_type=truck_type,
+        company=company,
+        delivery_ref=delivery_ref,
+    ), []
+
+
+def build_payload(fields: Mapping) -> Tuple[Optional[Dict], List[str]]:
+    """Valida un registro y devuelve directamente los datos para el QR"""
+    record, errors = validate_record(fields)
+    if errors:
+        return None, errors
+    return record.to_payload(), []
@@ -0,0 +1,315 @@
+"""Firma compacta de los payloads y detección de QR alterados
+
+El JSON del QR es texto plano: cualquiera puede imprimir un código con otras
+cantidades en ``item_list``. Con una clave configurada, cada QR lleva en el
+campo ``sig`` una firma sobre la serialización canónica de los datos:
+
+    JSON UTF-8 sin espacios, con las claves ordenadas, sin ``sig`` ni campos vacíos
+
+La serialización no depende del codec (``json``, ``min``, ``short`` y ``b45``
+firman y verifican lo mismo) y cualquier sistema la puede reproducir. ``sig``
+tiene la forma ``<id de clave>.<firma en base64url>``; en ``b45`` se guarda en
+binario. La firma es determinista: el mismo registro y la misma clave dan el
+mismo QR (y el mismo acierto en la caché).
+
+Algoritmos:
+    hmac      HMAC-SHA256 truncado a 128 bits (22 caracteres), biblioteca estándar
+    ed25519   firma de 64 bytes (86 caracteres) que se verifica solo con la clave
+              pública; requiere el paquete ``cryptography``
+
+Configuración por variables de entorno (UI, API y check-in en puerta):
+    TRUCK_QR_SIGNING_KEY         clave de firma ``id:algoritmo:secreto en base64``
+    TRUCK_QR_VERIFY_KEYS         claves de verificación separadas por comas, mismo
+                                 formato (para ed25519, la clave pública); por
+                                 defecto se verifica con la clave de firma
+    TRUCK_QR_REQUIRE_SIGNATURE   con claves de verificación los QR sin firma se
+                                 rechazan; 0 los acepta durante la migración y
+                                 1 los rechaza aunque no haya claves
+
+Uso:
+    python -m truck_qr.signing keygen --algorithm hmac --key-id k1
+    python -m truck_qr.signing verify < lecturas.txt
+"""
+
+import argparse
+import hmac
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+from truck_qr.codec import b64url_decode, b64url_encode, clean_payload, decode_payload
+from truck_qr.generator import ValidationError
+
+# Variables de entorno
+SIGNING_KEY_ENV = "TRUCK_QR_SIGNING_KEY"
+VERIFY_KEYS_ENV = "TRUCK_QR_VERIFY_KEYS"
+REQUIRE_SIGNATURE_ENV = "TRUCK_QR_REQUIRE_SIGNATURE"
+
+ALGORITHMS = ("hmac", "ed25519")
+# Bytes de HMAC-SHA256 que se conservan (RFC 2104 permite truncar hasta la mitad)
+HMAC_BYTES = 16
+MIN_HMAC_SECRET = 16
+KEY_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,8}$')
+
+UNSIGNED_ERROR = "Unsigned QR code."
+TAMPERED_ERROR = "Invalid QR signature: the code was altered after it was generated."
+
+_dumps = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode
+
+
+def canonical_bytes(data: Mapping) -> bytes:
+    """Serialización canónica que se firma (independiente del codec)"""
+    return _dumps({k: v for k, v in clean_payload(data).items() if k != "sig"}).encode("utf-8")
+
+
+class HMACKey:
+    """Clave simétrica: la misma firma y verifica"""
+
+    algorithm = "hmac"
+    signature_size = HMAC_BYTES
+
+    def __init__(self, key_id: str, secret: bytes):
+        if not KEY_ID_PATTERN.match(key_id):
+            raise ValueError(f"Invalid key id: '{key_id}'. Use 1-8 letters, digits, hyphens or underscores.")
+        if len(secret) < MIN_HMAC_SECRET:
+            raise ValueError(f"HMAC keys need at least {MIN_HMAC_SECRET} bytes.")
+        self.key_id = key_id
+        self.secret = secret
+
+    def sign(self, message: bytes) -> bytes:
+        return hmac.digest(self.secret, message, "sha256")[:HMAC_BYTES]
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(hmac.digest(self.secret, message, "sha256")[:HMAC_BYTES], signature)
+
+
+class Ed25519Key:
+    """Clave asimétrica: la privada firma y la pública (la que tienen las puertas) verifica
+
+    Guarda los bytes de la clave y crea los objetos de ``cryptography`` al
+    usarse, así que se puede enviar a otros procesos (pickle).
+    """
+
+    algorithm = "ed25519"
+    signature_size = 64
+
+    def __init__(self, key_id: str, private: Optional[bytes] = None, public: Optional[bytes] = None):
+        if not KEY_ID_PATTERN.match(key_id):
+            raise ValueError(f"Invalid key id: '{key_id}'. Use 1-8 letters, digits, hyphens or underscores.")
+        if (private is None) == (public is None):
+            raise ValueError("Pass either the Ed25519 private key or the public key.")
+        if len(private or public) != 32:
+            raise ValueError("Ed25519 keys are 32 bytes long.")
+        self.key_id = key_id
+        self._private_bytes = private
+        self._public_bytes = public
+        self._private = None
+        self._public = None
+
+    @staticmethod
+    def _module():
+        try:
+            from cryptography.hazmat.primitives.asymmetric import ed25519
+        except ImportError:
+            raise RuntimeError("Ed25519 signatures need the 'cryptography' package: pip install cryptography")
+        return ed25519
+
+    def _load(self) -> None:
+        ed25519 = self._module()
+        if self._private_bytes is not None:
+            self._private = ed25519.Ed25519PrivateKey.from_private_bytes(self._private_bytes)
+            self._public = self._private.public_key()
+        else:
+            self._public = ed25519.Ed25519PublicKey.from_public_bytes(self._public_bytes)
+
+    def public_bytes(self) -> bytes:
+        if self._public_bytes is None:
+            if self._public is None:
+                self._load()
+            from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+            self._public_bytes = self._public.public_bytes(Encoding.Raw, PublicFormat.Raw)
+        return self._public_bytes
+
+    def sign(self, message: bytes) -> bytes:
+        if self._private_bytes is None:
+            raise ValueError(f"Key '{self.key_id}' is a public key and can only verify.")
+        if self._private is None:
+            self._load()
+        return self._private.sign(message)
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        if self._public is None:
+            self._load()
+        from cryptography.exceptions import InvalidSignature
+        try:
+            self._public.verify(signature, message)
+        except InvalidSignature:
+            return False
+        return True
+
+    def __getstate__(self) -> Dict:
+        return dict(self.__dict__, _private=None, _public=None)
+
+
+SigningKey = Union[HMACKey, Ed25519Key]
+
+
+def parse_key(text: str, public: bool = False) -> SigningKey:
+    """Interpreta ``id:algoritmo:clave en base64`` (``public`` para las claves ed25519 de verificación)"""
+    parts = text.strip().split(":")
+    if len(parts) != 3 or parts[1] not in ALGORITHMS:
+        raise ValueError(f"Invalid key: use id:algorithm:base64 with algorithm {' or '.join(ALGORITHMS)}.")
+    key_id, algorithm, encoded = parts
+    try:
+        secret = b64url_decode(encoded.replace("+", "-").replace("/", "_").rstrip("="))
+    except ValidationError:
+        raise ValueError(f"Invalid base64 in key '{key_id}'.")
+    if algorithm == "hmac":
+        return HMACKey(key_id, secret)
+    return Ed25519Key(key_id, public=secret) if public else Ed25519Key(key_id, private=secret)
+
+
+class Keyring:
+    """Claves de verificación por identificador
+
+    Por defecto (``required=None``) la firma es obligatoria en cuanto hay alguna
+    clave; ``required=False`` acepta QR sin firma mientras se migra.
+    """
+
+    def __init__(self, keys: Iterable[SigningKey] = (), required: Optional[bool] = None):
+        self.keys: Dict[str, SigningKey] = {key.key_id: key for key in keys}
+        self.required = bool(self.keys) if required is None else required
+
+    @classmethod
+    def from_env(cls) -> Optional["Keyring"]:
+        """Claves configuradas por variables de entorno, o ``None`` si no hay ninguna"""
+        keys = [parse_key(entry, public=True) for entry in os.environ.get(VERIFY_KEYS_ENV, "").split(",")
+                if entry.strip()]
+        signing_key = signing_key_from_env()
+        if not keys and signing_key is not None:
+            keys = [signing_key]
+        setting = os.environ.get(REQUIRE_SIGNATURE_ENV, "").strip().lower()
+        if setting in ("1", "true", "yes"):
+            required: Optional[bool] = True
+        elif setting in ("0", "false", "no"):
+            required = False
+        elif setting:
+            raise ValueError(f"Invalid {REQUIRE_SIGNATURE_ENV}: use 1 to require signatures or 0 to accept unsigned "
+                             f"QR codes.")
+        else:
+            required = None
+        if not keys and not required:
+            return None
+        return cls(keys, required)
+
+
+@lru_cache(maxsize=1)
+def signing_key_from_env() -> Optional[SigningKey]:
+    """Clave de firma de ``TRUCK_QR_SIGNING_KEY``, o ``None`` si no se firma"""
+    text = os.environ.get(SIGNING_KEY_ENV)
+    return parse_key(text) if text else None
+
+
+def sign_payload(data: Mapping, key: SigningKey) -> Dict:
+    """Devuelve una copia de los datos con el campo ``sig``"""
+    signature = key.sign(canonical_bytes(data))
+    return dict(data, sig=f"{key.key_id}.{b64url_encode(signature)}")
+
+
+def verify_signature(data: Mapping, keyring: Keyring) -> Optional[str]:
+    """Comprueba la firma de un payload decodificado; devuelve el error o ``None``"""
+    sig = data.get("sig")
+    if not sig:
+        return UNSIGNED_ERROR if keyring.required else None
+    key_id, _, encoded = str(sig).partition(".")
+    key = keyring.keys.get(key_id)
+    if key is None:
+        return f"QR signed with an unknown key: '{key_id}'."
+    try:
+        signature = b64url_decode(encoded)
+    except ValidationError:
+        return TAMPERED_ERROR
+    if len(signature) != key.signature_size or not key.verify(canonical_bytes(data), signature):
+        return TAMPERED_ERROR
+    return None
+
+
+def verify_many(payloads: Iterable[Mapping], keyring: Keyring) -> List[Optional[str]]:
+    """``verify_signature`` para muchos payloads (lectores en lote, reprocesos)
+
+    Las firmas HMAC se comprueban en línea, sin llamadas intermedias por
+    payload; el resto pasa por ``verify_signature``.
+    """
+    digest = hmac.digest
+    compare = hmac.compare_digest
+    dumps = _dumps
+    hmac_secrets = {key_id: key.secret for key_id, key in keyring.keys.items() if isinstance(key, HMACKey)}
+    results: List[Optional[str]] = []
+    append = results.append
+    for data in payloads:
+        sig = data.get("sig")
+        key_id, _, encoded = sig.partition(".") if isinstance(sig, str) else ("", "", "")
+        secret = hmac_secrets.get(key_id)
+        if secret is None:
+            append(verify_signature(data, keyring))
+            continue
+        try:
+            signature = b64url_decode(encoded)
+        except ValidationError:
+            append(TAMPERED_ERROR)
+            continue
+        message = dumps({k: v for k, v in data.items() if k != "sig" and v is not None and v != ""}).encode("utf-8")
+        append(None if compare(digest(secret, message, "sha256")[:HMAC_BYTES], signature) else TAMPERED_ERROR)
+    return results
+
+
+def generate_key(algorithm: str = "hmac", key_id: str = "k1") -> Dict[str, str]:
+    """Clave nueva en el formato de las variables de entorno (``signing`` y ``verify``)"""
+    if algorithm == "hmac":
+        secret = b64url_encode(os.urandom(32))
+        entry = f"{key_id}:hmac:{secret}"
+        return {"signing": entry, "verify": entry}
+    seed = os.urandom(32)
+    key = Ed25519Key(key_id, private=seed)
+    return {"signing": f"{key_id}:ed25519:{b64url_encode(seed)}",
+            "verify": f"{key_id}:ed25519:{b64url_encode(key.public_bytes())}"}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Create signing keys and verify signed QR payloads.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    keygen = sub.add_parser("keygen", help="Print a new key for TRUCK_QR_SIGNING_KEY / TRUCK_QR_VERIFY_KEYS")
+    keygen.add_argument("--algorithm", choices=ALGORITHMS, default="hmac")
+    keygen.add_argument("--key-id", default="k1")
+    sub.add_parser("verify", help="Verify payloads read from stdin, one per line, with the configured keys")
+    args = parser.parse_args(argv)
+
+    if args.command == "keygen":
+        key = generate_key(args.algorithm, args.key_id)
+        print(f"{SIGNING_KEY_ENV}={key['signing']}")
+        print(f"{VERIFY_KEYS_ENV}={key['verify']}")
+        return 0
+
+    keyring = Keyring.from_env()
+    if keyring is None:
+        print(f"Set {VERIFY_KEYS_ENV} or {SIGNING_KEY_ENV} to verify signatures.", file=sys.stderr)
+        return 2
+    failed = 0
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            error = verify_signature(decode_payload(line), keyring)
+        except ValidationError as e:
+            error = str(e)
+        print("ok" if error is None else f"invalid\t{error}")
+        failed += error is not None
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""División de manifiestos grandes en varios códigos QR
+
+``qrcode`` no implementa el modo "structured append" del estándar (que además
+está limitado a 16 símbolos), así que cada fragmento lleva una cabecera propia
+con el identificador del payload y su posición:
+
+    TQS:<id>:<i>/<n>:<fragmento>
+
+``<id>`` son los 6 primeros hexadecimales del SHA-256 del payload completo y
+se verifica al reensamblar. La cabecera solo usa caracteres alfanuméricos del
+QR, por lo que con el codec ``b45`` los fragmentos siguen en modo alfanumérico.
+"""
+
+import hashlib
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from truck_qr.cache import QRCache
+from truck_qr.codec import DEFAULT_CODEC, decode_payload, encode_payload, qr_stats
+from truck_qr.generator import TruckQRGenerator, ValidationError
+
+# Versión máxima por símbolo para que los lectores de mano lean rápido
+DEFAULT_MAX_VERSION = 20
+MAX_CHUNKS = 99
+
+CHUNK_PREFIX = "TQS:"
+CHUNK_HEADER_PATTERN = re.compile(r'^TQS:([0-9A-F]{6}):(\d{2})/(\d{2}):')
+
+
+def _payload_id(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:6].upper()
+
+
+def _header(chunk_id: str, index: int, total: int) -> str:
+    return f"{CHUNK_PREFIX}{chunk_id}:{index:02d}/{total:02d}:"
+
+
+def _fits(text: str, max_version: int, error_correction: int) -> bool:
+    version, _ = qr_stats(text, error_correction)
+    return version is not None and version <= max_version
+
+
+def split_text(payload: str, max_version: int = DEFAULT_MAX_VERSION,
+               error_correction: Optional[int] = None) -> List[str]:
+    """Divide un payload ya serializado en fragmentos que caben en ``max_version``
+
+    Si el payload ya cabe se devuelve tal cual, sin cabecera.
+    """
+    if error_correction is None:
+        error_correction = TruckQRGenerator.QR_RENDER_CONFIG['error_correction']
+    if _fits(payload, max_version, error_correction):
+        return [payload]
+
+    chunk_id = _payload_id(payload)
+    widest_header = _header(chunk_id, MAX_CHUNKS, MAX_CHUNKS)
+
+    # Búsqueda binaria de la mayor longitud de fragmento que cabe
+    low, high = 0, len(payload)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _fits(widest_header + payload[:middle], max_version, error_correction):
+            low = middle
+        else:
+            high = middle - 1
+    if low == 0:
+        raise ValidationError(f"QR version {max_version} is too small to hold a chunk header.")
+
+    # Repartir en fragmentos equilibrados; si alguno no cabe (p. ej. más
+    # caracteres multibyte que el prefijo medido) se reduce el tamaño
+    chunk_size = low
+    while chunk_size > 0:
+        total = math.ceil(len(payload) / chunk_size)
+        if total > MAX_CHUNKS:
+            break
+        size = math.ceil(len(payload) / total)
+        chunks = [
+            _header(chunk_id, i + 1, total) + payload[i * size:(i + 1) * size]
+            for i in range(total)
+        ]
+        if all(_fits(chunk, max_version, error_correction) for chunk in chunks):
+            return chunks
+        chunk_size = int(chunk_size * 0.9)
+
+    raise ValidationError(
+        f"Manifest is too large: it needs more than {MAX_CHUNKS} QR codes of version {max_version}."
+    )
+
+
+def split_payload(data_dict: Dict, codec: str = DEFAULT_CODEC,
+                  max_version: int = DEFAULT_MAX_VERSION) -> List[str]:
+    """Serializa el payload con el codec indicado y lo divide si hace falta"""
+    return split_text(encode_payload(data_dict, codec), max_version)
+
+
+def is_chunk(text: str) -> bool:
+    """Indica si un texto escaneado es un fragmento de un payload dividido"""
+    return bool(CHUNK_HEADER_PATTERN.match(text))
+
+
+def parse_chunk(text: str) -> Tuple[str, int, int, str]:
+    """Devuelve (id, índice, total, contenido) de un fragmento"""
+    match = CHUNK_HEADER_PATTERN.match(text)
+    if not match:
+        raise ValidationError("Invalid QR chunk header.")
+    index, total = int(match.group(2)), int(match.group(3))
+    if not 1 <= index <= total:
+        raise ValidationError(f"Invalid QR chunk index {index}/{total}.")
+    return match.group(1), index, total, text[match.end():]
+
+
+class ChunkAssembler:
+    """Reensambla fragmentos escaneados en cualquier orden"""
+
+    def __init__(self):
+        self._parts: Dict[str, Dict[int, str]] = {}
+        self._totals: Dict[str, int] = {}
+
+    def add(self, text: str) -> Optional[str]:
+        """Añade un código escaneado; devuelve el payload completo cuando está listo"""
+        if not is_chunk(text):
+            return text
+
+        chunk_id, index, total, content = parse_chunk(text)
+        if self._totals.setdefault(chunk_id, total) != total:
+            raise ValidationError(f"QR chunk {index}/{total} does not match the other chunks of {chunk_id}.")
+        parts = self._parts.setdefault(chunk_id, {})
+        parts[index] = content
+        if len(parts) < total:
+            return None
+
+        del self._parts[chunk_id], self._totals[chunk_id]
+        payload = "".join(parts[i] for i in range(1, total + 1))
+        if _payload_id(payload) != chunk_id:
+            raise ValidationError(f"Reassembled payload does not match its chunk id {chunk_id}.")
+        return payload
+
+    def missing(self, chunk_id: str) -> List[int]:
+        """Índices de fragmento que aún faltan por escanear"""
+        parts = self._parts.get(chunk_id, {})
+        return [i for i in range(1, self._totals.get(chunk_id, 0) + 1) if i not in parts]
+
+    def pending(self) -> List[str]:
+        """Identificadores de payloads con fragmentos pendientes"""
+        return list(self._parts)
+
+
+def join_chunks(chunks: Iterable[str]) -> str:
+    """Reensambla todos los fragmentos de un único payload"""
+    assembler = ChunkAssembler()
+    payload = None
+    for text in chunks:
+        if payload is not None:
+            raise ValidationError("Received QR chunks from more than one payload.")
+        payload = assembler.add(text)
+    if payload is None:
+        pending = assembler.pending()
+        if not pending:
+            raise ValidationError("No QR chunks received.")
+        missing = ", ".join(str(i) for i in assembler.missing(pending[0]))
+        raise ValidationError(f"Missing QR chunks: {missing}.")
+    return payload
+
+
+def decode_chunks(chunks: Iterable[str]) -> Dict:
+    """Reensambla y decodifica un payload dividido (o un QR único)"""
+    return decode_payload(join_chunks(chunks))
+
+
+def generate_qr_chunks(data_dict: Dict, codec: str = DEFAULT_CODEC,
+                       max_version: int = DEFAULT_MAX_VERSION,
+                       cache: Optional[QRCache] = None) -> List[Tuple[bytes, str]]:
+    """Genera uno o varios PNG (con su texto) de modo que ninguno supere ``max_version``"""
+    chunks = split_payload(data_dict, codec, max_version)
+    if len(chunks) == 1:
+        return [TruckQRGenerator.generate_qr_png(data_dict, codec, cache)]
+    return [(TruckQRGenerator.render_png(chunk), chunk) for chunk in chunks]
@@ -0,0 +1,220 @@
+"""Plantillas de camiones y clientes recurrentes para reemitir QR en un paso
+
+La mayoría de los camiones vuelve a diario con la misma placa, conductor,
+cliente, tipo de camión y empresa; solo cambian la fecha/hora y los items.
+Cada QR generado guarda (o actualiza) la plantilla de su par placa/cliente con
+esos campos ya validados y normalizados, en la misma base SQLite del
+histórico (tabla ``templates``).
+
+- ``lookup`` busca por la clave primaria (placa, cliente).
+- ``search`` busca por prefijo de placa o de cliente con consultas de rango
+  sobre índices (sin recorrer la tabla) y ordena por uso, para el
+  autocompletado del formulario.
+- ``Template.fields`` se pasa como ``validated`` a ``validate_record``: al
+  reemitir solo se revalidan los campos que el usuario cambió, la fecha y
+  los items.
+
+Uso:
+    python -m truck_qr.templates --db qr_history.db search ABC
+    python -m truck_qr.templates --db qr_history.db import-history
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from truck_qr.history import DEFAULT_HISTORY_DB, _timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    plate TEXT NOT NULL,
+    customer_id TEXT NOT NULL,
+    driver_name TEXT NOT NULL,
+    truck_type TEXT NOT NULL DEFAULT '',
+    company TEXT NOT NULL DEFAULT '',
+    uses INTEGER NOT NULL DEFAULT 1,
+    last_used TEXT NOT NULL,
+    PRIMARY KEY (plate, customer_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_templates_customer ON templates (customer_id, plate);
+CREATE INDEX IF NOT EXISTS idx_templates_uses ON templates (uses DESC, last_used DESC);
+"""
+
+# Cada uso suma 1 y conserva los últimos valores de conductor, tipo y empresa
+_UPSERT = (
+    "INSERT INTO templates (plate, customer_id, driver_name, truck_type, company, uses, last_used) "
+    "VALUES (?, ?, ?, ?, ?, 1, ?) "
+    "ON CONFLICT (plate, customer_id) DO UPDATE SET driver_name = excluded.driver_name, "
+    "truck_type = excluded.truck_type, company = excluded.company, uses = uses + 1, "
+    "last_used = MAX(last_used, excluded.last_used)"
+)
+# Una fila por placa/cliente del histórico; las columnas sueltas toman los
+# valores de la fila con MAX(created_at) (comportamiento documentado de SQLite)
+_IMPORT = (
+    "INSERT INTO templates (plate, customer_id, driver_name, truck_type, company, uses, last_used) "
+    "SELECT plate, customer_id, COALESCE(json_extract(data, '$.driverName'), ''), "
+    "COALESCE(json_extract(data, '$.truckType'), ''), COALESCE(json_extract(data, '$.company'), ''), "
+    "COUNT(*), MAX(created_at) FROM generations WHERE plate != '' AND customer_id != '' "
+    "GROUP BY plate, customer_id "
+    "ON CONFLICT (plate, customer_id) DO UPDATE SET uses = MAX(uses, excluded.uses), "
+    "last_used = MAX(last_used, excluded.last_used)"
+)
+_COLUMNS = "plate, customer_id, driver_name, truck_type, company, uses, last_used"
+
+
+class Template(NamedTuple):
+    """Campos fijos de un camión recurrente, ya validados y normalizados"""
+    plate: str
+    customer_id: str
+    driver_name: str
+    truck_type: str
+    company: str
+    uses: int
+    last_used: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.plate, self.customer_id
+
+    @property
+    def label(self) -> str:
+        """Texto para el autocompletado del formulario"""
+        return f"{self.plate} · {self.customer_id} · {self.driver_name}"
+
+    def fields(self) -> Dict[str, str]:
+        """Campos con los nombres del payload, para ``validate_record(..., validated=...)``"""
+        return {
+            "plate": self.plate,
+            "driverName": self.driver_name,
+            "customer_id": self.customer_id,
+            "truckType": self.truck_type,
+            "company": self.company,
+        }
+
+
+def _normalize(value: Optional[str]) -> str:
+    return (value or "").strip().upper()
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    """Rango ``[prefix, fin)`` que cubre todos los textos que empiezan por ``prefix``"""
+    return prefix, prefix + "\U0010ffff"
+
+
+def _row(data: Mapping, used_at: str) -> Tuple:
+    return (
+        data["plate"],
+        data["customer_id"],
+        data.get("driverName", ""),
+        data.get("truckType") or "",
+        data.get("company") or "",
+        used_at,
+    )
+
+
+class TemplateStore:
+    """Plantillas en SQLite, en la misma base que el histórico de QR"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_DB):
+        if path == ":memory:":
+            raise ValueError("Templates need a database file shared by all sessions.")
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save(self, data: Mapping, used_at: Optional[datetime] = None) -> None:
+        """Crea o actualiza la plantilla de un payload ya validado (nombres de campo del QR)"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(_UPSERT, _row(data, _timestamp(used_at or datetime.now())))
+        finally:
+            conn.close()
+
+    def lookup(self, plate: str, customer_id: str) -> Optional[Template]:
+        """Plantilla exacta de una placa y un cliente"""
+        conn = self._connect()
+        try:
+            row = conn.execute(f"SELECT {_COLUMNS} FROM templates WHERE plate = ? AND customer_id = ?",
+                               (_normalize(plate), _normalize(customer_id))).fetchone()
+        finally:
+            conn.close()
+        return Template(*row) if row else None
+
+    def search(self, prefix: str = "", limit: int = 20) -> List[Template]:
+        """Plantillas cuya placa o cliente empieza por ``prefix``, las más usadas primero"""
+        prefix = _normalize(prefix)
+        conn = self._connect()
+        try:
+            if not prefix:
+                rows = conn.execute(f"SELECT {_COLUMNS} FROM templates ORDER BY uses DESC, last_used DESC LIMIT ?",
+                                    (limit,)).fetchall()
+            else:
+                # Dos rangos sobre índice (clave primaria e idx_templates_customer) en lugar de LIKE
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM templates WHERE plate >= ? AND plate < ? "
+                    f"UNION SELECT {_COLUMNS} FROM templates WHERE customer_id >= ? AND customer_id < ? "
+                    "ORDER BY uses DESC, last_used DESC LIMIT ?",
+                    (*_prefix_range(prefix), *_prefix_range(prefix), limit),
+                ).fetchall()
+        finally:
+            conn.close()
+        return [Template(*row) for row in rows]
+
+    def delete(self, plate: str, customer_id: str) -> bool:
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM templates WHERE plate = ? AND customer_id = ?",
+                                      (_normalize(plate), _normalize(customer_id)))
+        finally:
+            conn.close()
+        return cursor.rowcount > 0
+
+    def import_history(self) -> int:
+        """Crea las plantillas a partir del histórico de QR de la misma base; devuelve cuántas hay
+
+        Se puede repetir sin duplicar usos: el número de usos es el del
+        histórico salvo que la plantilla ya tenga más.
+        """
+        conn = self._connect()
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'generations'").fetchone():
+                with conn:
+                    conn.execute(_IMPORT)
+            return conn.execute("SELECT COUNT(*) FROM templates").fetchone()[0]
+        finally:
+            conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos"""
+    parser = argparse.ArgumentParser(description="Search and maintain the saved truck templates.")
+    parser.add_argument("--db", default=DEFAULT_HISTORY_DB, help=f"History database (default: {DEFAULT_HISTORY_DB})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="List templates whose plate or customer ID starts with a prefix")
+    search.add_argument("prefix", nargs="?", default="")
+    search.add_argument("-n", "--limit", type=int, default=20)
+    commands.add_parser("import-history", help="Create templates from the QR codes already in the history")
+    args = parser.parse_args(argv)
+
+    store = TemplateStore(args.db)
+    if args.command == "import-history":
+        print(f"{store.import_history()} templates after importing the QR history")
+        return 0
+    for template in store.search(args.prefix, args.limit):
+        print(f"{template.label} · {template.truck_type or '-'} · {template.company or '-'} · "
+              f"{template.uses} uses · last {template.last_used}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())